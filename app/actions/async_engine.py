@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from .async_http import AsyncHttpClient, AsyncHttpError
+from .dispatcher import ActionDispatcher
+from .macro import expand_macro
+from .queue import DispatchQueue, PendingCommand, WeightedRoundRobin, priority_rank
+from ..settings.manager import AgentTarget
+
+
+@dataclass
+class _Lane:
+    queue: DispatchQueue
+    task: asyncio.Task | None = None
+    sending: bool = False
+
+
+class _WeightedLimiter:
+    # Concurrency slots handed to waiting sends by priority lane, with the same
+    # weighted fairness as the threaded engine's queues.
+    def __init__(self, slots: int, weights: tuple[int, ...]) -> None:
+        self._free = slots
+        self._rr = WeightedRoundRobin(weights)
+        self._waiters: list[deque[asyncio.Future]] = [deque() for _ in weights]
+
+    async def acquire(self, lane: int) -> None:
+        if self._free > 0 and not any(self._waiters):
+            self._free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while True:
+            for idx, waiters in enumerate(self._waiters):
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+                if not waiters:
+                    self._rr.reset(idx)
+            lane = self._rr.pick([bool(waiters) for waiters in self._waiters])
+            if lane < 0:
+                self._free += 1
+                return
+            future = self._waiters[lane].popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+
+
+class AsyncActionDispatcher(ActionDispatcher):
+    def _start(self) -> None:
+        self._concurrency = max(1, self._settings.get_int("dispatch_async_concurrency", 32))
+        self._retries = self._build_retries()
+        self._http = AsyncHttpClient(
+            pool_size=max(self._concurrency, self._settings.get_int("agent_pool_size", 4)),
+            idle_timeout=self._settings.get_float("agent_idle_timeout", 30.0),
+        )
+        self._target_version = self._settings.version
+        self._target = self._settings.get_agent_target(self._agent_id)
+        if self._settings.get_value("agent_transport") == "stream":
+            logging.warning("The asyncio engine has no streaming channel; agent %s is sent over POST /command", self._agent_id)
+        self._headers: tuple[AgentTarget, dict[str, str]] | None = None
+        self._macro_unsupported: AgentTarget | None = None
+        self._lanes: dict[int, _Lane] = {}
+        # The loop keeps only weak references to tasks; these are held until done.
+        self._tasks: set[asyncio.Task] = set()
+        self._in_flight = 0
+        self._retrying: dict[int, PendingCommand] = {}
+        self._counters = {
+            "enqueued": 0, "coalesced": 0, "sent": 0, "retried": 0, "expired": 0, "failed": 0,
+            "spilled": 0, "rejected": 0, "dropped": 0, "limited": 0, "throttled": 0,
+        }
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True, name=f"dispatch-asyncio-{self._agent_id}")
+        self._thread.start()
+        ready.wait()
+
+    def _build_queue(self) -> DispatchQueue:
+        # Never block the event loop: "block" degrades to dropping the new command.
+        return DispatchQueue(coalesce=self._coalesce, capacity=self._capacity, on_superseded=self._ledger.forget)
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._limit = _WeightedLimiter(self._concurrency, self._weights)
+        self._wake = asyncio.Event()
+        if self._health.wake.is_set():
+            self._wake.set()
+        self._health.on_wake = lambda: self._loop.call_soon_threadsafe(self._wake.set)
+        self._spawn(self._health_probe_loop())
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def _submit(self, command: PendingCommand) -> None:
+        if self._ledger.begin(command.request_id):
+            self._loop.call_soon_threadsafe(self._accept, command)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _accept(self, command: PendingCommand) -> None:
+        if command.control_id is None:
+            self._counters["enqueued"] += 1
+            self._dequeued(command)
+            self._spawn(self._deliver(command, None))
+            return
+        lane = self._lanes.get(command.control_id)
+        if lane is None:
+            lane = self._lanes[command.control_id] = _Lane(queue=self._build_queue())
+        dropped = lane.queue.put(command)
+        if dropped is not None:
+            self._settle(dropped, "dropped")
+        if lane.task is None:
+            lane.task = self._spawn(self._drain(command.control_id, lane))
+
+    async def _drain(self, control_id: int, lane: _Lane) -> None:
+        try:
+            while (command := lane.queue.get(0)) is not None:
+                self._dequeued(command)
+                lane.sending = True
+                await self._deliver(command, lane)
+                lane.sending = False
+        finally:
+            del self._lanes[control_id]
+            self._counters["enqueued"] += lane.queue.enqueued
+            self._counters["coalesced"] += lane.queue.coalesced
+            self._counters["dropped"] += lane.queue.dropped
+
+    async def _deliver(self, command: PendingCommand, lane: _Lane | None) -> None:
+        while True:
+            now = time.monotonic()
+            if command.expired(now):
+                self._finish_async(command, "expired")
+                return
+            if command.delay > 0:
+                # A macro step's delay holds only this control's lane.
+                delay, command.delay = command.delay, 0.0
+                if not await self._pause(command, lane, delay):
+                    return
+                continue
+            wait, mode = self._rate_limit(command, now)
+            if wait > 0:
+                superseded = lane is not None and command.control_id is not None and lane.queue.has_action(
+                    command.control_id, command.action_id
+                )
+                if mode == "drop" or (mode == "coalesce" and superseded):
+                    self._finish_async(command, "limited")
+                    return
+                # Sleeping here holds only this control's lane.
+                if not command.deferred:
+                    self._counters["throttled"] += 1
+                command.deferred = True
+                if not await self._pause(command, lane, wait):
+                    return
+                continue
+            if not self._health.breaker.allow():
+                self._finish_async(command, "spilled" if self._spill(command) else "rejected")
+                return
+            command.attempts += 1
+            if command.trace is not None:
+                command.trace.mark_send(now)
+            ok = await self._post(command)
+            if ok is None:
+                # No macro route: deliver the steps in order from this task.
+                self._health.breaker.record_success()
+                self._ledger.complete(command.request_id)
+                self._release(command)
+                for step in expand_macro(command):
+                    await self._deliver(step, lane)
+                return
+            if ok:
+                self._health.record_success(passive=True)
+                self._finish_async(command, "sent")
+                return
+            self._health.record_failure(passive=True)
+            delay = self._retries.delay_for(command, time.monotonic())
+            if delay is None:
+                self._finish_async(command, "spilled" if self._spill(command) else "failed")
+                return
+            if not await self._pause(command, lane, delay):
+                return
+            self._counters["retried"] += 1
+
+    async def _pause(self, command: PendingCommand, lane: _Lane | None, delay: float) -> bool:
+        # False if a newer value for the same control arrived while waiting.
+        self._retrying[id(command)] = command
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._retrying.pop(id(command), None)
+        key = command.coalesce_key
+        if key is not None and lane is not None and lane.queue.has_pending(key):
+            self._counters["coalesced"] += 1
+            self._ledger.forget(command.request_id)
+            self._release(command)
+            return False
+        return True
+
+    def _finish_async(self, command: PendingCommand, outcome: str) -> None:
+        self._counters[outcome] += 1
+        self._settle(command, outcome)
+
+    async def _current_target(self) -> AgentTarget:
+        # Host, port, and token edits bump the settings version; only then is
+        # the target reread, off the loop since settings live in SQLite.
+        version = self._settings.version
+        if version != self._target_version:
+            self._target = await self._loop.run_in_executor(None, self._settings.get_agent_target, self._agent_id)
+            self._target_version = version
+        return self._target
+
+    async def _post(self, command: PendingCommand) -> bool | None:
+        target = await self._current_target()
+        path = "/command"
+        if command.macro:
+            if target is self._macro_unsupported:
+                return None
+            path = "/command/macro"
+        body = command.encoded()
+        await self._limit.acquire(priority_rank(command.priority))
+        self._in_flight += 1
+        try:
+            status, _ = await self._http.request(
+                "POST",
+                target.host,
+                target.port,
+                path,
+                body=body,
+                headers=self._headers_for(target, command.request_id),
+                timeout=2.0,
+            )
+            if status == 404 and command.macro:
+                self._macro_unsupported = target
+                return None
+            return status == 200
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, AsyncHttpError, ValueError):
+            return False
+        finally:
+            self._in_flight -= 1
+            self._limit.release()
+
+    def _headers_for(self, target: AgentTarget, request_id: str | None) -> dict[str, str]:
+        cached = self._headers
+        if cached is None or cached[0] is not target:
+            cached = self._headers = (
+                target,
+                {"Authorization": f"Bearer {target.token}", "Content-Type": "application/json"},
+            )
+        if request_id is None:
+            return cached[1]
+        return {**cached[1], "Idempotency-Key": request_id}
+
+    async def _health_probe_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._health.next_probe_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self._health.wake.clear()
+            if self._health.probe_needed():
+                target = await self._current_target()
+                try:
+                    status, _ = await self._http.request("GET", target.host, target.port, "/health", timeout=1.0)
+                    ok = status == 200
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, AsyncHttpError, ValueError):
+                    ok = False
+                if ok:
+                    self._health.record_success()
+                else:
+                    self._health.record_failure()
+            if self._health.take_recovered():
+                for command in await self._loop.run_in_executor(None, self._replay_outbox):
+                    if self._ledger.begin(command.request_id):
+                        self._accept(command)
+
+    def _pending_commands(self) -> list[PendingCommand]:
+        pending = list(self._retrying.values())
+        for lane in list(self._lanes.values()):
+            pending.extend(lane.queue.drain())
+        return pending
+
+    def stats(self) -> dict[str, int]:
+        totals = dict(self._counters)
+        totals["queued"] = 0
+        totals["in_flight"] = self._in_flight
+        totals["lanes"] = 0
+        totals.update(self._intake_stats())
+        for lane in list(self._lanes.values()):
+            totals["enqueued"] += lane.queue.enqueued
+            totals["coalesced"] += lane.queue.coalesced
+            totals["dropped"] += lane.queue.dropped
+            totals["queued"] += lane.queue.qsize()
+            totals["lanes"] += 1
+        return totals
+
+    def _depths(self) -> list[int]:
+        return [lane.queue.qsize() for lane in list(self._lanes.values())]
+
+    def shard_stats(self) -> list[dict[str, int]]:
+        return [
+            {"shard": control_id, "queued": lane.queue.qsize(), "in_flight": int(lane.sending)}
+            for control_id, lane in list(self._lanes.items())
+        ]
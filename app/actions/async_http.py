@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+
+
+class AsyncHttpError(Exception):
+    pass
+
+
+class _StaleConnection(AsyncHttpError):
+    pass
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncHttpClient:
+    def __init__(self, pool_size: int = 4, idle_timeout: float = 30.0) -> None:
+        self._pool_size = max(1, pool_size)
+        self._idle_timeout = idle_timeout
+        self._idle: dict[tuple[str, int], list[_Connection]] = {}
+
+    async def request(
+        self,
+        method: str,
+        host: str,
+        port: int,
+        path: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 2.0,
+    ) -> tuple[int, bytes]:
+        return await asyncio.wait_for(self._request(method, host, port, path, body, headers or {}), timeout)
+
+    async def _request(
+        self,
+        method: str,
+        host: str,
+        port: int,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str],
+    ) -> tuple[int, bytes]:
+        conn = self._acquire(host, port)
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = await self._open(host, port)
+            try:
+                status, data, keep_alive = await self._exchange(conn, method, host, port, path, body, headers)
+            except _StaleConnection:
+                conn.close()
+                if not reused:
+                    raise
+                # The agent closed an idle keep-alive connection before reading the request.
+                conn, reused = None, False
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            if keep_alive:
+                self._release(host, port, conn)
+            else:
+                conn.close()
+            return status, data
+
+    async def _open(self, host: str, port: int) -> _Connection:
+        reader, writer = await asyncio.open_connection(host, port)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return _Connection(reader, writer)
+
+    async def _exchange(
+        self,
+        conn: _Connection,
+        method: str,
+        host: str,
+        port: int,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str],
+    ) -> tuple[int, bytes, bool]:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: keep-alive"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        try:
+            conn.writer.write(head + body if body else head)
+            await conn.writer.drain()
+        except OSError as exc:
+            raise _StaleConnection(str(exc)) from exc
+
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise _StaleConnection("Connection closed before response")
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise AsyncHttpError(f"Malformed status line: {status_line!r}")
+        status = int(parts[1])
+        response_headers: dict[str, str] = {}
+        while True:
+            line = await conn.reader.readline()
+            if not line:
+                raise AsyncHttpError("Connection closed while reading headers")
+            if line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close" and parts[0] != "HTTP/1.0"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            data = await self._read_chunked(conn.reader)
+        elif "content-length" in response_headers:
+            data = await conn.reader.readexactly(int(response_headers["content-length"]))
+        elif method == "HEAD" or status in (204, 304):
+            data = b""
+        else:
+            data = await conn.reader.read()
+            keep_alive = False
+        conn.last_used = time.monotonic()
+        return status, data, keep_alive
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks: list[bytes] = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def _acquire(self, host: str, port: int) -> _Connection | None:
+        idle = self._idle.get((host, port))
+        now = time.monotonic()
+        while idle:
+            conn = idle.pop()
+            if conn.reader.at_eof() or (self._idle_timeout > 0 and now - conn.last_used > self._idle_timeout):
+                conn.close()
+                continue
+            return conn
+        return None
+
+    def _release(self, host: str, port: int, conn: _Connection) -> None:
+        idle = self._idle.setdefault((host, port), [])
+        if len(idle) >= self._pool_size:
+            conn.close()
+            return
+        idle.append(conn)
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            for conn in idle:
+                conn.close()
+        self._idle.clear()
@@ -2,28 +2,84 @@ from __future__ import annotations
 
 import requests
 
-from ..settings.manager import SettingsManager
+from ..data.models import DEFAULT_AGENT
+from ..settings.manager import AgentTarget, SettingsManager
+from .stream import StreamChannel
+from .transport import AgentTransport
 
 
 class AgentClient:
-    def __init__(self, settings: SettingsManager) -> None:
+    def __init__(self, settings: SettingsManager, min_pool_size: int = 1, agent_id: str = DEFAULT_AGENT) -> None:
         self._settings = settings
+        self._agent_id = agent_id
+        self._transport = AgentTransport(
+            pool_size=max(min_pool_size, settings.get_int("agent_pool_size", 4)),
+            idle_timeout=settings.get_float("agent_idle_timeout", 30.0),
+        )
+        self._batch_unsupported: AgentTarget | None = None
+        self._macro_unsupported: AgentTarget | None = None
+        self._stream = StreamChannel(settings, agent_id) if settings.get_value("agent_transport") == "stream" else None
 
-    def send(self, payload: dict) -> bool:
-        target = self._settings.get_agent_target()
-        url = f"http://{target.host}:{target.port}/command"
-        headers = {"Authorization": f"Bearer {target.token}"}
+    def send(self, request_id: str | None, body: bytes) -> bool:
+        target = self._settings.get_agent_target(self._agent_id)
+        if self._stream is not None:
+            result = self._stream.send(target, request_id, body, timeout=2)
+            if result is not None:
+                return result
         try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=2)
+            resp = self._transport.post_body(target, "/command", body, timeout=2, idempotency_key=request_id)
             return resp.status_code == 200
         except requests.RequestException:
             return False
 
+    def send_macro(self, request_id: str | None, body: bytes) -> bool | None:
+        # None when the agent has no macro route and the steps must be sent one by one.
+        target = self._settings.get_agent_target(self._agent_id)
+        if target == self._macro_unsupported:
+            return None
+        try:
+            resp = self._transport.post_body(target, "/command/macro", body, timeout=2, idempotency_key=request_id)
+        except requests.RequestException:
+            return False
+        if resp.status_code == 404:
+            self._macro_unsupported = target
+            return None
+        return resp.status_code == 200
+
+    def send_batch(self, bodies: list[bytes]) -> list[bool] | None:
+        target = self._settings.get_agent_target(self._agent_id)
+        if target == self._batch_unsupported:
+            return None
+        # The encoded commands are spliced into the batch, never re-encoded.
+        body = b'{"commands": [' + b", ".join(bodies) + b"]}"
+        try:
+            resp = self._transport.post_body(target, "/command/batch", body, timeout=2)
+        except requests.RequestException:
+            return [False] * len(bodies)
+        if resp.status_code == 404:
+            self._batch_unsupported = target
+            return None
+        if resp.status_code != 200:
+            return [False] * len(bodies)
+        try:
+            results = resp.json()["results"]
+        except (ValueError, KeyError, TypeError):
+            return [False] * len(bodies)
+        if not isinstance(results, list) or len(results) != len(bodies):
+            return [False] * len(bodies)
+        return [isinstance(item, dict) and item.get("ok") is True for item in results]
+
     def health_check(self) -> bool:
-        target = self._settings.get_agent_target()
-        url = f"http://{target.host}:{target.port}/health"
+        if self._stream is not None and self._stream.connected():
+            return self._stream.ping(timeout=1)
+        target = self._settings.get_agent_target(self._agent_id)
         try:
-            resp = requests.get(url, timeout=1)
+            resp = self._transport.get(target, "/health", timeout=1)
             return resp.status_code == 200
         except requests.RequestException:
             return False
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+        self._transport.close()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import secrets
+import socket
+import struct
+import threading
+
+from ..data.models import DEFAULT_AGENT
+from ..settings.manager import SettingsManager
+
+DATAGRAM_TRANSPORT = "datagram"
+DATAGRAM_VERSION = 1
+# version, session, stream key (action id), sequence number
+DATAGRAM_HEADER = struct.Struct(">BIII")
+MAC_BYTES = 16
+# Stay under a typical LAN MTU so a datagram is never fragmented.
+MAX_DATAGRAM_BYTES = 1200
+
+
+def encode_datagram(mac: hmac.HMAC, session: int, key: int, seq: int, body: bytes) -> bytes:
+    packet = DATAGRAM_HEADER.pack(DATAGRAM_VERSION, session, key, seq) + body
+    signer = mac.copy()
+    signer.update(packet)
+    return packet + signer.digest()[:MAC_BYTES]
+
+
+def decode_datagram(mac: hmac.HMAC, data: bytes) -> tuple[int, int, int, bytes] | None:
+    # Reference for the agent side: None for short, unknown, or forged packets.
+    if len(data) < DATAGRAM_HEADER.size + MAC_BYTES:
+        return None
+    packet, tag = data[:-MAC_BYTES], data[-MAC_BYTES:]
+    verifier = mac.copy()
+    verifier.update(packet)
+    if not hmac.compare_digest(verifier.digest()[:MAC_BYTES], tag):
+        return None
+    version, session, key, seq = DATAGRAM_HEADER.unpack_from(packet)
+    if version != DATAGRAM_VERSION:
+        return None
+    return session, key, seq, packet[DATAGRAM_HEADER.size:]
+
+
+def sequence_newer(seq: int, last: int) -> bool:
+    # Serial number arithmetic, so the 32-bit counter may wrap.
+    return 0 < (seq - last) & 0xFFFFFFFF < 0x80000000
+
+
+def datagram_mac(token: str) -> hmac.HMAC:
+    return hmac.new(token.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def add_fence(body: bytes, fence: dict) -> bytes:
+    # Splices "datagram_fence" into an encoded JSON command object.
+    return body.rstrip()[:-1] + b', "datagram_fence": ' + json.dumps(fence).encode("utf-8") + b"}"
+
+
+class DatagramChannel:
+    # Fire-and-forget UDP for continuous values: no acks, no retries, no
+    # queue, so a lost or late update never holds up the next one.
+    def __init__(self, settings: SettingsManager, agent_id: str = DEFAULT_AGENT) -> None:
+        self._settings = settings
+        self._agent_id = agent_id
+        self._port = settings.get_int("agent_datagram_port", 8767)
+        # A fresh session per process tells the agent to reset its sequence numbers.
+        self._session = secrets.randbits(32)
+        self._lock = threading.Lock()
+        self._seqs: dict[int, int] = {}
+        # Datagram keys (action ids) sent for each control.
+        self._streams: dict[int, set[int]] = {}
+        self._mac: tuple[str, hmac.HMAC] | None = None
+        self._addr: tuple[str, tuple] | None = None
+        self._resolving: str | None = None
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self.sent = 0
+        self.errors = 0
+
+    def send(self, key: int, body: bytes, control_id: int | None = None) -> bool:
+        # False when the value must take the reliable path instead: too large,
+        # or the agent's address is still being resolved.
+        target = self._settings.get_agent_target(self._agent_id)
+        addr = self._resolve(target.host)
+        if addr is None:
+            return False
+        mac = self._mac
+        if mac is None or mac[0] != target.token:
+            mac = self._mac = (target.token, datagram_mac(target.token))
+        with self._lock:
+            seq = (self._seqs.get(key, 0) + 1) & 0xFFFFFFFF
+        packet = encode_datagram(mac[1], self._session, key, seq, body)
+        if len(packet) > MAX_DATAGRAM_BYTES:
+            return False
+        with self._lock:
+            self._seqs[key] = seq
+            if control_id is not None:
+                self._streams.setdefault(control_id, set()).add(key)
+        try:
+            self._sock.sendto(packet, addr)
+        except OSError:
+            # Unreachable host or a full socket buffer: the value is lost and
+            # the next one supersedes it.
+            self.errors += 1
+            return True
+        self.sent += 1
+        return True
+
+    def fence(self, control_id: int) -> dict | None:
+        # The last seq sent on each of the control's datagram streams. A reliable
+        # value_release carries it so the agent drops datagrams that arrive late.
+        with self._lock:
+            keys = self._streams.get(control_id)
+            if not keys:
+                return None
+            return {"session": self._session, "seqs": {str(key): self._seqs[key] for key in sorted(keys)}}
+
+    def _resolve(self, host: str) -> tuple | None:
+        # Never resolves on the caller's (GUI) thread: a host name is looked up
+        # in the background, and values take the reliable path until it is done.
+        cached = self._addr
+        if cached is not None and cached[0] == host:
+            return cached[1]
+        try:
+            ipaddress.IPv4Address(host)
+        except ValueError:
+            pass
+        else:
+            self._addr = (host, (host, self._port))
+            return self._addr[1]
+        with self._lock:
+            if self._resolving is not None:
+                return None
+            self._resolving = host
+        threading.Thread(target=self._lookup, args=(host,), daemon=True, name=f"datagram-dns-{self._agent_id}").start()
+        return None
+
+    def _lookup(self, host: str) -> None:
+        try:
+            info = socket.getaddrinfo(host, self._port, socket.AF_INET, socket.SOCK_DGRAM)
+            self._addr = (host, info[0][4])
+        except OSError:
+            # Unresolvable: the next datagram value tries again.
+            pass
+        finally:
+            with self._lock:
+                self._resolving = None
+
+    def close(self) -> None:
+        self._sock.close()
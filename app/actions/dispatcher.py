@@ -1,59 +1,656 @@
 from __future__ import annotations
 
+import itertools
+import json
+import logging
 import threading
-from queue import Queue
+from collections import deque
+from dataclasses import dataclass, field
 
 from ..settings.manager import SettingsManager
 from .client import AgentClient
+from .datagram import DATAGRAM_TRANSPORT, DatagramChannel, add_fence
+from .health import CircuitBreaker, HealthMonitor
+from .idempotency import RequestLedger
+from .macro import MACRO_ACTION, expand_macro
 import time
-from .mapping import action_to_agent_payload, build_request_id
-from ..data.models import Action
+from .mapping import (
+    Compiled,
+    action_to_agent_payload,
+    build_request_id,
+    compile_cached,
+    encode_agent_payload,
+    encode_datagram_payload,
+)
+from .queue import OVERFLOW_POLICIES, PRIORITIES, DispatchQueue, PendingCommand
+from .ratelimit import RateLimiter
+from .retry import RetryScheduler
+from .tracing import LatencyTracer
+from ..data.models import DEFAULT_AGENT, Action, OutboxEntry
+from ..data.outbox import Outbox
+
+
+@dataclass
+class DispatchShard:
+    index: int
+    queue: DispatchQueue
+    retries: RetryScheduler
+    in_flight: int = 0
+    # Controls with a parked retry; later commands wait here to keep per-control order.
+    holders: dict[int, PendingCommand] = field(default_factory=dict)
+    held: dict[int, deque[PendingCommand]] = field(default_factory=dict)
+    counters: dict[str, int] = field(
+        default_factory=lambda: {
+            "sent": 0, "retried": 0, "expired": 0, "failed": 0, "spilled": 0, "rejected": 0,
+            "limited": 0, "throttled": 0,
+        }
+    )
 
 
 class ActionDispatcher:
-    def __init__(self, settings: SettingsManager) -> None:
+    # Sends to one agent target. AgentRouter runs one of these per agent.
+    def __init__(
+        self,
+        settings: SettingsManager,
+        outbox: Outbox | None = None,
+        agent_id: str = DEFAULT_AGENT,
+        tracer: LatencyTracer | None = None,
+    ) -> None:
         self._settings = settings
-        self._queue: Queue[dict] = Queue()
-        self._client = AgentClient(settings)
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
-        self._health_ok = False
-        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._outbox = outbox
+        self._agent_id = agent_id
+        self._outbox_ttl = settings.get_int("outbox_ttl_s", 3600)
+        self._ttl = settings.get_int("dispatch_command_ttl_ms", 10000) / 1000.0
+        self._coalesce = settings.get_value("dispatch_coalesce") != "0"
+        self._tracer = tracer or LatencyTracer()
+        self._ledger = RequestLedger(settings.get_int("dispatch_dedup_capacity", 1024))
+        self._capacity = max(0, settings.get_int("dispatch_queue_capacity", 256))
+        self._block_timeout = settings.get_int("dispatch_block_timeout_ms", 50) / 1000.0
+        self._high_water = self._capacity * settings.get_int("dispatch_queue_high_pct", 80) / 100.0
+        self._low_water = self._capacity * settings.get_int("dispatch_queue_low_pct", 50) / 100.0
+        self._saturated = False
+        self._datagram: DatagramChannel | None = None
+        self._limiter = RateLimiter(agent_id, settings.get_rate_limits())
+        self._overflow: dict[str | None, str] = {}
+        self._weights = tuple(
+            max(1, settings.get_int(f"dispatch_weight_{name}", default))
+            for name, default in zip(PRIORITIES, (8, 4, 1))
+        )
+        self._health = HealthMonitor(
+            CircuitBreaker(
+                failure_threshold=settings.get_int("breaker_failure_threshold", 3),
+                open_timeout=settings.get_int("breaker_open_ms", 5000) / 1000.0,
+            ),
+            interval=settings.get_int("health_interval_ms", 2000) / 1000.0,
+            max_interval=settings.get_int("health_max_interval_ms", 10000) / 1000.0,
+            recovery_interval=settings.get_int("health_recovery_interval_ms", 500) / 1000.0,
+        )
+        self._start()
+
+    def _start(self) -> None:
+        self._workers = max(1, self._settings.get_int("dispatch_workers", 4))
+        self._client = AgentClient(self._settings, min_pool_size=self._workers + 1, agent_id=self._agent_id)
+        self._batch_enabled = self._settings.get_value("agent_batch_enabled") == "1"
+        self._batch_max = max(1, self._settings.get_int("agent_batch_max", 16))
+        self._batch_window = self._settings.get_int("agent_batch_window_ms", 5) / 1000.0
+        self._shards = [
+            DispatchShard(index=i, queue=self._build_queue(), retries=self._build_retries())
+            for i in range(self._workers)
+        ]
+        self._round_robin = itertools.count()
+        self._threads = [
+            threading.Thread(target=self._run, args=(shard,), daemon=True, name=f"dispatch-{self._agent_id}-{shard.index}")
+            for shard in self._shards
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True, name=f"health-{self._agent_id}")
         self._health_thread.start()
 
+    def _build_queue(self) -> DispatchQueue:
+        return DispatchQueue(
+            coalesce=self._coalesce,
+            capacity=self._capacity,
+            block_timeout=self._block_timeout,
+            weights=self._weights,
+            on_superseded=self._ledger.forget,
+        )
+
+    def _overflow_policy(self, action_type: str | None) -> str:
+        policy = self._overflow.get(action_type)
+        if policy is None:
+            policy = self._settings.get_value(f"dispatch_overflow_policy_{action_type}") if action_type else None
+            policy = policy or self._settings.get_value("dispatch_overflow_policy") or "drop_oldest"
+            if policy not in OVERFLOW_POLICIES:
+                policy = "drop_oldest"
+            self._overflow[action_type] = policy
+        return policy
+
+    def _build_retries(self) -> RetryScheduler:
+        return RetryScheduler(
+            max_attempts=self._settings.get_int("dispatch_retry_attempts", 3),
+            backoff=self._settings.get_int("dispatch_retry_backoff_ms", 500) / 1000.0,
+            max_backoff=self._settings.get_int("dispatch_retry_max_backoff_ms", 4000) / 1000.0,
+            jitter=self._settings.get_int("dispatch_retry_jitter_pct", 20) / 100.0,
+        )
+
     def enqueue(self, action: dict) -> None:
-        self._queue.put(action)
+        self._submit(
+            PendingCommand(
+                payload=action,
+                body=json.dumps(action).encode("utf-8"),
+                expires_at=self._expiry(),
+                overflow=self._overflow_policy(None),
+            )
+        )
 
     def enqueue_action_record(
         self,
         action: Action,
         request_id: str | None = None,
         context: dict | None = None,
+        input_at: float | None = None,
+        resolved_at: float | None = None,
+        compiled: Compiled | None = None,
     ) -> None:
-        payload = action_to_agent_payload(
-            action,
-            request_id=request_id or build_request_id(),
-            context=context,
+        if action.debounce_ms and not self._ledger.debounce((action.id, repr(context)), action.debounce_ms / 1000.0):
+            return
+        macro = action.action_type == MACRO_ACTION
+        compiled = compiled if compiled is not None else compile_cached(action)
+        if action.transport == DATAGRAM_TRANSPORT and action.trigger == "value_change" and not macro:
+            if self._send_datagram(action, context, input_at, resolved_at, compiled):
+                return
+        request_id = request_id or build_request_id()
+        payload = None
+        if macro:
+            # Macros keep the dict: the steps are checked here and expanded
+            # from it for agents without a macro route.
+            payload = action_to_agent_payload(action, request_id, context, compiled)
+            if not payload["payload"]["steps"]:
+                # Every step's condition was false for this input.
+                return
+            body = json.dumps(payload, allow_nan=False).encode("utf-8")
+        else:
+            body = encode_agent_payload(action, request_id, context, compiled)
+        if action.trigger == "value_release" and self._datagram is not None:
+            fence = self._datagram.fence(action.control_id)
+            if fence is not None:
+                body = add_fence(body, fence)
+        priority = action.priority if action.priority in PRIORITIES else default_priority(action.trigger)
+        self._submit(
+            PendingCommand(
+                payload=payload,
+                body=body,
+                request_id=request_id,
+                control_id=action.control_id,
+                action_id=action.id,
+                trigger=action.trigger,
+                expires_at=self._expiry(),
+                replay_policy=action.replay_policy or default_replay_policy(action.trigger),
+                trace=self._tracer.start(
+                    request_id, action.action_type, action.control_id, priority, input_at, resolved_at, self._agent_id
+                ),
+                overflow=self._overflow_policy(action.action_type),
+                priority=priority,
+                action_type=action.action_type,
+                macro=macro,
+            )
         )
-        self._queue.put(payload)
 
-    def _run(self) -> None:
+    def _send_datagram(
+        self,
+        action: Action,
+        context: dict | None,
+        input_at: float | None,
+        resolved_at: float | None,
+        compiled: Compiled,
+    ) -> bool:
+        # Sent from the caller's thread; a sendto() on a non-blocking UDP socket
+        # costs less than a queue hand-off.
+        if self._datagram is None:
+            self._datagram = DatagramChannel(self._settings, self._agent_id)
+        if not self._datagram.send(action.id, encode_datagram_payload(action, context, compiled), action.control_id):
+            return False
+        trace = self._tracer.start("", action.action_type, action.control_id, None, input_at, resolved_at, self._agent_id)
+        self._tracer.finish(trace, "datagram")
+        return True
+
+    def _submit(self, command: PendingCommand) -> None:
+        if self._ledger.begin(command.request_id):
+            dropped = self._shard_for(command).queue.put(command)
+            if dropped is not None:
+                self._settle(dropped, "dropped")
+
+    def _shard_for(self, command: PendingCommand) -> DispatchShard:
+        if command.control_id is None:
+            return self._shards[next(self._round_robin) % self._workers]
+        return self._shards[command.control_id % self._workers]
+
+    def _spill(self, command: PendingCommand) -> bool:
+        policy = command.replay_policy or "replay"
+        if self._outbox is None or policy == "drop":
+            return False
+        request_id = command.request_id or command.outbox_key or build_request_id()
+        if command.outbox_key != request_id:
+            # Coalesced into a newer value since it was replayed: the old row goes.
+            self._release(command)
+        command.outbox_key = None
+        self._outbox.add(
+            OutboxEntry(
+                request_id=request_id,
+                control_id=command.control_id,
+                action_id=command.action_id,
+                trigger=command.trigger,
+                replay_policy=policy,
+                payload_json=command.encoded().decode("utf-8"),
+                expires_at=time.time() + self._outbox_ttl if self._outbox_ttl > 0 else None,
+                agent_id=self._agent_id,
+            )
+        )
+        return True
+
+    def _replay_outbox(self) -> list[PendingCommand]:
+        if self._outbox is None:
+            return []
+        replayed = []
+        for entry in self._outbox.claim(self._agent_id):
+            payload = json.loads(entry.payload_json)
+            replayed.append(
+                PendingCommand(
+                    payload=payload,
+                    body=entry.payload_json.encode("utf-8"),
+                    control_id=entry.control_id,
+                    action_id=entry.action_id,
+                    trigger=entry.trigger,
+                    expires_at=self._expiry(),
+                    replay_policy=entry.replay_policy,
+                    overflow=self._overflow_policy(None),
+                    priority=default_priority(entry.trigger),
+                    macro=payload.get("action") == MACRO_ACTION,
+                    outbox_key=entry.request_id,
+                )
+            )
+        return replayed
+
+    def _release(self, command: PendingCommand) -> None:
+        if command.outbox_key is not None and self._outbox is not None:
+            self._outbox.settle(command.outbox_key, self._agent_id)
+            command.outbox_key = None
+
+    def shutdown(self) -> None:
+        # The outbox may be shared with other agents' dispatchers; its owner
+        # closes it once every dispatcher has spilled.
+        for command in self._pending_commands():
+            self._spill(command)
+
+    def _pending_commands(self) -> list[PendingCommand]:
+        pending: list[PendingCommand] = []
+        for shard in self._shards:
+            pending.extend(shard.retries.pop_all())
+            for held in list(shard.held.values()):
+                pending.extend(held)
+            pending.extend(shard.queue.drain())
+        return pending
+
+    def _expiry(self) -> float | None:
+        return time.monotonic() + self._ttl if self._ttl > 0 else None
+
+    def _run(self, shard: DispatchShard) -> None:
         while True:
-            action = self._queue.get()
-            self._send_with_retry(action)
-
-    def _send_with_retry(self, action: dict) -> None:
-        backoffs = [0.0, 0.5, 1.0]
-        for delay in backoffs:
-            if delay:
-                time.sleep(delay)
-            if self._client.send(action):
+            taken: list[PendingCommand] = []
+            try:
+                self._step(shard, taken)
+            except Exception:
+                # A bug on one path must not stop every control of this shard
+                # until restart.
+                logging.exception("Dispatch worker %s/%s failed; continuing", self._agent_id, shard.index)
+                self._abandon(shard, taken)
+
+    def _step(self, shard: DispatchShard, taken: list[PendingCommand]) -> None:
+        due = shard.retries.pop_due(time.monotonic())
+        taken.extend(due)
+        for command in due:
+            self._retry(shard, command)
+        timeout = shard.retries.time_until_next(time.monotonic())
+        if self._batch_enabled:
+            batch = shard.queue.get_batch(self._batch_max, self._batch_window, timeout)
+            taken.extend(batch)
+            for command in batch:
+                self._dequeued(command)
+            self._send_batch(shard, batch)
+            return
+        command = shard.queue.get(timeout)
+        if command is None:
+            return
+        taken.append(command)
+        self._dequeued(command)
+        if not self._hold(shard, command):
+            self._send(shard, command)
+
+    def _abandon(self, shard: DispatchShard, commands: list[PendingCommand]) -> None:
+        # Fail what the failed step was handling, unless it is still parked,
+        # held, or already settled, so no control waits on a lost holder.
+        waiting = {id(c) for c in shard.retries.commands()}
+        waiting.update(id(c) for held in shard.held.values() for c in held)
+        for command in commands:
+            if id(command) in waiting or not self._ledger.in_flight(command.request_id):
+                continue
+            try:
+                self._finish(shard, command, "failed")
+            except Exception:
+                logging.exception("Could not fail command %s", command.request_id)
+
+    def _dequeued(self, command: PendingCommand) -> None:
+        if command.trace is not None:
+            command.trace.mark_dequeued(time.monotonic())
+
+    def _hold(self, shard: DispatchShard, command: PendingCommand) -> bool:
+        if command.control_id is None or command.control_id not in shard.held:
+            return False
+        held = shard.held[command.control_id]
+        key = command.coalesce_key
+        if key is not None and held and held[-1].coalesce_key == key:
+            self._ledger.forget(held[-1].supersede(command))
+            held[-1].expires_at = command.expires_at
+            shard.queue.coalesced += 1
+        else:
+            if self._capacity and len(held) >= self._capacity:
+                shard.queue.dropped += 1
+                self._settle(held.popleft(), "dropped")
+            held.append(command)
+        return True
+
+    def _send(self, shard: DispatchShard, command: PendingCommand, throttle: bool = True) -> None:
+        now = time.monotonic()
+        if command.expired(now):
+            self._finish(shard, command, "expired")
+            return
+        if command.delay > 0:
+            # A macro step's delay runs in the timer heap, never as a sleep on
+            # this worker; later commands of the control wait behind it.
+            shard.retries.defer(command, now + command.delay)
+            command.delay = 0.0
+            command.deferred = True
+            self._make_holder(shard, command)
+            return
+        if throttle and self._throttle(shard, command, now):
+            return
+        if not self._health.breaker.allow():
+            self._reject(shard, command)
+            return
+        command.attempts += 1
+        if command.trace is not None:
+            command.trace.mark_send(now)
+        shard.in_flight += 1
+        try:
+            if command.macro:
+                ok = self._client.send_macro(command.request_id, command.encoded())
+            else:
+                ok = self._client.send(command.request_id, command.encoded())
+        finally:
+            shard.in_flight -= 1
+        if ok is None:
+            self._health.breaker.record_success()
+            self._expand(shard, command)
+            return
+        self._record_result(ok)
+        if ok:
+            self._finish(shard, command, "sent")
+        else:
+            self._park(shard, command)
+
+    def _send_batch(self, shard: DispatchShard, commands: list[PendingCommand]) -> None:
+        if any(command.macro or command.delay > 0 for command in commands):
+            # Macros and their steps keep their own route and timing.
+            for command in commands:
+                if not self._hold(shard, command):
+                    self._send(shard, command)
+            return
+        now = time.monotonic()
+        live = []
+        batched: dict[int, PendingCommand] = {}
+        for command in commands:
+            # A throttled command becomes a holder, so later ones of its control are held.
+            if self._hold(shard, command):
+                continue
+            if command.expired(now):
+                self._finish(shard, command, "expired")
+            elif command.control_id in batched:
+                # One command per control per batch: the rest wait for its
+                # result, so a failed item is never overtaken by a later one.
+                self._make_holder(shard, batched[command.control_id])
+                self._hold(shard, command)
+            elif not self._throttle(shard, command, now):
+                live.append(command)
+                if command.control_id is not None:
+                    batched[command.control_id] = command
+        # Commands in `live` already hold their rate-limit tokens.
+        if len(live) < 2:
+            for command in live:
+                self._send(shard, command, throttle=False)
+            return
+        if not self._health.breaker.allow():
+            for command in live:
+                self._reject(shard, command)
+            return
+        started = time.monotonic()
+        shard.in_flight += len(live)
+        try:
+            results = self._client.send_batch([c.encoded() for c in live])
+        finally:
+            shard.in_flight -= len(live)
+        if results is None:
+            # No batch route (404): the agent is reachable, so send one by one.
+            # Each is the only one of its control here; anything held behind
+            # it follows from _resolve().
+            self._health.breaker.record_success()
+            for command in live:
+                self._send(shard, command, throttle=False)
+            return
+        self._record_result(any(results))
+        for command, ok in zip(live, results):
+            command.attempts += 1
+            if command.trace is not None:
+                command.trace.mark_send(started)
+            if ok:
+                self._finish(shard, command, "sent")
+            else:
+                self._park(shard, command)
+
+    def _expand(self, shard: DispatchShard, command: PendingCommand) -> None:
+        # No macro route (404): run the steps as separate commands ahead of
+        # anything else queued for the control.
+        steps = expand_macro(command)
+        self._ledger.complete(command.request_id)
+        self._release(command)
+        if command.control_id is None:
+            for step in steps:
+                self._send(shard, step)
+            return
+        self._make_holder(shard, command)
+        shard.held[command.control_id].extendleft(reversed(steps))
+        self._resolve(shard, command)
+
+    def _record_result(self, ok: bool) -> None:
+        if ok:
+            self._health.record_success(passive=True)
+        else:
+            self._health.record_failure(passive=True)
+
+    def _rate_limit(self, command: PendingCommand, now: float) -> tuple[float, str]:
+        limits = self._settings.get_rate_limits()
+        if limits is not self._limiter.limits and limits != self._limiter.limits:
+            self._limiter = RateLimiter(self._agent_id, limits, self._limiter.limited)
+        if not self._limiter:
+            return 0.0, ""
+        return self._limiter.acquire(command, now)
+
+    def _throttle(self, shard: DispatchShard, command: PendingCommand, now: float) -> bool:
+        wait, mode = self._rate_limit(command, now)
+        if wait <= 0:
+            return False
+        if mode == "drop" or (mode == "coalesce" and self._superseded(shard, command)):
+            self._finish(shard, command, "limited")
+            return True
+        # Wait for a token in the timer heap, holding later commands of the
+        # control behind it like a parked retry.
+        if not command.deferred:
+            shard.counters["throttled"] += 1
+        command.deferred = True
+        shard.retries.defer(command, now + wait)
+        self._make_holder(shard, command)
+        return True
+
+    def _superseded(self, shard: DispatchShard, command: PendingCommand) -> bool:
+        if command.control_id is None:
+            return False
+        held = shard.held.get(command.control_id, ())
+        return any(c.action_id == command.action_id for c in held) or shard.queue.has_action(
+            command.control_id, command.action_id
+        )
+
+    def _reject(self, shard: DispatchShard, command: PendingCommand) -> None:
+        # Breaker is open: fail fast instead of waiting out a timeout per command.
+        self._finish(shard, command, "spilled" if self._spill(command) else "rejected")
+
+    def _retry(self, shard: DispatchShard, command: PendingCommand) -> None:
+        key = command.coalesce_key
+        held = shard.held.get(command.control_id, ()) if command.control_id is not None else ()
+        if key is not None and (shard.queue.has_pending(key) or any(c.coalesce_key == key for c in held)):
+            # A newer value for the same control is already waiting.
+            shard.queue.coalesced += 1
+            self._ledger.forget(command.request_id)
+            self._release(command)
+            self._resolve(shard, command)
+            return
+        if command.deferred:
+            command.deferred = False
+        else:
+            shard.counters["retried"] += 1
+        self._send(shard, command)
+
+    def _park(self, shard: DispatchShard, command: PendingCommand) -> None:
+        if shard.retries.park(command, time.monotonic()):
+            self._make_holder(shard, command)
+            return
+        self._finish(shard, command, "spilled" if self._spill(command) else "failed")
+
+    def _make_holder(self, shard: DispatchShard, command: PendingCommand) -> None:
+        if command.control_id is not None and command.control_id not in shard.holders:
+            shard.holders[command.control_id] = command
+            shard.held[command.control_id] = deque()
+
+    def _finish(self, shard: DispatchShard, command: PendingCommand, outcome: str) -> None:
+        shard.counters[outcome] += 1
+        self._settle(command, outcome)
+        self._resolve(shard, command)
+
+    def _settle(self, command: PendingCommand, outcome: str) -> None:
+        if outcome == "sent":
+            self._ledger.complete(command.request_id)
+        else:
+            self._ledger.forget(command.request_id)
+        if outcome != "spilled":
+            # A spilled command's row was rewritten by _spill().
+            self._release(command)
+        self._tracer.finish(command.trace, outcome)
+
+    def _resolve(self, shard: DispatchShard, command: PendingCommand) -> None:
+        if command.control_id is None or shard.holders.get(command.control_id) is not command:
+            return
+        del shard.holders[command.control_id]
+        held = shard.held.pop(command.control_id)
+        while held:
+            self._send(shard, held.popleft())
+            if command.control_id in shard.held:
+                shard.held[command.control_id].extend(held)
                 return
 
     def _health_loop(self) -> None:
         while True:
-            self._health_ok = self._client.health_check()
-            time.sleep(2.0)
+            self._health.wake.wait(self._health.next_probe_delay())
+            self._health.wake.clear()
+            if self._health.probe_needed():
+                if self._client.health_check():
+                    self._health.record_success()
+                else:
+                    self._health.record_failure()
+            if self._health.take_recovered():
+                for command in self._replay_outbox():
+                    self._submit(command)
 
     def last_health_ok(self) -> bool:
-        return self._health_ok
+        return self._health.healthy
+
+    def health_state(self) -> dict:
+        return self._health.snapshot()
+
+    def latency_snapshot(self) -> dict:
+        return self._tracer.snapshot()
+
+    def latency_p95(self) -> float | None:
+        return self._tracer.p95(agent_id=self._agent_id)
+
+    def rate_limit_stats(self) -> list[dict]:
+        return self._limiter.snapshot()
+
+    def backpressure(self) -> dict:
+        # High/low watermarks with hysteresis so the UI does not flicker at the edge.
+        depth = max(self._depths(), default=0)
+        if self._capacity:
+            if depth >= self._high_water:
+                self._saturated = True
+            elif depth <= self._low_water:
+                self._saturated = False
+        return {"saturated": self._saturated, "depth": depth, "capacity": self._capacity}
+
+    def _depths(self) -> list[int]:
+        return [shard.queue.qsize() + sum(len(h) for h in list(shard.held.values())) for shard in self._shards]
+
+    def stats(self) -> dict[str, int]:
+        totals: dict[str, int] = {}
+        for gauges in self.shard_stats():
+            for key, value in gauges.items():
+                if key != "shard":
+                    totals[key] = totals.get(key, 0) + value
+        totals.update(self._intake_stats())
+        return totals
+
+    def _intake_stats(self) -> dict[str, int]:
+        datagram = self._datagram
+        return {
+            "deduplicated": self._ledger.deduplicated,
+            "debounced": self._ledger.debounced,
+            "datagrams": datagram.sent if datagram is not None else 0,
+            "datagram_errors": datagram.errors if datagram is not None else 0,
+        }
+
+    def shard_stats(self) -> list[dict[str, int]]:
+        return [
+            {
+                "shard": shard.index,
+                "enqueued": shard.queue.enqueued,
+                "coalesced": shard.queue.coalesced,
+                "dropped": shard.queue.dropped,
+                "blocked": shard.queue.blocked,
+                "queued": shard.queue.qsize(),
+                **{f"queued_{name}": size for name, size in shard.queue.lane_sizes().items()},
+                "held": sum(len(h) for h in list(shard.held.values())),
+                "parked": len(shard.retries),
+                "in_flight": shard.in_flight,
+                **shard.counters,
+            }
+            for shard in self._shards
+        ]
+
+
+def default_replay_policy(trigger: str | None) -> str:
+    return "latest" if trigger in ("value_change", "value_release") else "replay"
+
+
+def default_priority(trigger: str | None) -> str:
+    if trigger == "value_change":
+        return "low"
+    if trigger in ("press", "toggle_on", "toggle_off", "value_release"):
+        return "high"
+    return "normal"
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, open_timeout: float = 5.0) -> None:
+        self._failure_threshold = max(1, failure_threshold)
+        self._open_timeout = open_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._since = time.time()
+        self._transitions: list[tuple[str, float]] = [(CLOSED, self._since)]
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_timeout:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self._failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "since": self._since,
+                "failures": self._failures,
+                "transitions": list(self._transitions),
+            }
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._since = time.time()
+        self._transitions.append((state, self._since))
+        del self._transitions[:-20]
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        interval: float = 2.0,
+        max_interval: float = 10.0,
+        recovery_interval: float = 0.5,
+    ) -> None:
+        self.breaker = breaker
+        self._interval = interval
+        self._max_interval = max(interval, max_interval)
+        self._recovery_interval = recovery_interval
+        self._lock = threading.Lock()
+        self._healthy = False
+        self._last_success = 0.0
+        self._probe_delay = interval
+        self._recovered = False
+        self.wake = threading.Event()
+        # Also called on every wake, for waiters that cannot block on `wake`.
+        self.on_wake: Callable[[], None] | None = None
+
+    @property
+    def healthy(self) -> bool:
+        return self._healthy
+
+    def record_success(self, passive: bool = False) -> None:
+        self.breaker.record_success()
+        with self._lock:
+            self._last_success = time.monotonic()
+            if not self._healthy:
+                self._healthy = True
+                self._recovered = True
+                self._probe_delay = self._interval
+                self._wake()
+            elif not passive:
+                # Each quiet, successful probe stretches the next one out.
+                self._probe_delay = min(self._max_interval, self._probe_delay * 2)
+
+    def record_failure(self, passive: bool = False) -> None:
+        self.breaker.record_failure()
+        with self._lock:
+            if passive and self._healthy and self.breaker.state != OPEN:
+                return
+            was_healthy = self._healthy
+            self._healthy = False
+            self._probe_delay = self._recovery_interval
+            if was_healthy:
+                self._wake()
+
+    def _wake(self) -> None:
+        self.wake.set()
+        if self.on_wake is not None:
+            self.on_wake()
+
+    def probe_needed(self) -> bool:
+        with self._lock:
+            return not self._healthy or time.monotonic() - self._last_success >= self._probe_delay
+
+    def next_probe_delay(self) -> float:
+        with self._lock:
+            if not self._healthy:
+                return self._recovery_interval
+            return max(0.0, self._probe_delay - (time.monotonic() - self._last_success))
+
+    def take_recovered(self) -> bool:
+        with self._lock:
+            recovered, self._recovered = self._recovered, False
+            return recovered
+
+    def snapshot(self) -> dict:
+        data = self.breaker.snapshot()
+        data["healthy"] = self._healthy
+        data["last_success"] = self._last_success
+        return data
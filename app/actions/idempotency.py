@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+IN_FLIGHT = "in_flight"
+COMPLETED = "completed"
+
+
+class RequestLedger:
+    # Bounded LRU of request ids the dispatcher has accepted. A command whose
+    # request_id is still in flight, or was delivered recently, is dropped.
+    def __init__(self, capacity: int = 1024) -> None:
+        self._capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._ids: OrderedDict[str, str] = OrderedDict()
+        self._presses: OrderedDict[Hashable, float] = OrderedDict()
+        self.deduplicated = 0
+        self.debounced = 0
+
+    def begin(self, request_id: str | None) -> bool:
+        if request_id is None:
+            return True
+        with self._lock:
+            if request_id in self._ids:
+                self._ids.move_to_end(request_id)
+                self.deduplicated += 1
+                return False
+            self._ids[request_id] = IN_FLIGHT
+            self._trim(self._ids)
+            return True
+
+    def complete(self, request_id: str | None) -> None:
+        if request_id is None:
+            return
+        with self._lock:
+            self._ids[request_id] = COMPLETED
+            self._ids.move_to_end(request_id)
+            self._trim(self._ids)
+
+    def forget(self, request_id: str | None) -> None:
+        # Undelivered (failed, expired, or spilled to the outbox): a later
+        # replay with the same id must be let through.
+        if request_id is None:
+            return
+        with self._lock:
+            if self._ids.get(request_id) == IN_FLIGHT:
+                del self._ids[request_id]
+
+    def in_flight(self, request_id: str | None) -> bool:
+        # Commands without a request_id are not tracked; count them as in flight.
+        if request_id is None:
+            return True
+        with self._lock:
+            return self._ids.get(request_id) == IN_FLIGHT
+
+    def debounce(self, key: Hashable, window: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._presses.get(key)
+            if last is not None and now - last < window:
+                self.debounced += 1
+                return False
+            self._presses[key] = now
+            self._presses.move_to_end(key)
+            self._trim(self._presses)
+            return True
+
+    def _trim(self, table: OrderedDict) -> None:
+        while len(table) > self._capacity:
+            table.popitem(last=False)
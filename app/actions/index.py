@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Iterable, Mapping
+
+from ..data.models import Action
+from .mapping import LOCAL_ACTION_TYPES, Compiled, compile_actions
+
+
+@dataclass(frozen=True)
+class ResolvedAction:
+    action: Action
+    # Agent ids to enqueue on; empty for actions handled on the device.
+    targets: tuple[str, ...]
+    # Parsed once for navigate_screen.
+    screen_id: int | None = None
+    # The payload template, compiled at config load; None for local actions.
+    compiled: Compiled | None = None
+
+    @property
+    def local(self) -> bool:
+        return self.action.action_type in LOCAL_ACTION_TYPES
+
+
+class ActionIndex:
+    # Ready-to-fire actions by (control_id, trigger), so an input event is one
+    # dict lookup. Never mutated: a config change builds a new index and the
+    # renderer swaps the reference.
+    def __init__(
+        self,
+        actions: Iterable[Action],
+        route: Callable[[str | None], tuple[str, ...]],
+        compiled: Mapping[int, Compiled] | None = None,
+    ) -> None:
+        # A layout cache hit passes the templates it compiled when written.
+        actions = list(actions)
+        if compiled is None:
+            compiled = compile_actions(actions)
+        entries: dict[tuple[int, str], list[ResolvedAction]] = {}
+        agent_targets: dict[int, set[str]] = {}
+        for action in actions:
+            if action.action_type in LOCAL_ACTION_TYPES:
+                entry = ResolvedAction(action=action, targets=(), screen_id=_screen_id(action))
+            elif action.id not in compiled:
+                logging.warning("Action %s has an invalid payload_json and will not fire", action.id)
+                continue
+            else:
+                entry = ResolvedAction(action=action, targets=route(action.agent_id), compiled=compiled[action.id])
+                agent_targets.setdefault(action.control_id, set()).update(entry.targets)
+            entries.setdefault((action.control_id, action.trigger), []).append(entry)
+        self._entries = MappingProxyType({key: tuple(value) for key, value in entries.items()})
+        self.agent_targets: Mapping[int, frozenset[str]] = MappingProxyType(
+            {control_id: frozenset(targets) for control_id, targets in agent_targets.items()}
+        )
+
+    def resolve(self, control_id: int, trigger: str) -> tuple[ResolvedAction, ...]:
+        return self._entries.get((control_id, trigger), ())
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+
+def _screen_id(action: Action) -> int | None:
+    if action.action_type != "navigate_screen":
+        return None
+    try:
+        return int(json.loads(action.payload_json).get("screen_id"))
+    except Exception:
+        return None
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import operator
+from dataclasses import dataclass, replace
+from typing import Any, Dict
+
+from ..data.models import Action
+from .queue import PendingCommand
+from .templates import CompiledAction, compile_action
+
+MACRO_ACTION = "macro"
+CONDITION_OPS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+@dataclass(frozen=True)
+class MacroStep:
+    compiled: CompiledAction
+    delay_ms: int
+    when: tuple[tuple[str, str, Any], ...]
+
+    def applies(self, context: Dict[str, Any]) -> bool:
+        for name, op, expected in self.when:
+            if name not in context:
+                return False
+            try:
+                if not CONDITION_OPS[op](context[name], expected):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+
+@dataclass(frozen=True)
+class CompiledMacro:
+    steps: tuple[MacroStep, ...]
+
+    def render(self, context: Dict[str, Any] | None = None) -> list[dict]:
+        # Conditions are settled here, on the Pi, so the agent only sees the steps to run.
+        context = context or {}
+        return [
+            {"action": step.compiled.action, "payload": step.compiled.render(context), "delay_ms": step.delay_ms}
+            for step in self.steps
+            if step.applies(context)
+        ]
+
+
+def compile_macro(action: Action) -> CompiledMacro:
+    try:
+        data = json.loads(action.payload_json)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid action payload_json: {exc}") from exc
+    steps = data.get("payload", {}).get("steps") if isinstance(data, dict) and isinstance(data.get("payload"), dict) else None
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("Macro payload must include a non-empty 'steps' list")
+    compiled = []
+    for idx, step in enumerate(steps):
+        if not isinstance(step, dict) or not isinstance(step.get("action"), str) or "payload" not in step:
+            raise ValueError(f"Macro step {idx} must include 'action' and 'payload'")
+        if step["action"] == MACRO_ACTION:
+            raise ValueError(f"Macro step {idx} cannot be another macro")
+        delay = step.get("delay_ms", 0)
+        if not isinstance(delay, int) or isinstance(delay, bool) or delay < 0:
+            raise ValueError(f"Macro step {idx} delay_ms must be a non-negative integer")
+        step_action = replace(
+            action,
+            action_type=step["action"],
+            payload_json=json.dumps({"action": step["action"], "payload": step["payload"]}),
+            value_key=None,
+        )
+        compiled.append(MacroStep(compiled=compile_action(step_action), delay_ms=delay, when=_conditions(idx, step.get("when"))))
+    return CompiledMacro(steps=tuple(compiled))
+
+
+def _conditions(idx: int, when: Any) -> tuple[tuple[str, str, Any], ...]:
+    # {"state": true} tests equality; {"value": {">=": 50}} applies operators.
+    if when is None:
+        return ()
+    if not isinstance(when, dict):
+        raise ValueError(f"Macro step {idx} 'when' must be an object")
+    conditions = []
+    for name, expected in when.items():
+        if isinstance(expected, dict):
+            for op, operand in expected.items():
+                if op not in CONDITION_OPS:
+                    raise ValueError(f"Macro step {idx} has unknown operator {op!r}")
+                conditions.append((name, op, operand))
+        else:
+            conditions.append((name, "==", expected))
+    return tuple(conditions)
+
+
+def expand_macro(command: PendingCommand) -> list[PendingCommand]:
+    # For agents without POST /command/macro: one command per step, each with
+    # its own derived request_id, in order on the macro's control.
+    steps = command.message().get("payload", {}).get("steps", [])
+    base = command.request_id or "macro"
+    expires_at = command.expires_at
+    expanded = []
+    for idx, step in enumerate(steps):
+        delay = step.get("delay_ms", 0) / 1000.0
+        if expires_at is not None:
+            expires_at += delay
+        expanded.append(
+            PendingCommand(
+                payload={"request_id": f"{base}:{idx}", "action": step["action"], "payload": step["payload"]},
+                control_id=command.control_id,
+                action_id=command.action_id,
+                trigger=command.trigger,
+                expires_at=expires_at,
+                replay_policy=command.replay_policy,
+                overflow=command.overflow,
+                priority=command.priority,
+                action_type=step["action"],
+                delay=delay,
+            )
+        )
+    if expanded:
+        expanded[-1].trace = command.trace
+    return expanded
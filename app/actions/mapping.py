@@ -2,49 +2,83 @@ from __future__ import annotations
 
 import json
 import uuid
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Union
 
 from ..data.models import Action
+from .macro import MACRO_ACTION, CompiledMacro, compile_macro
+from .templates import CompiledAction, compile_action
+
+LOCAL_ACTION_TYPES = {"navigate_screen", "show_resolution"}
+
+Compiled = Union[CompiledAction, CompiledMacro]
 
 
 def build_request_id() -> str:
     return str(uuid.uuid4())
 
 
-def _apply_context(obj: Any, context: Dict[str, Any]) -> Any:
-    if isinstance(obj, dict):
-        return {k: _apply_context(v, context) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_apply_context(v, context) for v in obj]
-    if isinstance(obj, str):
-        if obj == "${value}" and "value" in context:
-            return context["value"]
-        if obj == "${state}" and "state" in context:
-            return context["state"]
-    return obj
+def compile_payload(action: Action) -> Compiled:
+    return compile_macro(action) if action.action_type == MACRO_ACTION else compile_action(action)
+
+
+@lru_cache(maxsize=1024)
+def compile_cached(action: Action) -> Compiled:
+    # For callers with no ActionIndex entry (scripts, benchmarks). The UI fires
+    # with the template its index compiled at config load, whatever the size.
+    return compile_payload(action)
+
+
+def compile_actions(actions: Iterable[Action]) -> dict[int, Compiled]:
+    # Agent actions by id; local actions are skipped and invalid ones left out.
+    compiled: dict[int, Compiled] = {}
+    for action in actions:
+        if action.action_type in LOCAL_ACTION_TYPES:
+            continue
+        try:
+            compiled[action.id] = compile_payload(action)
+        except ValueError:
+            pass
+    return compiled
 
 
 def action_to_agent_payload(
     action: Action,
     request_id: str | None = None,
     context: Dict[str, Any] | None = None,
+    compiled: Compiled | None = None,
 ) -> Dict[str, Any]:
-    try:
-        data = json.loads(action.payload_json)
-    except json.JSONDecodeError as exc:
-        raise ValueError(f"Invalid action payload_json: {exc}") from exc
-
-    if "action" not in data or "payload" not in data:
-        raise ValueError("Action payload_json must include 'action' and 'payload'")
-
-    payload = data["payload"]
-    if context:
-        payload = _apply_context(payload, context)
-        if action.value_key and isinstance(payload, dict) and "value" in context:
-            payload[action.value_key] = context["value"]
-
+    compiled = compiled if compiled is not None else compile_cached(action)
+    if action.action_type == MACRO_ACTION:
+        return {
+            "request_id": request_id or build_request_id(),
+            "action": MACRO_ACTION,
+            "payload": {"steps": compiled.render(context)},
+        }
     return {
         "request_id": request_id or build_request_id(),
-        "action": data["action"],
-        "payload": payload,
+        "action": compiled.action,
+        "payload": compiled.render(context),
     }
+
+
+def encode_agent_payload(
+    action: Action,
+    request_id: str,
+    context: Dict[str, Any] | None = None,
+    compiled: Compiled | None = None,
+) -> bytes:
+    compiled = compiled if compiled is not None else compile_cached(action)
+    if action.action_type == MACRO_ACTION:
+        return json.dumps(action_to_agent_payload(action, request_id, context, compiled), allow_nan=False).encode("utf-8")
+    return compiled.encode(request_id, context)
+
+
+def encode_datagram_payload(
+    action: Action, context: Dict[str, Any] | None = None, compiled: CompiledAction | None = None
+) -> bytes:
+    # No request_id: datagrams are never retried or replayed.
+    compiled = compiled if compiled is not None else compile_cached(action)
+    return json.dumps(
+        {"action": compiled.action, "payload": compiled.render(context)}, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from .tracing import QUANTILES
+
+
+class MetricsTextfile:
+    # Periodically rewrites a Prometheus textfile (node_exporter textfile
+    # collector format). Nothing listens on the Pi; a collector reads the file.
+    def __init__(
+        self, path: str, interval: float, collect: Callable[[], tuple[dict, dict[str, int], list[dict]]]
+    ) -> None:
+        self._path = Path(path)
+        self._interval = interval
+        self._collect = collect
+        self._failed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="metrics-textfile")
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.write()
+            time.sleep(self._interval)
+
+    def write(self) -> None:
+        latency, stats, limits = self._collect()
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(render_prometheus(latency, stats, limits), encoding="utf-8")
+            os.replace(tmp, self._path)
+            self._failed = False
+        except OSError as exc:
+            if not self._failed:
+                logging.warning("Could not write metrics to %s: %s", self._path, exc)
+            self._failed = True
+
+
+def render_prometheus(latency: dict, stats: dict[str, int], limits: list[dict] | None = None) -> str:
+    lines: list[str] = []
+    _summary_family(
+        lines, "pi_controller_latency_seconds", "Touch-to-ack latency per pipeline stage.",
+        "stage", latency["stages"],
+    )
+    _summary_family(
+        lines, "pi_controller_action_latency_seconds", "Touch-to-ack latency per action type.",
+        "action_type", latency["actions"],
+    )
+    _summary_family(
+        lines, "pi_controller_control_latency_seconds", "Touch-to-ack latency per control.",
+        "control_id", latency["controls"],
+    )
+    _summary_family(
+        lines, "pi_controller_priority_latency_seconds", "Touch-to-ack latency per priority lane.",
+        "priority", latency["priorities"],
+    )
+    _summary_family(
+        lines, "pi_controller_agent_latency_seconds", "Touch-to-ack latency per agent target.",
+        "agent", latency["agents"],
+    )
+    lines.append("# HELP pi_controller_commands_total Finished agent commands by outcome.")
+    lines.append("# TYPE pi_controller_commands_total counter")
+    for outcome, count in latency["outcomes"].items():
+        lines.append(f'pi_controller_commands_total{{outcome="{outcome}"}} {count}')
+    lines.append("# HELP pi_controller_agent_commands_total Finished agent commands by target and outcome.")
+    lines.append("# TYPE pi_controller_agent_commands_total counter")
+    for agent in sorted(latency["agent_outcomes"]):
+        for outcome, count in latency["agent_outcomes"][agent].items():
+            lines.append(f'pi_controller_agent_commands_total{{agent="{_escape(agent)}",outcome="{outcome}"}} {count}')
+    lines.append("# HELP pi_controller_retries_total Command send retries.")
+    lines.append("# TYPE pi_controller_retries_total counter")
+    lines.append(f"pi_controller_retries_total {latency['retries']}")
+    lines.append("# HELP pi_controller_rate_limited_total Commands that found a rate-limit bucket empty.")
+    lines.append("# TYPE pi_controller_rate_limited_total counter")
+    for limit in limits or ():
+        labels = ",".join(f'{key}="{_escape(limit[key])}"' for key in ("agent", "scope", "target", "mode"))
+        lines.append(f"pi_controller_rate_limited_total{{{labels}}} {limit['limited']}")
+    lines.append("# HELP pi_controller_dispatch Dispatcher counters and gauges.")
+    lines.append("# TYPE pi_controller_dispatch gauge")
+    for key, value in sorted(stats.items()):
+        lines.append(f'pi_controller_dispatch{{stat="{key}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def _summary_family(lines: list[str], name: str, help_text: str, label: str, series: dict) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} summary")
+    for key in sorted(series):
+        summary = series[key]
+        value = _escape(key)
+        for q in QUANTILES:
+            if q in summary["quantiles"]:
+                lines.append(f'{name}{{{label}="{value}",quantile="{q}"}} {summary["quantiles"][q]:.6f}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {summary["sum"]:.6f}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {summary["count"]}')
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from .tracing import Trace
+
+COALESCE_TRIGGERS = {"value_change"}
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce", "block")
+PRIORITIES = ("high", "normal", "low")
+DEFAULT_WEIGHTS = (8, 4, 1)
+# Longest a "block" put() may stall the GUI (main) thread: about one frame.
+UI_BLOCK_LIMIT = 0.016
+
+
+@dataclass
+class PendingCommand:
+    # The command as a dict or as its encoded JSON body; whichever is missing
+    # is derived on first use, so the hot path only ever builds the body.
+    payload: dict | None = None
+    control_id: int | None = None
+    action_id: int | None = None
+    trigger: str | None = None
+    attempts: int = 0
+    expires_at: float | None = None
+    replay_policy: str | None = None
+    body: bytes | None = None
+    trace: Trace | None = None
+    overflow: str = "drop_oldest"
+    priority: str = "normal"
+    action_type: str | None = None
+    # Waiting for a rate-limit token rather than for a retry.
+    deferred: bool = False
+    # Sent to POST /command/macro, or expanded into its steps for older agents.
+    macro: bool = False
+    # Seconds to wait once this command reaches the front (a macro step's delay_ms).
+    delay: float = 0.0
+    # request_id of the outbox row this command replays; the row is deleted
+    # once the command settles.
+    outbox_key: str | None = None
+    # Read from `payload` when not given.
+    request_id: str | None = None
+
+    def __post_init__(self) -> None:
+        if self.request_id is None and self.payload is not None:
+            request_id = self.payload.get("request_id")
+            self.request_id = str(request_id) if request_id is not None else None
+
+    def message(self) -> dict:
+        if self.payload is None:
+            self.payload = json.loads(self.body)
+        return self.payload
+
+    def encoded(self) -> bytes:
+        if self.body is None:
+            self.body = json.dumps(self.payload).encode("utf-8")
+        return self.body
+
+    def supersede(self, newer: PendingCommand) -> str | None:
+        # Coalescing: keep this command's queue slot, send the newer value.
+        # Returns the replaced request_id, which will never be sent.
+        replaced = self.request_id
+        self.payload = newer.payload
+        self.body = newer.body
+        self.request_id = newer.request_id
+        self.trace = newer.trace
+        return replaced
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+    @property
+    def coalesce_key(self) -> tuple[int, int] | None:
+        if self.trigger not in COALESCE_TRIGGERS or self.control_id is None or self.action_id is None:
+            return None
+        return (self.control_id, self.action_id)
+
+
+def priority_rank(priority: str | None) -> int:
+    return PRIORITIES.index(priority) if priority in PRIORITIES else PRIORITIES.index("normal")
+
+
+class WeightedRoundRobin:
+    # Smooth weighted round robin over the lanes that currently have work.
+    def __init__(self, weights: tuple[int, ...]) -> None:
+        self._weights = weights
+        self._credit = [0] * len(weights)
+
+    def pick(self, active: list[bool]) -> int:
+        best = -1
+        total = 0
+        for idx, ready in enumerate(active):
+            if ready:
+                self._credit[idx] += self._weights[idx]
+                total += self._weights[idx]
+                if best < 0 or self._credit[idx] > self._credit[best]:
+                    best = idx
+        if best >= 0:
+            self._credit[best] -= total
+        return best
+
+    def reset(self, lane: int | None = None) -> None:
+        # An idle lane must not bank credit and then burst when work returns.
+        if lane is None:
+            self._credit = [0] * len(self._weights)
+        else:
+            self._credit[lane] = 0
+
+
+class DispatchQueue:
+    # One FIFO lane per priority class. Lanes are served by smooth weighted
+    # round robin, so higher lanes go first without starving lower ones. All
+    # queued commands of one control share a lane, which keeps per-control order.
+    def __init__(
+        self,
+        coalesce: bool = True,
+        capacity: int = 0,
+        block_timeout: float = 0.0,
+        weights: tuple[int, ...] = DEFAULT_WEIGHTS,
+        on_superseded: Callable[[str | None], None] | None = None,
+    ) -> None:
+        self._coalesce = coalesce
+        self._on_superseded = on_superseded
+        self._capacity = capacity
+        self._block_timeout = block_timeout
+        self._rr = WeightedRoundRobin(weights)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)
+        self._lanes: list[deque[PendingCommand]] = [deque() for _ in PRIORITIES]
+        self._size = 0
+        self._control_lane: dict[int, int] = {}
+        self._control_count: dict[int, int] = {}
+        self._latest: dict[tuple[int, int], PendingCommand] = {}
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.blocked = 0
+
+    def put(self, command: PendingCommand) -> PendingCommand | None:
+        # Returns the command that was dropped to stay within capacity, if any:
+        # either an older queued command or the new one itself.
+        with self._cond:
+            self.enqueued += 1
+            key = command.coalesce_key if self._coalesce else None
+            if key is not None and self._supersede(key, command):
+                return None
+            dropped = None
+            if self._capacity and self._size >= self._capacity:
+                dropped = self._overflow(command)
+                # A "block" wait releases the lock, so a command with the same
+                # key may have been queued meanwhile.
+                if key is not None and (dropped is None or dropped is command) and self._supersede(key, command):
+                    return None
+                if dropped is command:
+                    self.dropped += 1
+                    return command
+                if dropped is not None:
+                    self.dropped += 1
+            if key is not None:
+                self._latest[key] = command
+            elif command.control_id is not None:
+                self._seal(command.control_id)
+            lane = self._lane_for(command)
+            self._lanes[lane].append(command)
+            self._size += 1
+            if command.control_id is not None:
+                self._control_lane[command.control_id] = lane
+                self._control_count[command.control_id] = self._control_count.get(command.control_id, 0) + 1
+            self._cond.notify()
+            return dropped
+
+    def _supersede(self, key: tuple[int, int], command: PendingCommand) -> bool:
+        queued = self._latest.get(key)
+        if queued is None:
+            return False
+        replaced = queued.supersede(command)
+        if self._on_superseded is not None:
+            self._on_superseded(replaced)
+        self.coalesced += 1
+        return True
+
+    def _lane_for(self, command: PendingCommand) -> int:
+        lane = priority_rank(command.priority)
+        current = self._control_lane.get(command.control_id) if command.control_id is not None else None
+        if current is None or current <= lane:
+            return lane if current is None else current
+        # A more urgent command for this control: move its queued commands up
+        # with it so they are neither overtaken nor left behind.
+        source = self._lanes[current]
+        self._lanes[current] = deque(c for c in source if c.control_id != command.control_id)
+        self._lanes[lane].extend(c for c in source if c.control_id == command.control_id)
+        if not self._lanes[current]:
+            self._rr.reset(current)
+        return lane
+
+    def _overflow(self, command: PendingCommand) -> PendingCommand | None:
+        policy = command.overflow
+        if policy == "block":
+            self.blocked += 1
+            timeout = self._block_timeout
+            if threading.current_thread() is threading.main_thread():
+                timeout = min(timeout, UI_BLOCK_LIMIT)
+            self._space.wait_for(lambda: self._size < self._capacity, timeout)
+            return command if self._size >= self._capacity else None
+        if policy == "drop_newest":
+            return command
+        if policy == "coalesce" and command.control_id in self._control_lane:
+            lane = self._control_lane[command.control_id]
+            items = self._lanes[lane]
+            for idx in range(len(items) - 1, -1, -1):
+                queued = items[idx]
+                if queued.control_id == command.control_id and queued.action_id == command.action_id:
+                    del items[idx]
+                    self._untrack(lane, queued)
+                    return queued
+        # Shed from the least urgent lane first.
+        for lane in range(len(self._lanes) - 1, -1, -1):
+            if self._lanes[lane]:
+                oldest = self._lanes[lane].popleft()
+                self._untrack(lane, oldest)
+                return oldest
+        return None
+
+    def get(self, timeout: float | None = None) -> PendingCommand | None:
+        with self._cond:
+            if not self._size:
+                self._cond.wait(timeout)
+                if not self._size:
+                    return None
+            lane = self._rr.pick([bool(items) for items in self._lanes])
+            command = self._lanes[lane].popleft()
+            self._untrack(lane, command)
+            self._space.notify()
+            return command
+
+    def get_batch(self, max_items: int, window: float, timeout: float | None = None) -> list[PendingCommand]:
+        first = self.get(timeout)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + window
+        while len(batch) < max_items:
+            command = self.get(max(0.0, deadline - time.monotonic()))
+            if command is None:
+                break
+            batch.append(command)
+        return batch
+
+    def drain(self) -> list[PendingCommand]:
+        with self._cond:
+            items = [command for lane in self._lanes for command in lane]
+            for lane in self._lanes:
+                lane.clear()
+            self._rr.reset()
+            self._size = 0
+            self._control_lane.clear()
+            self._control_count.clear()
+            self._latest.clear()
+            self._space.notify_all()
+            return items
+
+    def has_pending(self, key: tuple[int, int]) -> bool:
+        with self._cond:
+            return key in self._latest
+
+    def has_action(self, control_id: int, action_id: int | None) -> bool:
+        with self._cond:
+            lane = self._control_lane.get(control_id)
+            if lane is None:
+                return False
+            return any(c.control_id == control_id and c.action_id == action_id for c in self._lanes[lane])
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def lane_sizes(self) -> dict[str, int]:
+        with self._cond:
+            return {name: len(items) for name, items in zip(PRIORITIES, self._lanes)}
+
+    def _untrack(self, lane: int, command: PendingCommand) -> None:
+        self._size -= 1
+        if not self._lanes[lane]:
+            self._rr.reset(lane)
+        control_id = command.control_id
+        if control_id is not None:
+            remaining = self._control_count[control_id] - 1
+            if remaining:
+                self._control_count[control_id] = remaining
+            else:
+                del self._control_count[control_id]
+                del self._control_lane[control_id]
+        key = command.coalesce_key
+        if key is not None and self._latest.get(key) is command:
+            del self._latest[key]
+
+    def _seal(self, control_id: int) -> None:
+        # A discrete command (e.g. value_release) must not be overtaken by later
+        # values merged into an older queued entry of the same control.
+        for key in [k for k in self._latest if k[0] == control_id]:
+            del self._latest[key]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from ..data.models import RateLimit
+from .queue import PendingCommand
+
+LIMIT_SCOPES = ("agent", "action_type", "control")
+LIMIT_MODES = ("delay", "coalesce", "drop")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = float(max(1, burst))
+        self._tokens = self.burst
+        self._stamp: float | None = None
+
+    def wait_time(self, now: float) -> float:
+        if self._stamp is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        return 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        self._tokens -= 1.0
+
+
+class RateLimiter:
+    # Token buckets for one agent's dispatcher. A command needs a token from
+    # every bucket that matches it (agent, action type, control); tokens are
+    # only taken once all of them have one.
+    def __init__(self, agent_id: str, limits: list[RateLimit], limited: dict[tuple[str, str], int] | None = None) -> None:
+        self.limits = limits
+        self._agent_id = agent_id
+        self._lock = threading.Lock()
+        self._rules: dict[tuple[str, str], tuple[RateLimit, TokenBucket]] = {}
+        # Carried over when the limits are edited, so counters stay monotonic.
+        self.limited: dict[tuple[str, str], int] = dict(limited or {})
+        for limit in limits:
+            if limit.scope not in LIMIT_SCOPES or limit.mode not in LIMIT_MODES or limit.rate <= 0:
+                logging.warning("Ignoring invalid rate limit %s (%s=%s)", limit.id, limit.scope, limit.target)
+                continue
+            if limit.scope == "agent" and limit.target != agent_id:
+                continue
+            self._rules[(limit.scope, limit.target)] = (limit, TokenBucket(limit.rate, limit.burst))
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def acquire(self, command: PendingCommand, now: float) -> tuple[float, str]:
+        # Returns (0, "") when the command may go now, else the time until it
+        # could and the strictest mode among the buckets that are empty.
+        keys = [("agent", self._agent_id)]
+        if command.action_type is not None:
+            keys.append(("action_type", command.action_type))
+        if command.control_id is not None:
+            keys.append(("control", str(command.control_id)))
+        with self._lock:
+            matched = [self._rules[key] for key in keys if key in self._rules]
+            wait = 0.0
+            mode = ""
+            for limit, bucket in matched:
+                needed = bucket.wait_time(now)
+                if needed > 0:
+                    wait = max(wait, needed)
+                    if not mode or LIMIT_MODES.index(limit.mode) > LIMIT_MODES.index(mode):
+                        mode = limit.mode
+                    key = (limit.scope, limit.target)
+                    self.limited[key] = self.limited.get(key, 0) + 1
+            if wait > 0:
+                return wait, mode
+            for _, bucket in matched:
+                bucket.take()
+            return 0.0, ""
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "agent": self._agent_id,
+                    "scope": limit.scope,
+                    "target": limit.target,
+                    "mode": limit.mode,
+                    "limited": self.limited.get(key, 0),
+                }
+                for key, (limit, _) in self._rules.items()
+            ]
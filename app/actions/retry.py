@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+
+from .queue import PendingCommand
+
+
+class RetryScheduler:
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 4.0,
+        jitter: float = 0.2,
+    ) -> None:
+        self._max_attempts = max(1, max_attempts)
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._jitter = jitter
+        self._heap: list[tuple[float, int, PendingCommand]] = []
+        self._seq = itertools.count()
+
+    def park(self, command: PendingCommand, now: float) -> bool:
+        delay = self.delay_for(command, now)
+        if delay is None:
+            return False
+        heapq.heappush(self._heap, (now + delay, next(self._seq), command))
+        return True
+
+    def defer(self, command: PendingCommand, due: float) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), command))
+
+    def delay_for(self, command: PendingCommand, now: float) -> float | None:
+        if command.attempts >= self._max_attempts:
+            return None
+        delay = min(self._max_backoff, self._backoff * (2 ** (command.attempts - 1)))
+        delay = max(0.0, delay * (1.0 + random.uniform(-self._jitter, self._jitter)))
+        if command.expires_at is not None and now + delay >= command.expires_at:
+            return None
+        return delay
+
+    def pop_due(self, now: float) -> list[PendingCommand]:
+        due: list[PendingCommand] = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def pop_all(self) -> list[PendingCommand]:
+        parked = [entry[2] for entry in sorted(self._heap)]
+        self._heap.clear()
+        return parked
+
+    def commands(self) -> list[PendingCommand]:
+        return [entry[2] for entry in self._heap]
+
+    def time_until_next(self, now: float) -> float | None:
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+
+from ..data.models import DEFAULT_AGENT, Action
+from ..data.outbox import Outbox
+from ..settings.manager import SettingsManager
+from .dispatcher import ActionDispatcher
+from .mapping import Compiled, build_request_id
+from .tracing import LatencyTracer
+
+BROADCAST = "*"
+
+
+def parse_agent_ids(value: str | None) -> list[str]:
+    # NULL is the default agent, "game,audio" fans out to both, "*" to every agent.
+    ids: list[str] = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if part and part not in ids:
+            ids.append(part)
+    return ids or [DEFAULT_AGENT]
+
+
+class AgentRouter:
+    # One dispatcher per agent target, each with its own connection pool,
+    # queues, health monitor, and breaker, so a slow or offline machine never
+    # holds up commands for the others. Latency is traced in one shared tracer.
+    def __init__(
+        self,
+        settings: SettingsManager,
+        outbox: Outbox | None = None,
+        engine: type[ActionDispatcher] = ActionDispatcher,
+    ) -> None:
+        self._settings = settings
+        self._outbox = outbox
+        self._tracer = LatencyTracer()
+        # Agents are read once; adding or removing one takes a restart. Host,
+        # port, and token edits are picked up live by each dispatcher.
+        self._dispatchers = {
+            agent_id: engine(settings, outbox, agent_id=agent_id, tracer=self._tracer)
+            for agent_id in settings.get_agent_targets()
+        }
+        self._routes: dict[str | None, tuple[str, ...]] = {}
+
+    def agent_ids(self) -> list[str]:
+        return list(self._dispatchers)
+
+    def route(self, agent_id: str | None) -> tuple[str, ...]:
+        route = self._routes.get(agent_id)
+        if route is None:
+            ids = parse_agent_ids(agent_id)
+            if BROADCAST in ids:
+                ids = list(self._dispatchers)
+            route = tuple(i for i in ids if i in self._dispatchers)
+            missing = [i for i in ids if i not in self._dispatchers]
+            if missing:
+                logging.warning("Unknown or disabled agent(s) %s in route %r", ", ".join(missing), agent_id)
+            self._routes[agent_id] = route
+        return route
+
+    def enqueue(self, action: dict) -> None:
+        self._dispatchers[DEFAULT_AGENT].enqueue(action)
+
+    def enqueue_action_record(
+        self,
+        action: Action,
+        request_id: str | None = None,
+        context: dict | None = None,
+        input_at: float | None = None,
+        resolved_at: float | None = None,
+        targets: tuple[str, ...] | None = None,
+        compiled: Compiled | None = None,
+    ) -> None:
+        # Fan-out only enqueues; each agent's own workers send concurrently.
+        # Every target gets the same request_id so its traces line up.
+        # `targets` and `compiled` come from an ActionIndex entry.
+        request_id = request_id or build_request_id()
+        for agent_id in self.route(action.agent_id) if targets is None else targets:
+            self._dispatchers[agent_id].enqueue_action_record(action, request_id, context, input_at, resolved_at, compiled)
+
+    def shutdown(self) -> None:
+        for dispatcher in self._dispatchers.values():
+            dispatcher.shutdown()
+        # Shared by every dispatcher: closed once, after all have spilled.
+        if self._outbox is not None:
+            self._outbox.close()
+
+    def last_health_ok(self) -> bool:
+        return all(dispatcher.last_health_ok() for dispatcher in self._dispatchers.values())
+
+    def health_state(self) -> dict:
+        return self._dispatchers[DEFAULT_AGENT].health_state()
+
+    def agent_health(self) -> list[dict]:
+        targets = self._settings.get_agent_targets()
+        states = []
+        for agent_id, dispatcher in self._dispatchers.items():
+            target = targets.get(agent_id)
+            state = dispatcher.health_state()
+            state["agent_id"] = agent_id
+            state["name"] = target.name if target is not None else agent_id
+            states.append(state)
+        return states
+
+    def latency_snapshot(self) -> dict:
+        return self._tracer.snapshot()
+
+    def latency_p95(self, agent_id: str | None = None) -> float | None:
+        return self._tracer.p95(agent_id=agent_id)
+
+    def backpressure(self) -> dict:
+        states = {agent_id: dispatcher.backpressure() for agent_id, dispatcher in self._dispatchers.items()}
+        return {
+            "saturated": any(state["saturated"] for state in states.values()),
+            "depth": max(state["depth"] for state in states.values()),
+            "capacity": max(state["capacity"] for state in states.values()),
+            "agents": [agent_id for agent_id, state in states.items() if state["saturated"]],
+        }
+
+    def stats(self) -> dict[str, int]:
+        totals: dict[str, int] = {}
+        for dispatcher in self._dispatchers.values():
+            for key, value in dispatcher.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def agent_stats(self) -> dict[str, dict[str, int]]:
+        return {agent_id: dispatcher.stats() for agent_id, dispatcher in self._dispatchers.items()}
+
+    def rate_limit_stats(self) -> list[dict]:
+        return [limit for dispatcher in self._dispatchers.values() for limit in dispatcher.rate_limit_stats()]
+
+    def shard_stats(self) -> list[dict[str, int]]:
+        return [gauges for dispatcher in self._dispatchers.values() for gauges in dispatcher.shard_stats()]
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+
+from ..data.models import DEFAULT_AGENT
+from ..settings.manager import AgentTarget, SettingsManager
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 1 << 20
+PROTOCOL_VERSION = 1
+
+
+class StreamClosed(Exception):
+    pass
+
+
+def encode_frame(message: dict) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+def encode_command_frame(body: bytes) -> bytes:
+    # A command's HTTP body with the frame type spliced in, not re-encoded.
+    rest = body.strip()[1:].lstrip()
+    message = b'{"type":"command"' + (rest if rest.startswith(b"}") else b"," + rest)
+    return FRAME_HEADER.pack(len(message)) + message
+
+
+def read_frame(reader) -> dict:
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        raise StreamClosed("connection closed")
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise StreamClosed(f"frame too large: {length}")
+    body = reader.read(length)
+    if len(body) < length:
+        raise StreamClosed("connection closed mid-frame")
+    message = json.loads(body)
+    if not isinstance(message, dict):
+        raise StreamClosed("frame is not a JSON object")
+    return message
+
+
+class _Waiter:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.ok = False
+
+
+class StreamChannel:
+    def __init__(self, settings: SettingsManager, agent_id: str = DEFAULT_AGENT) -> None:
+        self._settings = settings
+        self._agent_id = agent_id
+        self._port = settings.get_int("agent_stream_port", 8766)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._sock: socket.socket | None = None
+        self._key: tuple[str, str] | None = None
+        self._pending: dict[str, _Waiter] = {}
+        self._ping_ids = itertools.count(1)
+        self._last_pong = 0.0
+        self._thread = threading.Thread(target=self._connect_loop, daemon=True, name=f"agent-stream-{agent_id}")
+        self._thread.start()
+
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def send(self, target: AgentTarget, request_id: str | None, body: bytes, timeout: float = 2.0) -> bool | None:
+        if not request_id or not self._matches(target):
+            return None
+        waiter = self._request(request_id, encode_command_frame(body), timeout)
+        return None if waiter is None else waiter.ok
+
+    def ping(self, timeout: float = 1.0) -> bool:
+        ping_id = f"ping-{next(self._ping_ids)}"
+        waiter = self._request(ping_id, encode_frame({"type": "ping", "id": ping_id}), timeout)
+        return waiter is not None and waiter.ok
+
+    def close(self) -> None:
+        self._drop_connection()
+
+    def _request(self, key: str, frame: bytes, timeout: float) -> _Waiter | None:
+        waiter = _Waiter()
+        with self._lock:
+            if self._sock is None:
+                return None
+            self._pending[key] = waiter
+        try:
+            self._write(frame)
+        except OSError:
+            self._drop_connection()
+            return None
+        waiter.event.wait(timeout)
+        with self._lock:
+            self._pending.pop(key, None)
+        return waiter
+
+    def _write(self, frame: bytes) -> None:
+        sock = self._sock
+        if sock is None:
+            raise OSError("stream not connected")
+        with self._write_lock:
+            sock.sendall(frame)
+
+    def _matches(self, target: AgentTarget) -> bool:
+        key = self._key
+        if key is not None and key != (target.host, target.token):
+            # Agent settings changed; the connect loop reconnects to the new target.
+            self._drop_connection()
+            return False
+        return key is not None
+
+    def _connect_loop(self) -> None:
+        backoff = 0.5
+        while True:
+            target = self._settings.get_agent_target(self._agent_id)
+            key = (target.host, target.token)
+            try:
+                sock = socket.create_connection((target.host, self._port), timeout=2.0)
+            except OSError:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                reader = sock.makefile("rb")
+                sock.sendall(encode_frame({"type": "hello", "version": PROTOCOL_VERSION, "token": target.token}))
+                reply = read_frame(reader)
+                if reply.get("type") != "hello_ack" or reply.get("ok") is not True:
+                    raise StreamClosed("agent rejected stream handshake")
+                sock.settimeout(None)
+                with self._lock:
+                    self._sock = sock
+                    self._key = key
+                backoff = 0.5
+                self._read_loop(reader)
+            except (OSError, ValueError, StreamClosed):
+                pass
+            self._drop_connection(sock)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+    def _read_loop(self, reader) -> None:
+        while True:
+            message = read_frame(reader)
+            kind = message.get("type")
+            if kind == "ack":
+                self._complete(str(message.get("request_id")), message.get("ok") is True)
+            elif kind == "pong":
+                self._last_pong = time.monotonic()
+                self._complete(str(message.get("id")), True)
+            elif kind == "ping":
+                self._write(encode_frame({"type": "pong", "id": message.get("id")}))
+
+    def _complete(self, key: str, ok: bool) -> None:
+        with self._lock:
+            waiter = self._pending.pop(key, None)
+        if waiter is not None:
+            waiter.ok = ok
+            waiter.event.set()
+
+    def _drop_connection(self, sock: socket.socket | None = None) -> None:
+        with self._lock:
+            if sock is not None and sock is not self._sock:
+                sock.close()
+                return
+            current, self._sock, self._key = self._sock, None, None
+            pending, self._pending = self._pending, {}
+        if current is not None:
+            try:
+                current.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            current.close()
+        for waiter in pending.values():
+            waiter.event.set()
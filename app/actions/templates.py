@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict
+
+from ..data.models import Action
+
+_PLACEHOLDER = re.compile(r"\$\{(value|state)\}")
+_SENTINEL = "\x00pi-tc-hole-{}\x00"
+REQUEST_ID_HOLE = -1
+VALUE_KEY_HOLE = -2
+
+Path = tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Slot:
+    path: Path
+    source: str
+    # Exact slots ("${value}") take the raw context value; template slots
+    # ("vol=${value}%") interpolate it into the surrounding text.
+    parts: tuple[str, ...]
+    names: tuple[str, ...]
+    exact: bool
+
+    def render(self, context: Dict[str, Any]) -> Any:
+        if self.exact:
+            name = self.names[0]
+            return context[name] if name in context else self.source
+        out = [self.parts[0]]
+        for name, part in zip(self.names, self.parts[1:]):
+            out.append(_format(context[name]) if name in context else "${" + name + "}")
+            out.append(part)
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class BodyTemplate:
+    segments: tuple[bytes, ...]
+    holes: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+    action: str
+    payload: Any
+    slots: tuple[Slot, ...]
+    value_key: str | None
+    body: BodyTemplate
+    body_with_value: BodyTemplate | None
+
+    def render(self, context: Dict[str, Any] | None = None) -> Any:
+        if not context:
+            return self.payload
+        payload = self.payload
+        if isinstance(payload, (dict, list)):
+            payload = _copy(payload)
+        for slot in self.slots:
+            if not slot.path:
+                payload = slot.render(context)
+                continue
+            parent = _writable_parent(payload, slot.path)
+            parent[slot.path[-1]] = slot.render(context)
+        if self.body_with_value is not None and "value" in context:
+            payload[self.value_key] = context["value"]
+        return payload
+
+    def encode(self, request_id: str, context: Dict[str, Any] | None = None) -> bytes:
+        context = context or {}
+        template = self.body_with_value if self.body_with_value is not None and "value" in context else self.body
+        out = [template.segments[0]]
+        for hole, segment in zip(template.holes, template.segments[1:]):
+            if hole == REQUEST_ID_HOLE:
+                value: Any = request_id
+            elif hole == VALUE_KEY_HOLE:
+                value = context["value"]
+            else:
+                value = self.slots[hole].render(context)
+            out.append(_encode_value(value))
+            out.append(segment)
+        return b"".join(out)
+
+
+def compile_action(action: Action) -> CompiledAction:
+    try:
+        data = json.loads(action.payload_json)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid action payload_json: {exc}") from exc
+
+    if not isinstance(data, dict) or "action" not in data or "payload" not in data:
+        raise ValueError("Action payload_json must include 'action' and 'payload'")
+
+    payload = data["payload"]
+    slots: list[Slot] = []
+    _collect_slots(payload, (), slots)
+    with_value = bool(action.value_key) and isinstance(payload, dict)
+    return CompiledAction(
+        action=data["action"],
+        payload=payload,
+        slots=tuple(slots),
+        value_key=action.value_key,
+        body=_body_template(data["action"], payload, slots, None),
+        body_with_value=_body_template(data["action"], payload, slots, action.value_key) if with_value else None,
+    )
+
+
+def _collect_slots(obj: Any, path: Path, slots: list[Slot]) -> None:
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            _collect_slots(value, path + (key,), slots)
+    elif isinstance(obj, list):
+        for idx, value in enumerate(obj):
+            _collect_slots(value, path + (idx,), slots)
+    elif isinstance(obj, str):
+        pieces = _PLACEHOLDER.split(obj)
+        if len(pieces) > 1:
+            parts = tuple(pieces[0::2])
+            slots.append(
+                Slot(path=path, source=obj, parts=parts, names=tuple(pieces[1::2]), exact=parts == ("", ""))
+            )
+
+
+def _body_template(action: str, payload: Any, slots: list[Slot], value_key: str | None) -> BodyTemplate:
+    # Encode the request once with sentinel strings in every hole, then cut the
+    # bytes at the sentinels. Filling the holes with json.dumps() of the values
+    # reproduces json.dumps() of the full request byte for byte.
+    skeleton = _copy(payload) if isinstance(payload, (dict, list)) else payload
+    for idx, slot in enumerate(slots):
+        if value_key is not None and slot.path and slot.path[0] == value_key:
+            continue
+        if not slot.path:
+            skeleton = _SENTINEL.format(idx)
+            continue
+        _writable_parent(skeleton, slot.path)[slot.path[-1]] = _SENTINEL.format(idx)
+    if value_key is not None:
+        skeleton[value_key] = _SENTINEL.format(VALUE_KEY_HOLE)
+    text = json.dumps(
+        {"request_id": _SENTINEL.format(REQUEST_ID_HOLE), "action": action, "payload": skeleton},
+        allow_nan=False,
+    )
+    pattern = re.compile(r'"\\u0000pi-tc-hole-(-?\d+)\\u0000"')
+    segments: list[bytes] = []
+    holes: list[int] = []
+    pos = 0
+    for match in pattern.finditer(text):
+        segments.append(text[pos:match.start()].encode("ascii"))
+        holes.append(int(match.group(1)))
+        pos = match.end()
+    segments.append(text[pos:].encode("ascii"))
+    return BodyTemplate(segments=tuple(segments), holes=tuple(holes))
+
+
+def _copy(obj: Any) -> Any:
+    return dict(obj) if isinstance(obj, dict) else list(obj)
+
+
+def _writable_parent(root: Any, path: Path) -> Any:
+    # Copy-on-write along the slot path so the compiled template is never mutated.
+    node = root
+    for key in path[:-1]:
+        child = _copy(node[key])
+        node[key] = child
+        node = child
+    return node
+
+
+def _encode_value(value: Any) -> bytes:
+    # Scalars skip the json.dumps() machinery; the output matches it exactly.
+    kind = type(value)
+    if kind is str:
+        return encode_basestring_ascii(value).encode("ascii")
+    if kind is int:
+        return int.__repr__(value).encode("ascii")
+    if kind is float and math.isfinite(value):
+        return float.__repr__(value).encode("ascii")
+    if value is None:
+        return b"null"
+    if kind is bool:
+        return b"true" if value else b"false"
+    return json.dumps(value, allow_nan=False).encode("ascii")
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
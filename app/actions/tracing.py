@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+# Log-linear (HDR-style) buckets over microseconds: values below 32 us get
+# their own bucket, above that every power of two is split into 16 buckets,
+# so a recorded latency is reported within ~6% of its true value.
+_SUB_BUCKETS = 16
+_LINEAR = 2 * _SUB_BUCKETS
+_MAX_US = (1 << 31) - 1
+_BUCKETS = _SUB_BUCKETS * (_MAX_US.bit_length() - 4) + _SUB_BUCKETS
+
+STAGES = ("ui", "enqueue", "queue", "dispatch", "network", "total")
+OUTCOMES = ("sent", "failed", "expired", "rejected", "spilled", "dropped", "datagram", "limited")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket(us: int) -> int:
+    if us < _LINEAR:
+        return max(0, us)
+    shift = min(us, _MAX_US).bit_length() - 5
+    return shift * _SUB_BUCKETS + (min(us, _MAX_US) >> shift)
+
+
+def _bucket_value(index: int) -> float:
+    if index < _LINEAR:
+        return float(index)
+    shift = index // _SUB_BUCKETS - 1
+    low = (index - shift * _SUB_BUCKETS) << shift
+    return low + (1 << shift) / 2
+
+
+class LatencyHistogram:
+    # Quantiles cover the last `window * windows` seconds; sum/count are cumulative.
+    def __init__(self, window: float = 10.0, windows: int = 6) -> None:
+        self._window = window
+        self._windows: deque[tuple[float, list[int]]] = deque(maxlen=windows)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float, now: float) -> None:
+        if not self._windows or now - self._windows[-1][0] >= self._window:
+            self._windows.append((now, [0] * _BUCKETS))
+        self._windows[-1][1][_bucket(int(seconds * 1_000_000))] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, now: float, qs: tuple[float, ...] = QUANTILES) -> tuple[int, dict[float, float]]:
+        horizon = self._window * (self._windows.maxlen or 1)
+        merged = [0] * _BUCKETS
+        seen = 0
+        for start, counts in self._windows:
+            if now - start >= horizon:
+                continue
+            for index, n in enumerate(counts):
+                if n:
+                    merged[index] += n
+            seen += sum(counts)
+        if not seen:
+            return 0, {}
+        result: dict[float, float] = {}
+        running = 0
+        pending = sorted(qs)
+        for index, n in enumerate(merged):
+            running += n
+            while pending and running >= pending[0] * seen:
+                result[pending.pop(0)] = _bucket_value(index) / 1_000_000
+            if not pending:
+                break
+        return seen, result
+
+
+@dataclass
+class Trace:
+    request_id: str
+    action_type: str | None = None
+    control_id: int | None = None
+    priority: str | None = None
+    agent_id: str | None = None
+    input_at: float | None = None
+    resolved_at: float | None = None
+    enqueued_at: float | None = None
+    dequeued_at: float | None = None
+    sent_at: float | None = None
+    retries: list[float] = field(default_factory=list)
+    responded_at: float | None = None
+
+    def mark_dequeued(self, now: float) -> None:
+        if self.dequeued_at is None:
+            self.dequeued_at = now
+
+    def mark_send(self, now: float) -> None:
+        if self.sent_at is None:
+            self.sent_at = now
+        else:
+            self.retries.append(now)
+
+    def spans(self) -> list[tuple[str, float]]:
+        last_send = self.retries[-1] if self.retries else self.sent_at
+        points = (
+            ("ui", self.input_at, self.resolved_at),
+            ("enqueue", self.resolved_at, self.enqueued_at),
+            ("queue", self.enqueued_at, self.dequeued_at),
+            ("dispatch", self.dequeued_at, self.sent_at),
+            ("network", last_send, self.responded_at),
+            ("total", self.input_at or self.resolved_at or self.enqueued_at, self.responded_at),
+        )
+        return [(stage, end - begin) for stage, begin, end in points if begin is not None and end is not None]
+
+
+class LatencyTracer:
+    def __init__(self, window: float = 10.0, windows: int = 6) -> None:
+        self._window = window
+        self._windows = windows
+        self._lock = threading.Lock()
+        self._stages = {stage: LatencyHistogram(window, windows) for stage in STAGES}
+        self._by_action: dict[str, LatencyHistogram] = {}
+        self._by_control: dict[int, LatencyHistogram] = {}
+        self._by_priority: dict[str, LatencyHistogram] = {}
+        self._by_agent: dict[str, LatencyHistogram] = {}
+        self._outcomes = dict.fromkeys(OUTCOMES, 0)
+        self._agent_outcomes: dict[str, dict[str, int]] = {}
+        self._retries = 0
+
+    def start(
+        self,
+        request_id: str,
+        action_type: str | None = None,
+        control_id: int | None = None,
+        priority: str | None = None,
+        input_at: float | None = None,
+        resolved_at: float | None = None,
+        agent_id: str | None = None,
+    ) -> Trace:
+        return Trace(
+            request_id=request_id,
+            action_type=action_type,
+            control_id=control_id,
+            priority=priority,
+            agent_id=agent_id,
+            input_at=input_at,
+            resolved_at=resolved_at,
+            enqueued_at=time.monotonic(),
+        )
+
+    def finish(self, trace: Trace | None, outcome: str) -> None:
+        if trace is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes[outcome] += 1
+            if trace.agent_id is not None:
+                per_agent = self._agent_outcomes.get(trace.agent_id)
+                if per_agent is None:
+                    per_agent = self._agent_outcomes[trace.agent_id] = dict.fromkeys(OUTCOMES, 0)
+                per_agent[outcome] += 1
+            self._retries += len(trace.retries)
+            if outcome != "sent":
+                return
+            trace.responded_at = now
+            for stage, seconds in trace.spans():
+                self._stages[stage].record(seconds, now)
+                if stage != "total":
+                    continue
+                if trace.action_type is not None:
+                    self._histogram(self._by_action, trace.action_type).record(seconds, now)
+                if trace.control_id is not None:
+                    self._histogram(self._by_control, trace.control_id).record(seconds, now)
+                if trace.priority is not None:
+                    self._histogram(self._by_priority, trace.priority).record(seconds, now)
+                if trace.agent_id is not None:
+                    self._histogram(self._by_agent, trace.agent_id).record(seconds, now)
+
+    def _histogram(self, table: dict, key) -> LatencyHistogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = LatencyHistogram(self._window, self._windows)
+        return histogram
+
+    def p95(self, min_samples: int = 5, agent_id: str | None = None) -> float | None:
+        with self._lock:
+            histogram = self._stages["total"] if agent_id is None else self._by_agent.get(agent_id)
+            if histogram is None:
+                return None
+            seen, result = histogram.quantiles(time.monotonic(), (0.95,))
+        return result[0.95] if seen >= min_samples else None
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "stages": {stage: _summary(h, now) for stage, h in self._stages.items()},
+                "actions": {key: _summary(h, now) for key, h in self._by_action.items()},
+                "controls": {key: _summary(h, now) for key, h in self._by_control.items()},
+                "priorities": {key: _summary(h, now) for key, h in self._by_priority.items()},
+                "agents": {key: _summary(h, now) for key, h in self._by_agent.items()},
+                "outcomes": dict(self._outcomes),
+                "agent_outcomes": {key: dict(counts) for key, counts in self._agent_outcomes.items()},
+                "retries": self._retries,
+            }
+
+
+def _summary(histogram: LatencyHistogram, now: float) -> dict:
+    seen, result = histogram.quantiles(now)
+    return {"window_count": seen, "count": histogram.count, "sum": histogram.total, "quantiles": result}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..settings.manager import AgentTarget
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class AgentTransport:
+    def __init__(self, pool_size: int = 4, idle_timeout: float = 30.0) -> None:
+        self._pool_size = max(1, pool_size)
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._key: tuple[str, int, str] | None = None
+        self._last_used = 0.0
+        self._urls: dict[tuple[str, int, str], str] = {}
+
+    def post(
+        self,
+        target: AgentTarget,
+        path: str,
+        payload: dict,
+        timeout: float,
+        idempotency_key: str | None = None,
+    ) -> requests.Response:
+        session = self._session_for(target)
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return session.post(self._url(target, path), json=payload, headers=headers, timeout=timeout)
+
+    def post_body(
+        self,
+        target: AgentTarget,
+        path: str,
+        body: bytes,
+        timeout: float,
+        idempotency_key: str | None = None,
+    ) -> requests.Response:
+        session = self._session_for(target)
+        headers = {**JSON_HEADERS, "Idempotency-Key": idempotency_key} if idempotency_key else JSON_HEADERS
+        return session.post(self._url(target, path), data=body, headers=headers, timeout=timeout)
+
+    def get(self, target: AgentTarget, path: str, timeout: float) -> requests.Response:
+        session = self._session_for(target)
+        return session.get(self._url(target, path), timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _session_for(self, target: AgentTarget) -> requests.Session:
+        key = (target.host, target.port, target.token)
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle_timeout > 0 and now - self._last_used > self._idle_timeout
+            if self._session is None or key != self._key or idle:
+                self._close_locked()
+                self._session = self._build_session(target)
+                self._key = key
+            self._last_used = now
+            return self._session
+
+    def _build_session(self, target: AgentTarget) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size, max_retries=0)
+        session.mount("http://", adapter)
+        session.headers["Authorization"] = f"Bearer {target.token}"
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    def _close_locked(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._key = None
+        self._urls.clear()
+
+    def _url(self, target: AgentTarget, path: str) -> str:
+        key = (target.host, target.port, path)
+        url = self._urls.get(key)
+        if url is None:
+            url = self._urls[key] = f"http://{target.host}:{target.port}{path}"
+        return url
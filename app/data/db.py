@@ -1,22 +1,73 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Iterator
+from typing import TYPE_CHECKING, Iterator
 
 from .schema import MIGRATIONS
 
+if TYPE_CHECKING:
+    from .writebehind import WriteBehind
+
+BUSY_TIMEOUT_S = 5.0
+MMAP_BYTES = 64 * 2**20
+STATEMENT_CACHE = 256
+
 
 class Database:
     def __init__(self, path: str) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Bumped on every settings write so readers can cache derived values.
+        self.settings_version = 0
+        # Set by the app to defer control_state and settings writes; None writes through.
+        self.write_behind: WriteBehind | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[tuple[threading.Thread, sqlite3.Connection]] = []
 
     def connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path)
+        # One long-lived connection per thread (GUI, dispatcher shards, outbox
+        # flusher), so statements stay prepared and nothing reopens the file.
+        # `with db.connect() as conn:` still commits or rolls back the block.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_S, check_same_thread=False, cached_statements=STATEMENT_CACHE
+        )
         conn.row_factory = sqlite3.Row
+        # WAL lets the GUI read while a dispatcher thread writes; NORMAL only
+        # syncs at checkpoints, which is still crash-safe in WAL mode.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        with self._lock:
+            # A thread that has exited cannot close its own connection.
+            live = []
+            for thread, other in self._connections:
+                if thread.is_alive():
+                    live.append((thread, other))
+                else:
+                    other.close()
+            live.append((threading.current_thread(), conn))
+            self._connections = live
         return conn
 
+    def close(self) -> None:
+        if self.write_behind is not None:
+            self.write_behind.close()
+            self.write_behind = None
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            conn.close()
+        self._local = threading.local()
+
     def migrate(self) -> None:
         with self.connect() as conn:
             conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
@@ -31,11 +82,15 @@ class Database:
     def reset(self) -> None:
         with self.connect() as conn:
             conn.executescript("""
+            DROP TABLE IF EXISTS outbox;
             DROP TABLE IF EXISTS actions;
+            DROP TABLE IF EXISTS agents;
+            DROP TABLE IF EXISTS rate_limits;
             DROP TABLE IF EXISTS control_state;
             DROP TABLE IF EXISTS controls;
             DROP TABLE IF EXISTS screens;
             DROP TABLE IF EXISTS settings;
+            DROP TABLE IF EXISTS layout_version;
             DROP TABLE IF EXISTS schema_version;
             """)
             conn.commit()
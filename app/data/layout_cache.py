@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Mapping
+
+from ..actions.mapping import Compiled, compile_actions
+from .db import Database
+from .models import Action, ConfigSnapshot
+from .repository import Repository, build_snapshot
+from .schema import MIGRATIONS
+
+LAYOUT_MAGIC = b"PTCL"
+# Bump when the stored rows or the compiled template classes change.
+LAYOUT_FORMAT = 3
+# magic, format, schema version, layout_version, layout stamp
+LAYOUT_HEADER = struct.Struct(">4sHIQ16s")
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+LAYOUT_KEY_SQL = "SELECT (SELECT MAX(version) FROM schema_version), version, stamp FROM layout_version"
+# The key plus the uncached control state and settings in one statement: a
+# single statement reads one snapshot without an explicit transaction.
+LAYOUT_BOOT_SQL = (
+    "SELECT (SELECT MAX(version) FROM schema_version), version, stamp, "
+    "(SELECT json_group_array(json_array(control_id, value)) FROM control_state), "
+    "(SELECT json_group_object(key, value) FROM settings) "
+    "FROM layout_version"
+)
+
+
+class LayoutCache:
+    # Screens, controls, actions, and their compiled payload templates,
+    # pickled next to the database and keyed by the schema version and the
+    # trigger-maintained layout_version counter and random stamp. A hit at
+    # boot skips migrate(), the seed check, and the layout queries; control
+    # state and settings change too often to cache and are still read from
+    # the database.
+    def __init__(self, db: Database, path: str | None = None) -> None:
+        self._db = db
+        self.path = Path(path) if path else db.path.with_name(db.path.name + ".layout")
+        self._written: tuple[int, int, bytes] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # Called on the refresh thread with the new actions and their compiled
+        # templates each time a changed layout is written.
+        self.on_change: Callable[[list[Action], Mapping[int, Compiled]], None] | None = None
+
+    def layout_key(self) -> tuple[int, int, bytes] | None:
+        try:
+            with self._db.connect() as conn:
+                return _key(conn.execute(LAYOUT_KEY_SQL).fetchone())
+        except sqlite3.Error:
+            # A new database, or one from before layout_version existed.
+            return None
+
+    def load(self) -> ConfigSnapshot | None:
+        try:
+            with self._db.connect() as conn:
+                row = conn.execute(LAYOUT_BOOT_SQL).fetchone()
+        except sqlite3.Error:
+            # Also a database from before the layout stamp (migration 012).
+            return None
+        key = _key(row)
+        if key is None or key[0] != SCHEMA_VERSION:
+            return None
+        # Nothing unpickled or built below forms a reference cycle, and the
+        # collector would otherwise walk the new objects over and over.
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, fmt, *stored = LAYOUT_HEADER.unpack_from(mapped)
+                if magic != LAYOUT_MAGIC or fmt != LAYOUT_FORMAT or tuple(stored) != key:
+                    return None
+                with memoryview(mapped)[LAYOUT_HEADER.size:] as body:
+                    screens, controls, actions, compiled = pickle.loads(body)
+            if not screens:
+                return None
+            states = dict(json.loads(row[3]))
+            settings = json.loads(row[4])
+            config = build_snapshot(screens, controls, actions, states, settings, compiled_actions=compiled)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or corrupt: boot the slow way and rewrite it.
+            logging.warning("Ignoring unreadable layout cache %s", self.path, exc_info=True)
+            return None
+        finally:
+            if collecting:
+                gc.enable()
+        self._written = key
+        return config
+
+    def refresh(self) -> bool:
+        # Keyed before reading: a change that lands during the read leaves an
+        # older key on the file, so the next refresh writes it again.
+        key = self.layout_key()
+        if key is None or key == self._written:
+            return False
+        screens, controls, actions, _, _ = Repository(self._db).snapshot_rows()
+        actions = [tuple(row) for row in actions]
+        # Compiled here, off the GUI thread: unpickling the templates is about
+        # three times cheaper than compiling them at boot.
+        action_list = [Action(*row) for row in actions]
+        compiled = compile_actions(action_list)
+        # Plain row tuples unpickle far faster than the dataclasses, and
+        # build_snapshot() makes the same objects a database boot would.
+        data = ([tuple(row) for row in screens], [tuple(row) for row in controls], actions, compiled)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_FORMAT, *key))
+            pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self._written = key
+        if self.on_change is not None:
+            self.on_change(action_list, compiled)
+        return True
+
+    def start(self, interval: float = 5.0) -> None:
+        self._thread = threading.Thread(target=self._refresh_loop, args=(interval,), daemon=True, name="layout-cache")
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        # The UI is gone; only the file is still worth writing.
+        self.on_change = None
+        try:
+            self.refresh()
+        except (sqlite3.Error, OSError):
+            logging.warning("Could not write layout cache %s", self.path, exc_info=True)
+
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError):
+                logging.warning("Could not write layout cache %s", self.path, exc_info=True)
+            self._stop.wait(interval)
+
+
+def _key(row: sqlite3.Row | None) -> tuple[int, int, bytes] | None:
+    if row is None or row[0] is None or row[1] is None or row[2] is None:
+        return None
+    return int(row[0]), int(row[1]), bytes(row[2])
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Mapping, Optional
+
+DEFAULT_AGENT = "default"
 
 
 @dataclass(frozen=True)
@@ -47,6 +49,31 @@ class Action:
     action_type: str
     payload_json: str
     value_key: Optional[str]
+    replay_policy: Optional[str] = None
+    debounce_ms: Optional[int] = None
+    priority: Optional[str] = None
+    agent_id: Optional[str] = None
+    transport: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Agent:
+    id: str
+    name: Optional[str]
+    host: str
+    port: int
+    token: Optional[str]
+    enabled: bool
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    id: int
+    scope: str
+    target: str
+    rate: float
+    burst: int
+    mode: str
 
 
 @dataclass(frozen=True)
@@ -59,3 +86,44 @@ class ControlState:
 class Setting:
     key: str
     value: Optional[str]
+
+
+@dataclass(frozen=True)
+class OutboxEntry:
+    request_id: str
+    control_id: Optional[int]
+    action_id: Optional[int]
+    trigger: Optional[str]
+    replay_policy: str
+    payload_json: str
+    expires_at: Optional[float]
+    agent_id: str = DEFAULT_AGENT
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    # Everything the renderer builds from, read in one transaction. The
+    # mappings are read-only views; a config change loads a new snapshot.
+    screens: tuple[Screen, ...]
+    controls_by_screen: Mapping[int, tuple[Control, ...]]
+    actions: tuple[Action, ...]
+    actions_by_control: Mapping[int, tuple[Action, ...]]
+    control_state: Mapping[int, Optional[str]]
+    settings: Mapping[str, Optional[str]]
+    # Compiled payload templates of the valid agent actions by id, when the
+    # layout cache had them; None means the action index compiles them.
+    compiled_actions: Optional[Mapping[int, Any]] = None
+
+    def controls_for_screen(self, screen_id: int) -> tuple[Control, ...]:
+        return self.controls_by_screen.get(screen_id, ())
+
+    def actions_for_control(self, control_id: int) -> tuple[Action, ...]:
+        return self.actions_by_control.get(control_id, ())
+
+    def get_control_state(self, control_id: int) -> Optional[ControlState]:
+        if control_id not in self.control_state:
+            return None
+        return ControlState(control_id=control_id, value=self.control_state[control_id])
+
+    def get_setting(self, key: str) -> Optional[str]:
+        return self.settings.get(key)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+from .db import Database
+from .models import DEFAULT_AGENT, OutboxEntry
+
+REPLAY_POLICIES = {"replay", "drop", "latest"}
+
+
+class Outbox:
+    def __init__(self, db: Database, flush_interval: float = 1.0, flush_batch: int = 64) -> None:
+        self._db = db
+        self._flush_interval = flush_interval
+        self._flush_batch = max(1, flush_batch)
+        self._cond = threading.Condition()
+        self._buffer: list[OutboxEntry] = []
+        # Rows handed out by claim() and not yet settled, by (request_id, agent_id).
+        self._claimed: set[tuple[str, str]] = set()
+        self._settled: list[tuple[str, str]] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="outbox-writer")
+        self._thread.start()
+
+    def add(self, entry: OutboxEntry) -> None:
+        if entry.replay_policy == "drop":
+            return
+        with self._cond:
+            # Spilled again after a claim: the row is back to waiting for replay.
+            self._claimed.discard((entry.request_id, entry.agent_id))
+            if entry.replay_policy == "latest":
+                self._buffer = [e for e in self._buffer if not _same_slot(e, entry)]
+            self._buffer.append(entry)
+            if len(self._buffer) >= self._flush_batch:
+                self._cond.notify()
+
+    def flush(self) -> None:
+        with self._cond:
+            pending, self._buffer = self._buffer, []
+            settled, self._settled = self._settled, []
+        if not pending and not settled:
+            return
+        try:
+            self._write(pending, settled)
+        except sqlite3.Error:
+            with self._cond:
+                self._buffer = pending + self._buffer
+                self._settled = settled + self._settled
+            raise
+
+    def _write(self, pending: list[OutboxEntry], settled: list[tuple[str, str]]) -> None:
+        with self._db.connect() as conn:
+            conn.executemany("DELETE FROM outbox WHERE request_id = ? AND agent_id = ?", settled)
+            for entry in pending:
+                if entry.replay_policy == "latest":
+                    conn.execute(
+                        "DELETE FROM outbox WHERE replay_policy = 'latest' AND control_id IS ? AND action_id IS ? AND agent_id = ?",
+                        (entry.control_id, entry.action_id, entry.agent_id),
+                    )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO outbox (
+                        request_id, agent_id, control_id, action_id, trigger, replay_policy,
+                        payload_json, expires_at, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                    """,
+                    (
+                        entry.request_id,
+                        entry.agent_id,
+                        entry.control_id,
+                        entry.action_id,
+                        entry.trigger,
+                        entry.replay_policy,
+                        entry.payload_json,
+                        entry.expires_at,
+                    ),
+                )
+            conn.commit()
+
+    def claim(self, agent_id: str = DEFAULT_AGENT) -> list[OutboxEntry]:
+        # Rows stay in the table until settle(): if the process dies while the
+        # replayed commands are still queued, the next start replays them again.
+        self.flush()
+        with self._db.connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE agent_id = ? AND expires_at <= ?", (agent_id, time.time()))
+            rows = conn.execute(
+                """
+                SELECT request_id, control_id, action_id, trigger, replay_policy, payload_json, expires_at, agent_id
+                FROM outbox
+                WHERE agent_id = ?
+                ORDER BY id ASC
+                """,
+                (agent_id,),
+            ).fetchall()
+            conn.commit()
+        entries = []
+        with self._cond:
+            for row in rows:
+                key = (row["request_id"], agent_id)
+                if key not in self._claimed:
+                    self._claimed.add(key)
+                    entries.append(OutboxEntry(**dict(row)))
+        return entries
+
+    def settle(self, request_id: str, agent_id: str = DEFAULT_AGENT) -> None:
+        # A claimed command was delivered or finally given up on; its row is
+        # deleted with the next flush.
+        key = (request_id, agent_id)
+        with self._cond:
+            if key in self._claimed:
+                self._claimed.discard(key)
+                self._settled.append(key)
+
+    def pending_count(self) -> int:
+        with self._db.connect() as conn:
+            row = conn.execute("SELECT COUNT(*) AS c FROM outbox").fetchone()
+        with self._cond:
+            return int(row["c"]) + len(self._buffer)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self._flush_batch:
+                    self._cond.wait(self._flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # SD card or lock trouble: keep running, the next cycle retries.
+                time.sleep(self._flush_interval)
+
+
+def _same_slot(a: OutboxEntry, b: OutboxEntry) -> bool:
+    return (
+        a.replay_policy == "latest"
+        and a.control_id == b.control_id
+        and a.action_id == b.action_id
+        and a.agent_id == b.agent_id
+    )
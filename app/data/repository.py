@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
 
 from .db import Database
-from .models import Action, Control, ControlState, Screen, Setting
+from .models import Action, Agent, ConfigSnapshot, Control, ControlState, RateLimit, Screen, Setting
 
 
 class Repository:
@@ -37,7 +38,7 @@ class Repository:
         with self._db.connect() as conn:
             rows = conn.execute(
                 """
-                SELECT id, control_id, trigger, action_type, payload_json, value_key
+                SELECT id, control_id, trigger, action_type, payload_json, value_key, replay_policy, debounce_ms, priority, agent_id, transport
                 FROM actions
                 WHERE control_id = ?
                 """,
@@ -45,7 +46,69 @@ class Repository:
             ).fetchall()
         return [Action(**dict(row)) for row in rows]
 
+    def list_actions(self) -> list[Action]:
+        with self._db.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, control_id, trigger, action_type, payload_json, value_key, replay_policy, debounce_ms, priority, agent_id, transport
+                FROM actions
+                ORDER BY id ASC
+                """
+            ).fetchall()
+        return [Action(**dict(row)) for row in rows]
+
+    def list_agents(self) -> list[Agent]:
+        with self._db.connect() as conn:
+            rows = conn.execute("SELECT id, name, host, port, token, enabled FROM agents ORDER BY id ASC").fetchall()
+        return [Agent(**dict(row)) for row in rows]
+
+    def upsert_agent(self, agent: Agent) -> None:
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO agents (id, name, host, port, token, enabled, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    host = excluded.host,
+                    port = excluded.port,
+                    token = excluded.token,
+                    enabled = excluded.enabled,
+                    updated_at = excluded.updated_at
+                """,
+                (agent.id, agent.name, agent.host, agent.port, agent.token, int(agent.enabled)),
+            )
+            conn.commit()
+        # Agent targets are cached against the settings version.
+        self._db.settings_version += 1
+
+    def list_rate_limits(self) -> list[RateLimit]:
+        with self._db.connect() as conn:
+            rows = conn.execute("SELECT id, scope, target, rate, burst, mode FROM rate_limits ORDER BY id ASC").fetchall()
+        return [RateLimit(**dict(row)) for row in rows]
+
+    def upsert_rate_limit(self, limit: RateLimit) -> None:
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO rate_limits (scope, target, rate, burst, mode, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+                ON CONFLICT(scope, target) DO UPDATE SET
+                    rate = excluded.rate,
+                    burst = excluded.burst,
+                    mode = excluded.mode,
+                    updated_at = excluded.updated_at
+                """,
+                (limit.scope, limit.target, limit.rate, limit.burst, limit.mode),
+            )
+            conn.commit()
+        self._db.settings_version += 1
+
     def get_control_state(self, control_id: int) -> Optional[ControlState]:
+        if self._db.write_behind is not None:
+            found, value = self._db.write_behind.control_state(control_id)
+            if found:
+                return ControlState(control_id=control_id, value=value)
         with self._db.connect() as conn:
             row = conn.execute(
                 "SELECT control_id, value FROM control_state WHERE control_id = ?",
@@ -54,6 +117,9 @@ class Repository:
         return ControlState(**dict(row)) if row else None
 
     def set_control_state(self, control_id: int, value: str) -> None:
+        if self._db.write_behind is not None:
+            self._db.write_behind.set_control_state(control_id, value)
+            return
         with self._db.connect() as conn:
             conn.execute(
                 """
@@ -68,11 +134,19 @@ class Repository:
             conn.commit()
 
     def get_setting(self, key: str) -> Optional[Setting]:
+        if self._db.write_behind is not None:
+            found, value = self._db.write_behind.setting(key)
+            if found:
+                return Setting(key=key, value=value)
         with self._db.connect() as conn:
             row = conn.execute("SELECT key, value FROM settings WHERE key = ?", (key,)).fetchone()
         return Setting(**dict(row)) if row else None
 
     def set_setting(self, key: str, value: str) -> None:
+        if self._db.write_behind is not None:
+            self._db.write_behind.set_setting(key, value)
+            self._db.settings_version += 1
+            return
         with self._db.connect() as conn:
             conn.execute(
                 """
@@ -85,6 +159,59 @@ class Repository:
                 (key, value),
             )
             conn.commit()
+        self._db.settings_version += 1
+
+    def load_snapshot(self) -> ConfigSnapshot:
+        return build_snapshot(*self.snapshot_rows())
+
+    def snapshot_rows(self) -> tuple[list, list, list, dict[int, Optional[str]], dict[str, Optional[str]]]:
+        writes = self._db.write_behind
+        if writes is None:
+            screens, controls, actions, states, settings = self._snapshot_rows()
+            pending_states, pending_settings = {}, {}
+        else:
+            # No deferred write may commit between the read and taking the
+            # pending values, or the overlay could hide a newer stored value.
+            with writes.paused():
+                screens, controls, actions, states, settings = self._snapshot_rows()
+                pending_states, pending_settings = writes.pending()
+        state_map = {row["control_id"]: row["value"] for row in states}
+        state_map.update(pending_states)
+        setting_map = {row["key"]: row["value"] for row in settings}
+        setting_map.update(pending_settings)
+        return screens, controls, actions, state_map, setting_map
+
+    def _snapshot_rows(self) -> tuple[list, list, list, list, list]:
+        # One read transaction with a query per table instead of one per screen
+        # and control; WAL keeps it consistent without blocking writers.
+        with self._db.connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                screens = conn.execute(
+                    "SELECT id, name, order_index, bg_color, bg_image_path, bg_image_mode FROM screens ORDER BY order_index ASC"
+                ).fetchall()
+                controls = conn.execute(
+                    """
+                    SELECT id, screen_id, type, label, row, col, rowspan, colspan,
+                           min_value, max_value, step, is_continuous, default_value,
+                           persist_state, style_bg, style_fg, icon_path, width_hint, height_hint
+                           , setting_key, placeholder_text
+                    FROM controls
+                    ORDER BY screen_id ASC, row ASC, col ASC
+                    """
+                ).fetchall()
+                actions = conn.execute(
+                    """
+                    SELECT id, control_id, trigger, action_type, payload_json, value_key, replay_policy, debounce_ms, priority, agent_id, transport
+                    FROM actions
+                    ORDER BY id ASC
+                    """
+                ).fetchall()
+                states = conn.execute("SELECT control_id, value FROM control_state").fetchall()
+                settings = conn.execute("SELECT key, value FROM settings").fetchall()
+            finally:
+                conn.rollback()
+        return screens, controls, actions, states, settings
 
     def insert_seed_data(self) -> None:
         with self._db.connect() as conn:
@@ -153,23 +280,30 @@ class Repository:
                 (15, 3, 'setting_text', 'Slider Handle', 10, 0, 1, 2, NULL, NULL, NULL, NULL, NULL, 0,
                  '#1e293b', '#ffffff', NULL, 2, 1, 'theme_slider_handle', '#f59e0b', datetime('now'), datetime('now')),
                 (18, 3, 'setting_dropdown', 'Resolution', 11, 0, 1, 2, NULL, NULL, NULL, NULL, '1024x600', 0,
-                 '#1e293b', '#ffffff', NULL, 2, 1, 'resolution', NULL, datetime('now'), datetime('now'));
+                 '#1e293b', '#ffffff', NULL, 2, 1, 'resolution', NULL, datetime('now'), datetime('now')),
+                (22, 3, 'latency_debug', 'Latency', 12, 0, 1, 2, NULL, NULL, NULL, NULL, NULL, 0,
+                 '#1e293b', '#ffffff', NULL, 2, 2, NULL, NULL, datetime('now'), datetime('now'));
 
-            INSERT INTO actions (id, control_id, trigger, action_type, payload_json, value_key, created_at, updated_at)
+            INSERT INTO actions (id, control_id, trigger, action_type, payload_json, value_key, debounce_ms, created_at, updated_at)
             VALUES
-                (1, 1, 'press', 'run_app', '{"action":"run_app","payload":{"app":"notepad"}}', NULL, datetime('now'), datetime('now')),
-                (2, 2, 'toggle_on', 'key_press', '{"action":"key_press","payload":{"keys":["ctrl","shift","s"]}}', NULL, datetime('now'), datetime('now')),
-                (3, 2, 'toggle_off', 'key_press', '{"action":"key_press","payload":{"keys":["ctrl","s"]}}', NULL, datetime('now'), datetime('now')),
-                (4, 3, 'value_release', 'run_app', '{"action":"run_app","payload":{"app":"your_app","args":["--volume","${value}"]}}', 'value', datetime('now'), datetime('now')),
-                (5, 4, 'press', 'navigate_screen', '{"screen_id":3}', NULL, datetime('now'), datetime('now')),
-                (7, 17, 'press', 'show_resolution', '{"action":"show_resolution","payload":{}}', NULL, datetime('now'), datetime('now')),
-                (6, 9, 'press', 'navigate_screen', '{"screen_id":1}', NULL, datetime('now'), datetime('now'));
+                (1, 1, 'press', 'run_app', '{"action":"run_app","payload":{"app":"notepad"}}', NULL, 300, datetime('now'), datetime('now')),
+                (2, 2, 'toggle_on', 'key_press', '{"action":"key_press","payload":{"keys":["ctrl","shift","s"]}}', NULL, NULL, datetime('now'), datetime('now')),
+                (3, 2, 'toggle_off', 'key_press', '{"action":"key_press","payload":{"keys":["ctrl","s"]}}', NULL, NULL, datetime('now'), datetime('now')),
+                (4, 3, 'value_release', 'run_app', '{"action":"run_app","payload":{"app":"your_app","args":["--volume","${value}"]}}', 'value', NULL, datetime('now'), datetime('now')),
+                (5, 4, 'press', 'navigate_screen', '{"screen_id":3}', NULL, NULL, datetime('now'), datetime('now')),
+                (7, 17, 'press', 'show_resolution', '{"action":"show_resolution","payload":{}}', NULL, NULL, datetime('now'), datetime('now')),
+                (6, 9, 'press', 'navigate_screen', '{"screen_id":1}', NULL, NULL, datetime('now'), datetime('now'));
 
             INSERT INTO settings (key, value, updated_at)
             VALUES
                 ('agent_host', '127.0.0.1', datetime('now')),
                 ('agent_port', '8765', datetime('now')),
                 ('agent_token', '', datetime('now')),
+                ('agent_pool_size', '4', datetime('now')),
+                ('agent_idle_timeout', '30', datetime('now')),
+                ('agent_slow_p95_ms', '250', datetime('now')),
+                ('metrics_textfile', '', datetime('now')),
+                ('metrics_interval_ms', '5000', datetime('now')),
                 ('brightness', '80', datetime('now')),
                 ('resolution', '1024x600', datetime('now')),
                 ('theme_font_family', 'DejaVu Sans', datetime('now')),
@@ -182,3 +316,32 @@ class Repository:
                 ('theme_slider_handle', '#f59e0b', datetime('now'));
             """)
             conn.commit()
+
+
+def build_snapshot(
+    screens: Iterable,
+    controls: Iterable,
+    actions: Iterable,
+    states: dict[int, Optional[str]],
+    settings: dict[str, Optional[str]],
+    compiled_actions: Optional[Mapping[int, Any]] = None,
+) -> ConfigSnapshot:
+    # Columns are selected in field order, so rows construct positionally
+    # (about 3x cheaper than going through dict(row) for thousands of rows).
+    by_screen: dict[int, list[Control]] = {}
+    for row in controls:
+        control = Control(*row)
+        by_screen.setdefault(control.screen_id, []).append(control)
+    action_list = tuple(Action(*row) for row in actions)
+    by_control: dict[int, list[Action]] = {}
+    for action in action_list:
+        by_control.setdefault(action.control_id, []).append(action)
+    return ConfigSnapshot(
+        screens=tuple(Screen(*row) for row in screens),
+        controls_by_screen=MappingProxyType({k: tuple(v) for k, v in by_screen.items()}),
+        actions=action_list,
+        actions_by_control=MappingProxyType({k: tuple(v) for k, v in by_control.items()}),
+        control_state=MappingProxyType(states),
+        settings=MappingProxyType(settings),
+        compiled_actions=compiled_actions,
+    )
@@ -71,4 +71,117 @@ MIGRATIONS = [
     (4, """
     ALTER TABLE screens ADD COLUMN bg_image_mode TEXT;
     """),
+    (5, """
+    ALTER TABLE actions ADD COLUMN replay_policy TEXT;
+
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id TEXT NOT NULL UNIQUE,
+        control_id INTEGER,
+        action_id INTEGER,
+        trigger TEXT,
+        replay_policy TEXT NOT NULL,
+        payload_json TEXT NOT NULL,
+        expires_at REAL,
+        created_at TEXT
+    );
+    """),
+    (6, """
+    ALTER TABLE actions ADD COLUMN debounce_ms INTEGER;
+    """),
+    (7, """
+    ALTER TABLE actions ADD COLUMN priority TEXT;
+    """),
+    (8, """
+    CREATE TABLE IF NOT EXISTS agents (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        host TEXT NOT NULL,
+        port INTEGER NOT NULL,
+        token TEXT,
+        enabled INTEGER NOT NULL DEFAULT 1,
+        created_at TEXT,
+        updated_at TEXT
+    );
+
+    ALTER TABLE actions ADD COLUMN agent_id TEXT;
+
+    -- A broadcast command spills once per agent with the same request_id.
+    CREATE TABLE outbox_v8 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id TEXT NOT NULL,
+        agent_id TEXT NOT NULL DEFAULT 'default',
+        control_id INTEGER,
+        action_id INTEGER,
+        trigger TEXT,
+        replay_policy TEXT NOT NULL,
+        payload_json TEXT NOT NULL,
+        expires_at REAL,
+        created_at TEXT,
+        UNIQUE(request_id, agent_id)
+    );
+    INSERT INTO outbox_v8 (id, request_id, control_id, action_id, trigger, replay_policy, payload_json, expires_at, created_at)
+        SELECT id, request_id, control_id, action_id, trigger, replay_policy, payload_json, expires_at, created_at FROM outbox;
+    DROP TABLE outbox;
+    ALTER TABLE outbox_v8 RENAME TO outbox;
+    """),
+    (9, """
+    ALTER TABLE actions ADD COLUMN transport TEXT;
+    """),
+    (10, """
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        id INTEGER PRIMARY KEY,
+        scope TEXT NOT NULL,
+        target TEXT NOT NULL,
+        rate REAL NOT NULL,
+        burst INTEGER NOT NULL DEFAULT 1,
+        mode TEXT NOT NULL DEFAULT 'delay',
+        created_at TEXT,
+        updated_at TEXT,
+        UNIQUE(scope, target)
+    );
+    """),
+    (11, """
+    -- Bumped by every change to screens, controls, and actions, including edits
+    -- made outside the app, so the layout cache can tell when it is stale.
+    CREATE TABLE IF NOT EXISTS layout_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO layout_version (id, version) VALUES (1, 0);
+    CREATE TRIGGER IF NOT EXISTS screens_insert_layout_version AFTER INSERT ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS screens_update_layout_version AFTER UPDATE ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS screens_delete_layout_version AFTER DELETE ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS controls_insert_layout_version AFTER INSERT ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS controls_update_layout_version AFTER UPDATE ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS controls_delete_layout_version AFTER DELETE ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS actions_insert_layout_version AFTER INSERT ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS actions_update_layout_version AFTER UPDATE ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS actions_delete_layout_version AFTER DELETE ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
+    """),
+    (12, """
+    -- The counter alone does not name a layout: it restarts when the database is
+    -- reset or reseeded, and a restored copy can reach the same count with other
+    -- rows. Every change also draws a new random stamp for the layout cache key.
+    ALTER TABLE layout_version ADD COLUMN stamp BLOB;
+    UPDATE layout_version SET stamp = randomblob(16);
+    DROP TRIGGER IF EXISTS screens_insert_layout_version;
+    DROP TRIGGER IF EXISTS screens_update_layout_version;
+    DROP TRIGGER IF EXISTS screens_delete_layout_version;
+    DROP TRIGGER IF EXISTS controls_insert_layout_version;
+    DROP TRIGGER IF EXISTS controls_update_layout_version;
+    DROP TRIGGER IF EXISTS controls_delete_layout_version;
+    DROP TRIGGER IF EXISTS actions_insert_layout_version;
+    DROP TRIGGER IF EXISTS actions_update_layout_version;
+    DROP TRIGGER IF EXISTS actions_delete_layout_version;
+    CREATE TRIGGER IF NOT EXISTS screens_insert_layout_version AFTER INSERT ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS screens_update_layout_version AFTER UPDATE ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS screens_delete_layout_version AFTER DELETE ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS controls_insert_layout_version AFTER INSERT ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS controls_update_layout_version AFTER UPDATE ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS controls_delete_layout_version AFTER DELETE ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS actions_insert_layout_version AFTER INSERT ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS actions_update_layout_version AFTER UPDATE ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    CREATE TRIGGER IF NOT EXISTS actions_delete_layout_version AFTER DELETE ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+    """),
 ]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from .db import Database
+
+
+class WriteBehind:
+    # Control state and settings writes from the GUI thread land here and are
+    # written by a background thread, latest value per key, one transaction
+    # per interval. Repository reads check here first, so they always see
+    # unflushed values.
+    def __init__(self, db: Database, interval: float = 1.0) -> None:
+        self._db = db
+        self._interval = interval
+        self._cond = threading.Condition()
+        self._states: dict[int, str] = {}
+        self._settings: dict[str, str] = {}
+        # Taken by a flush and still visible to reads until it commits.
+        self._flushing: tuple[dict[int, str], dict[str, str]] = ({}, {})
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.writes = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="state-writer")
+        self._thread.start()
+
+    def set_control_state(self, control_id: int, value: str) -> None:
+        with self._cond:
+            self.writes += 1
+            if control_id in self._states:
+                self.coalesced += 1
+            self._states[control_id] = value
+
+    def set_setting(self, key: str, value: str) -> None:
+        with self._cond:
+            self.writes += 1
+            if key in self._settings:
+                self.coalesced += 1
+            self._settings[key] = value
+
+    def control_state(self, control_id: int) -> tuple[bool, str | None]:
+        with self._cond:
+            for states in (self._states, self._flushing[0]):
+                if control_id in states:
+                    return True, states[control_id]
+        return False, None
+
+    def setting(self, key: str) -> tuple[bool, str | None]:
+        with self._cond:
+            for settings in (self._settings, self._flushing[1]):
+                if key in settings:
+                    return True, settings[key]
+        return False, None
+
+    def pending(self) -> tuple[dict[int, str], dict[str, str]]:
+        with self._cond:
+            return {**self._flushing[0], **self._states}, {**self._flushing[1], **self._settings}
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        # While held no flush commits, so a DB read plus pending() is consistent.
+        with self._flush_lock:
+            yield
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._cond:
+                if not self._states and not self._settings:
+                    return
+                states, settings = self._flushing = (self._states, self._settings)
+                self._states, self._settings = {}, {}
+            try:
+                self._write(states, settings)
+            except sqlite3.Error:
+                with self._cond:
+                    # Writes made during the failed flush are newer and win.
+                    self._states = {**states, **self._states}
+                    self._settings = {**settings, **self._settings}
+                    self._flushing = ({}, {})
+                raise
+            with self._cond:
+                self._flushing = ({}, {})
+                self.flushes += 1
+
+    def _write(self, states: dict[int, str], settings: dict[str, str]) -> None:
+        with self._db.connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO control_state (control_id, value, updated_at)
+                VALUES (?, ?, datetime('now'))
+                ON CONFLICT(control_id) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = excluded.updated_at
+                """,
+                states.items(),
+            )
+            conn.executemany(
+                """
+                INSERT INTO settings (key, value, updated_at)
+                VALUES (?, ?, datetime('now'))
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = excluded.updated_at
+                """,
+                settings.items(),
+            )
+            conn.commit()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self._interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Lock or SD card trouble: the values stay pending for the next cycle.
+                logging.warning("Deferred state write failed; retrying", exc_info=True)
@@ -1,22 +1,61 @@
 from __future__ import annotations
 
+import signal
+import time
+
 from .data.db import Database
+from .data.layout_cache import LayoutCache
+from .data.outbox import Outbox
 from .data.repository import Repository
+from .data.writebehind import WriteBehind
 from .settings.manager import SettingsManager
+from .actions.async_engine import AsyncActionDispatcher
 from .actions.dispatcher import ActionDispatcher
+from .actions.metrics import MetricsTextfile
+from .actions.router import AgentRouter
 from .ui.app_window import AppWindow
+from .utils.logging import setup_logging
 
 
 def main() -> None:
+    started_at = time.monotonic()
+    setup_logging()
     db = Database("/home/pi/pi_touch_controller/app.db")
-    db.migrate()
-    Repository(db).insert_seed_data()
+    layout = LayoutCache(db)
+    # A current cache implies a migrated, seeded database: skip both.
+    config = layout.load()
+    if config is None:
+        db.migrate()
+        Repository(db).insert_seed_data()
 
     settings = SettingsManager(db)
-    dispatcher = ActionDispatcher(settings)
+    persist_flush_ms = settings.get_int("persist_flush_ms", 1000)
+    if persist_flush_ms > 0:
+        db.write_behind = WriteBehind(db, interval=persist_flush_ms / 1000.0)
+    outbox = Outbox(db, flush_interval=settings.get_int("outbox_flush_ms", 1000) / 1000.0)
+    engine = AsyncActionDispatcher if settings.get_value("dispatch_engine") == "asyncio" else ActionDispatcher
+    dispatcher = AgentRouter(settings, outbox=outbox, engine=engine)
+    metrics_path = settings.get_value("metrics_textfile")
+    if metrics_path:
+        MetricsTextfile(
+            metrics_path,
+            interval=settings.get_int("metrics_interval_ms", 5000) / 1000.0,
+            collect=lambda: (dispatcher.latency_snapshot(), dispatcher.stats(), dispatcher.rate_limit_stats()),
+        )
 
-    window = AppWindow(db=db, settings=settings, dispatcher=dispatcher)
+    window = AppWindow(db=db, settings=settings, dispatcher=dispatcher, config=config, started_at=started_at)
+    # An edited actions row reaches the action index without a restart.
+    layout.on_change = window.update_actions
+    layout.start(interval=settings.get_int("layout_cache_refresh_ms", 5000) / 1000.0)
+    # systemd stops the service with SIGTERM: leave the event loop so the
+    # shutdown below still runs. Python handles the signal on the next tick
+    # of any Qt timer.
+    signal.signal(signal.SIGTERM, lambda *_: window.quit())
     window.run()
+    layout.close()
+    # Flushes deferred state writes, then closing the last connection
+    # checkpoints the WAL into the main file.
+    db.close()
 
 
 if __name__ == "__main__":
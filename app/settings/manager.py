@@ -2,23 +2,99 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from ..actions.queue import OVERFLOW_POLICIES
 from ..data.db import Database
+from ..data.models import DEFAULT_AGENT, RateLimit
 from ..data.repository import Repository
 
 
+INT_SETTING_RANGES: dict[str, tuple[int, int, str]] = {
+    "agent_pool_size": (1, 32, "Pool size"),
+    "agent_idle_timeout": (0, 600, "Idle timeout"),
+    "agent_batch_enabled": (0, 1, "Batch mode"),
+    "agent_batch_max": (1, 256, "Batch size"),
+    "agent_batch_window_ms": (0, 1000, "Batch window"),
+    "agent_stream_port": (1, 65535, "Stream port"),
+    "agent_datagram_port": (1, 65535, "Datagram port"),
+    "dispatch_coalesce": (0, 1, "Coalescing"),
+    "dispatch_workers": (1, 16, "Dispatch workers"),
+    "health_interval_ms": (250, 60000, "Health interval"),
+    "health_max_interval_ms": (250, 300000, "Max health interval"),
+    "health_recovery_interval_ms": (100, 60000, "Recovery probe interval"),
+    "breaker_failure_threshold": (1, 100, "Breaker threshold"),
+    "breaker_open_ms": (100, 300000, "Breaker open time"),
+    "outbox_ttl_s": (0, 86400, "Outbox expiry"),
+    "outbox_flush_ms": (100, 60000, "Outbox flush interval"),
+    "persist_flush_ms": (0, 60000, "State flush interval"),
+    "layout_cache_refresh_ms": (500, 600000, "Layout cache refresh"),
+    "dispatch_async_concurrency": (1, 256, "Async concurrency"),
+    "dispatch_retry_attempts": (1, 10, "Retry attempts"),
+    "dispatch_retry_backoff_ms": (0, 10000, "Retry backoff"),
+    "dispatch_retry_max_backoff_ms": (0, 60000, "Max retry backoff"),
+    "dispatch_retry_jitter_pct": (0, 100, "Retry jitter"),
+    "dispatch_command_ttl_ms": (0, 600000, "Command expiry"),
+    "agent_slow_p95_ms": (0, 60000, "Slow agent threshold"),
+    "metrics_interval_ms": (500, 600000, "Metrics interval"),
+    "dispatch_dedup_capacity": (16, 65536, "Dedup capacity"),
+    "dispatch_queue_capacity": (0, 100000, "Queue capacity"),
+    "dispatch_block_timeout_ms": (0, 5000, "Block timeout"),
+    "dispatch_queue_high_pct": (1, 100, "High watermark"),
+    "dispatch_queue_low_pct": (0, 100, "Low watermark"),
+    "dispatch_weight_high": (1, 100, "High lane weight"),
+    "dispatch_weight_normal": (1, 100, "Normal lane weight"),
+    "dispatch_weight_low": (1, 100, "Low lane weight"),
+}
+
+
 @dataclass
 class AgentTarget:
     host: str
     port: int
     token: str
+    name: str = "Agent"
 
 
 class SettingsManager:
     def __init__(self, db: Database) -> None:
         self._db = db
         self._repo = Repository(db)
+        self._target_cache: tuple[int, dict[str, AgentTarget]] | None = None
+        self._limits_cache: tuple[int, list[RateLimit]] | None = None
+
+    @property
+    def version(self) -> int:
+        # Bumped by every settings, agent, or rate-limit write.
+        return self._db.settings_version
+
+    def get_agent_target(self, agent_id: str = DEFAULT_AGENT) -> AgentTarget:
+        targets = self.get_agent_targets()
+        return targets.get(agent_id) or targets[DEFAULT_AGENT]
+
+    def get_agent_targets(self) -> dict[str, AgentTarget]:
+        version = self._db.settings_version
+        cached = self._target_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # The agent_host/port/token settings are the "default" agent unless
+        # the agents table defines one with that id.
+        targets = {DEFAULT_AGENT: self._load_agent_target()}
+        for agent in self._repo.list_agents():
+            if agent.enabled:
+                targets[agent.id] = AgentTarget(
+                    host=agent.host, port=agent.port, token=agent.token or "", name=agent.name or agent.id
+                )
+        self._target_cache = (version, targets)
+        return targets
+
+    def get_rate_limits(self) -> list[RateLimit]:
+        # Same list object until the limits or settings change.
+        version = self._db.settings_version
+        cached = self._limits_cache
+        if cached is None or cached[0] != version:
+            cached = self._limits_cache = (version, self._repo.list_rate_limits())
+        return cached[1]
 
-    def get_agent_target(self) -> AgentTarget:
+    def _load_agent_target(self) -> AgentTarget:
         host = self._repo.get_setting("agent_host")
         port = self._repo.get_setting("agent_port")
         token = self._repo.get_setting("agent_token")
@@ -32,6 +108,20 @@ class SettingsManager:
         value = self._repo.get_setting("brightness")
         return int(value.value) if value and value.value else 80
 
+    def get_int(self, key: str, default: int) -> int:
+        value = self.get_value(key)
+        try:
+            return int(value) if value else default
+        except ValueError:
+            return default
+
+    def get_float(self, key: str, default: float) -> float:
+        value = self.get_value(key)
+        try:
+            return float(value) if value else default
+        except ValueError:
+            return default
+
     def set_setting(self, key: str, value: str) -> None:
         self._repo.set_setting(key, value)
 
@@ -67,6 +157,31 @@ class SettingsManager:
         if key == "agent_token":
             self._repo.set_setting(key, normalized)
             return True, normalized, None
+        if key == "agent_transport":
+            if normalized not in {"http", "stream"}:
+                return False, value, "Agent transport must be http or stream"
+            self._repo.set_setting(key, normalized)
+            return True, normalized, None
+        if key == "dispatch_engine":
+            if normalized not in {"thread", "asyncio"}:
+                return False, value, "Dispatch engine must be thread or asyncio"
+            self._repo.set_setting(key, normalized)
+            return True, normalized, None
+        if key == "dispatch_overflow_policy" or key.startswith("dispatch_overflow_policy_"):
+            if normalized not in OVERFLOW_POLICIES:
+                return False, value, "Overflow policy must be one of: " + ", ".join(OVERFLOW_POLICIES)
+            self._repo.set_setting(key, normalized)
+            return True, normalized, None
+        if key in INT_SETTING_RANGES:
+            low, high, label = INT_SETTING_RANGES[key]
+            try:
+                v = int(normalized)
+                if v < low or v > high:
+                    raise ValueError()
+            except ValueError:
+                return False, value, f"{label} must be {low}-{high}"
+            self._repo.set_setting(key, str(v))
+            return True, str(v), None
         if key == "brightness":
             try:
                 v = int(normalized)
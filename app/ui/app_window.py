@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import logging
 import sys
+import time
+from typing import Mapping
 
 from PySide6 import QtCore, QtWidgets
 from PySide6.QtCore import Qt
@@ -8,13 +11,23 @@ from PySide6.QtCore import Qt
 from .screen_renderer import ScreenRenderer
 from .status_overlay import StatusOverlay
 from ..data.db import Database
+from ..data.models import Action, ConfigSnapshot
 from ..settings.manager import SettingsManager
-from ..actions.dispatcher import ActionDispatcher
+from ..actions.mapping import Compiled
+from ..actions.router import AgentRouter
 
 
 class AppWindow:
-    def __init__(self, db: Database, settings: SettingsManager, dispatcher: ActionDispatcher) -> None:
+    def __init__(
+        self,
+        db: Database,
+        settings: SettingsManager,
+        dispatcher: AgentRouter,
+        config: ConfigSnapshot | None = None,
+        started_at: float | None = None,
+    ) -> None:
         self._db = db
+        self._started_at = started_at
         self._settings = settings
         self._dispatcher = dispatcher
 
@@ -28,7 +41,7 @@ class AppWindow:
             self._window.setWindowFlag(Qt.FramelessWindowHint, True)
             self._window.showFullScreen()
 
-        self._renderer = ScreenRenderer(db=self._db, dispatcher=self._dispatcher)
+        self._renderer = ScreenRenderer(db=self._db, dispatcher=self._dispatcher, config=config)
         self._overlay = StatusOverlay(self._window)
         self._renderer.set_toast_handler(self._overlay.show_toast)
 
@@ -45,9 +58,27 @@ class AppWindow:
         self._health_timer.timeout.connect(self._update_health_status)
         self._health_timer.start()
 
+        self._backpressure_timer = QtCore.QTimer()
+        self._backpressure_timer.setInterval(250)
+        self._backpressure_timer.timeout.connect(self._update_backpressure)
+        self._backpressure_timer.start()
+
     def run(self) -> None:
         self._window.show()
+        if self._started_at is not None:
+            # Runs once the event loop has painted the first frame.
+            QtCore.QTimer.singleShot(0, self._log_first_frame)
         self._app.exec()
+        self._dispatcher.shutdown()
+
+    def quit(self) -> None:
+        self._app.quit()
+
+    def update_actions(self, actions: list[Action], compiled: Mapping[int, Compiled]) -> None:
+        self._renderer.update_actions(actions, compiled)
+
+    def _log_first_frame(self) -> None:
+        logging.info("First frame %.0f ms after start", (time.monotonic() - self._started_at) * 1000)
 
     def _configure_windowed_mode(self) -> None:
         screen = QtWidgets.QApplication.primaryScreen()
@@ -73,8 +104,33 @@ class AppWindow:
         y = available.y() + (available.height() - height) // 2
         self._window.move(x, y)
 
+    def _update_backpressure(self) -> None:
+        self._renderer.set_saturated(set(self._dispatcher.backpressure()["agents"]))
+
     def _update_health_status(self) -> None:
-        if self._dispatcher.last_health_ok():
-            self._overlay.clear()
+        states = self._dispatcher.agent_health()
+        down = [state for state in states if not state["healthy"] or state["state"] != "closed"]
+        if not down:
+            self._update_slow_status(states)
+            return
+        if len(down) > 1:
+            self._overlay.set_error("Offline: " + ", ".join(state["name"] for state in down))
+            return
+        state = down[0]
+        elapsed = int(max(0.0, time.time() - state["since"]))
+        if state["state"] == "half_open":
+            self._overlay.set_error(f"{state['name']} Reconnecting ({elapsed}s)")
+        elif state["state"] == "open":
+            self._overlay.set_error(f"{state['name']} Offline ({elapsed}s)")
         else:
-            self._overlay.set_error("Agent Offline")
+            self._overlay.set_error(f"{state['name']} Offline")
+
+    def _update_slow_status(self, states: list[dict]) -> None:
+        threshold = self._settings.get_int("agent_slow_p95_ms", 250)
+        if threshold > 0:
+            for state in states:
+                p95 = self._dispatcher.latency_p95(state["agent_id"])
+                if p95 is not None and p95 * 1000 > threshold:
+                    self._overlay.set_warning(f"{state['name']} Slow (p95 {int(p95 * 1000)} ms)")
+                    return
+        self._overlay.clear()
@@ -1,22 +1,25 @@
 from __future__ import annotations
 
-import json
+import time
 from pathlib import Path
+from typing import Mapping
 
 from PySide6 import QtCore, QtGui, QtWidgets
 import sys
 
-from ..actions.dispatcher import ActionDispatcher
+from ..actions.index import ActionIndex, ResolvedAction
+from ..actions.mapping import Compiled
+from ..actions.router import AgentRouter
 from ..data.db import Database
 from ..data.repository import Repository
-from ..data.models import Action, Control, Screen
+from ..data.models import Action, ConfigSnapshot, Control, Screen
 from ..settings.manager import SettingsManager
 from ..settings.brightness import BrightnessController, find_backlight_brightness_path
 from .gestures import SwipeNavigator
 
 
 class ScreenRenderer:
-    def __init__(self, db: Database, dispatcher: ActionDispatcher) -> None:
+    def __init__(self, db: Database, dispatcher: AgentRouter, config: ConfigSnapshot | None = None) -> None:
         self._db = db
         self._dispatcher = dispatcher
         self._repo = Repository(db)
@@ -25,6 +28,13 @@ class ScreenRenderer:
         self._brightness = self._init_brightness()
         self._settings = SettingsManager(db)
         self._bg_helpers: list[BackgroundImageBinder] = []
+        # From the layout cache: used for the first build instead of the database.
+        self._config: ConfigSnapshot | None = config
+        self._actions = ActionIndex((), dispatcher.route)
+        self._index_swap = IndexSwap()
+        self._index_swap.ready.connect(self._swap_actions)
+        self._agent_widgets: list[tuple[QtWidgets.QWidget, frozenset[str]]] = []
+        self._saturated: set[str] = set()
         self._theme_spacing = self._get_int_setting("theme_spacing", 12)
         self._theme_button_radius = self._get_int_setting("theme_button_radius", 8)
         self._apply_theme()
@@ -35,7 +45,7 @@ class ScreenRenderer:
         return self._stack
 
     def load_initial_screen(self) -> None:
-        self._rebuild_screens()
+        self._rebuild_screens(self._config)
         if self._stack.count() == 0:
             self._stack.addWidget(self._empty_state("No screens configured in database."))
             return
@@ -49,17 +59,28 @@ class ScreenRenderer:
         layout.addWidget(QtWidgets.QLabel(message))
         return widget
 
-    def _rebuild_screens(self) -> None:
+    def _rebuild_screens(self, config: ConfigSnapshot | None = None) -> None:
         while self._stack.count() > 0:
             widget = self._stack.widget(0)
             self._stack.removeWidget(widget)
             widget.deleteLater()
         self._screen_index.clear()
-        screens = self._repo.list_screens()
-        for idx, screen in enumerate(screens):
+        self._agent_widgets.clear()
+        self._config = config = config or self._repo.load_snapshot()
+        # Built in full before the swap, so an event never sees a half-built index.
+        self._actions = ActionIndex(config.actions, self._dispatcher.route, config.compiled_actions)
+        for idx, screen in enumerate(config.screens):
             self._stack.addWidget(self._build_screen(screen))
             self._screen_index[screen.id] = idx
 
+    def update_actions(self, actions: list[Action], compiled: Mapping[int, Compiled]) -> None:
+        # Called by the layout cache thread after an actions row changed: the
+        # index is built there, and only the swap runs on the GUI thread.
+        self._index_swap.ready.emit(ActionIndex(actions, self._dispatcher.route, compiled))
+
+    def _swap_actions(self, index: ActionIndex) -> None:
+        self._actions = index
+
     def _build_screen(self, screen: Screen) -> QtWidgets.QWidget:
         widget = QtWidgets.QWidget()
         grid = QtWidgets.QGridLayout(widget)
@@ -68,11 +89,15 @@ class ScreenRenderer:
 
         self._apply_screen_style(widget, screen)
 
-        controls = self._repo.list_controls_for_screen(screen.id)
+        controls = self._config.controls_for_screen(screen.id)
         max_row = 0
         max_col = 0
         for control in controls:
             ctrl_widget = self._build_control(control)
+            agents = self._actions.agent_targets.get(control.id)
+            if agents is not None:
+                ctrl_widget.setEnabled(not agents & self._saturated)
+                self._agent_widgets.append((ctrl_widget, agents))
             row = control.row or 0
             col = control.col or 0
             rowspan = control.rowspan or 1
@@ -120,7 +145,7 @@ class ScreenRenderer:
             self._apply_initial_state_slider(slider, control)
             self._apply_control_style(slider, control)
             if control.is_continuous:
-                slider.valueChanged.connect(lambda _value, c=control: self._fire_actions(c, "value_change"))
+                slider.valueChanged.connect(lambda v, c=control: self._fire_actions(c, "value_change", context={"value": v}))
             slider.sliderReleased.connect(lambda c=control, s=slider: self._on_slider_release(c, s))
             value_label = QtWidgets.QLabel(str(slider.value()))
             value_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter)
@@ -167,7 +192,7 @@ class ScreenRenderer:
                 slider.setPageStep(int(control.step))
             self._apply_initial_state_slider(slider, control)
             if control.is_continuous:
-                slider.valueChanged.connect(lambda _value, c=control: self._fire_actions(c, "value_change"))
+                slider.valueChanged.connect(lambda v, c=control: self._fire_actions(c, "value_change", context={"value": v}))
             slider.sliderReleased.connect(lambda c=control, s=slider: self._on_slider_release(c, s))
             layout.addWidget(label)
             layout.addWidget(slider, 1)
@@ -183,7 +208,7 @@ class ScreenRenderer:
             edit.setEchoMode(QtWidgets.QLineEdit.EchoMode.Password if control.setting_key == "agent_token" else QtWidgets.QLineEdit.EchoMode.Normal)
             self._apply_control_style(label, control)
             self._apply_control_style(edit, control)
-            value = self._settings.get_value(control.setting_key)
+            value = self._config.get_setting(control.setting_key)
             if value is not None:
                 edit.setText(value)
             if control.placeholder_text:
@@ -211,7 +236,7 @@ class ScreenRenderer:
             options = self._get_dropdown_options(control)
             for option in options:
                 combo.addItem(option)
-            current = self._settings.get_value(control.setting_key) if control.setting_key else None
+            current = self._config.get_setting(control.setting_key) if control.setting_key else None
             if current and current in options:
                 combo.setCurrentText(current)
             elif control.default_value and control.default_value in options:
@@ -242,7 +267,7 @@ class ScreenRenderer:
                 slider.setMaximum(int(control.max_value))
             if control.step:
                 slider.setSingleStep(int(control.step))
-            value = self._settings.get_value(control.setting_key)
+            value = self._config.get_setting(control.setting_key)
             if value is not None:
                 slider.setValue(int(float(value)))
             error_label = QtWidgets.QLabel("")
@@ -259,14 +284,52 @@ class ScreenRenderer:
             layout.addWidget(error_label)
             return wrapper
 
+        if control.type == "latency_debug":
+            label = QtWidgets.QLabel("")
+            label.setAlignment(QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignTop)
+            label.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont))
+            self._apply_control_style(label, control)
+            timer = QtCore.QTimer(label)
+            timer.setInterval(1000)
+            timer.timeout.connect(lambda lbl=label: self._update_latency_debug(lbl))
+            timer.start()
+            self._update_latency_debug(label)
+            return label
+
         return QtWidgets.QLabel(f"Unknown control type: {control.type}")
 
+    def _update_latency_debug(self, label: QtWidgets.QLabel) -> None:
+        if not label.isVisible() and label.text():
+            return
+        snapshot = self._dispatcher.latency_snapshot()
+        lines = [f"{'':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'n':>7}"]
+        rows = [(stage, summary) for stage, summary in snapshot["stages"].items()]
+        rows += [(f"lane {key}", summary) for key, summary in sorted(snapshot["priorities"].items())]
+        rows += [(f"agent {key}", summary) for key, summary in sorted(snapshot["agents"].items())]
+        rows += [(f"action {key}", summary) for key, summary in sorted(snapshot["actions"].items())]
+        rows += [(f"control {key}", summary) for key, summary in sorted(snapshot["controls"].items())]
+        for name, summary in rows:
+            q = summary["quantiles"]
+            cells = "".join(f"{q[p] * 1000:>7.1f}ms" if p in q else f"{'-':>9}" for p in (0.5, 0.95, 0.99))
+            lines.append(f"{name[:22]:<22}{cells}{summary['window_count']:>7}")
+        outcomes = " ".join(f"{key}={value}" for key, value in snapshot["outcomes"].items())
+        lines.append(f"{outcomes} retries={snapshot['retries']}")
+        label.setText("\n".join(lines))
+
+    def set_saturated(self, agents: set[str]) -> None:
+        # Dim controls that send to an agent whose dispatch queue is saturated.
+        if agents == self._saturated:
+            return
+        self._saturated = agents
+        for widget, targets in self._agent_widgets:
+            widget.setEnabled(not targets & agents)
+
     def _apply_initial_state_toggle(self, btn: QtWidgets.QPushButton, control: Control) -> None:
         if not control.persist_state:
             if control.default_value:
                 btn.setChecked(control.default_value.lower() in {"1", "true", "on", "yes"})
             return
-        state = self._repo.get_control_state(control.id)
+        state = self._config.get_control_state(control.id)
         if state and state.value is not None:
             btn.setChecked(state.value.lower() in {"1", "true", "on", "yes"})
 
@@ -275,39 +338,52 @@ class ScreenRenderer:
             if control.default_value is not None:
                 slider.setValue(int(float(control.default_value)))
             return
-        state = self._repo.get_control_state(control.id)
+        state = self._config.get_control_state(control.id)
         if state and state.value is not None:
             slider.setValue(int(float(state.value)))
 
     def _on_toggle(self, control: Control, checked: bool) -> None:
+        input_at = time.monotonic()
         if control.persist_state:
             self._repo.set_control_state(control.id, "1" if checked else "0")
         trigger = "toggle_on" if checked else "toggle_off"
-        self._fire_actions(control, trigger, context={"state": checked})
+        self._fire_actions(control, trigger, context={"state": checked}, input_at=input_at)
 
     def _on_slider_release(self, control: Control, slider: QtWidgets.QSlider) -> None:
+        input_at = time.monotonic()
         if control.persist_state:
             self._repo.set_control_state(control.id, str(slider.value()))
-        self._fire_actions(control, "value_release", context={"value": slider.value()})
-
-    def _fire_actions(self, control: Control, trigger: str, context: dict | None = None) -> None:
-        actions = self._repo.list_actions_for_control(control.id)
-        for action in actions:
-            if action.trigger == trigger:
-                if action.action_type == "navigate_screen":
-                    self._handle_navigation_action(action)
-                elif action.action_type == "show_resolution":
-                    self._handle_show_resolution()
-                else:
-                    self._dispatcher.enqueue_action_record(action, context=context)
-
-    def _handle_navigation_action(self, action: Action) -> None:
-        try:
-            data = json.loads(action.payload_json)
-            target_id = int(data.get("screen_id"))
-        except Exception:
+        self._fire_actions(control, "value_release", context={"value": slider.value()}, input_at=input_at)
+
+    def _fire_actions(
+        self,
+        control: Control,
+        trigger: str,
+        context: dict | None = None,
+        input_at: float | None = None,
+    ) -> None:
+        input_at = input_at if input_at is not None else time.monotonic()
+        entries = self._actions.resolve(control.id, trigger)
+        resolved_at = time.monotonic()
+        for entry in entries:
+            if entry.action.action_type == "navigate_screen":
+                self._handle_navigation_action(entry)
+            elif entry.action.action_type == "show_resolution":
+                self._handle_show_resolution()
+            else:
+                self._dispatcher.enqueue_action_record(
+                    entry.action,
+                    context=context,
+                    input_at=input_at,
+                    resolved_at=resolved_at,
+                    targets=entry.targets,
+                    compiled=entry.compiled,
+                )
+
+    def _handle_navigation_action(self, entry: ResolvedAction) -> None:
+        if entry.screen_id is None:
             return
-        idx = self._screen_index.get(target_id)
+        idx = self._screen_index.get(entry.screen_id)
         if idx is not None:
             self._stack.setCurrentIndex(idx)
 
@@ -565,6 +641,12 @@ class ScreenRenderer:
         window.move(x, y)
 
 
+class IndexSwap(QtCore.QObject):
+    # Lives on the GUI thread, so an emit from another thread is queued
+    # and the connected slot runs in the event loop.
+    ready = QtCore.Signal(object)
+
+
 class BackgroundImageBinder(QtCore.QObject):
     def __init__(self, target: QtWidgets.QWidget, image_path: Path, mode: str) -> None:
         super().__init__(target)
@@ -4,12 +4,13 @@ from PySide6 import QtCore, QtWidgets
 
 
 class StatusOverlay:
+    _ERROR_STYLE = "QLabel { background-color: #991b1b; color: white; padding: 8px; font-size: 18px; }"
+    _WARNING_STYLE = "QLabel { background-color: #b45309; color: white; padding: 8px; font-size: 18px; }"
+
     def __init__(self, parent: QtWidgets.QWidget) -> None:
         self._label = QtWidgets.QLabel(parent)
         self._label.setText("")
-        self._label.setStyleSheet(
-            "QLabel { background-color: #991b1b; color: white; padding: 8px; font-size: 18px; }"
-        )
+        self._label.setStyleSheet(self._ERROR_STYLE)
         self._label.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop | QtCore.Qt.AlignmentFlag.AlignHCenter)
         self._label.setFixedHeight(40)
         self._label.hide()
@@ -24,6 +25,12 @@ class StatusOverlay:
         self._toast.hide()
 
     def set_error(self, text: str) -> None:
+        self._label.setStyleSheet(self._ERROR_STYLE)
+        self._label.setText(text)
+        self._label.show()
+
+    def set_warning(self, text: str) -> None:
+        self._label.setStyleSheet(self._WARNING_STYLE)
         self._label.setText(text)
         self._label.show()
 
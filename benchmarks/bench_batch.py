@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.dispatcher import ActionDispatcher
+
+from .common import make_settings, wait_for
+from .stub_agent import StubAgent
+
+
+def _run(batch: bool, count: int, latency: float) -> float:
+    agent = StubAgent(latency=latency).start()
+    settings = make_settings(agent.port, agent_batch_enabled="1" if batch else "0", agent_batch_max="32")
+    dispatcher = ActionDispatcher(settings)
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            dispatcher.enqueue({"request_id": str(i), "action": "key_press", "payload": {"keys": ["f13"]}})
+        if not wait_for(lambda: agent.received() >= count):
+            raise RuntimeError(f"only {agent.received()} of {count} commands arrived")
+        return time.perf_counter() - start
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Single vs batched command submission")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated per-request agent/LAN latency")
+    args = parser.parse_args()
+
+    for name, batch in (("single POST /command", False), ("POST /command/batch", True)):
+        elapsed = _run(batch, args.count, args.latency_ms / 1000.0)
+        print(f"{name:<24} {args.count:>6} cmds  {elapsed:>7.3f} s  {args.count / elapsed:>9.1f} cmd/s")
+
+
+if __name__ == "__main__":
+    main()
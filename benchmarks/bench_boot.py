@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.index import ActionIndex
+from app.data.db import Database
+from app.data.layout_cache import LayoutCache
+from app.data.models import DEFAULT_AGENT, ConfigSnapshot
+from app.data.repository import Repository
+
+from .bench_startup import make_config_db
+from .common import percentile
+
+
+def _route(agent_id: str | None) -> tuple[str, ...]:
+    return (DEFAULT_AGENT,)
+
+
+def boot_cold(path: str) -> ConfigSnapshot:
+    # What main() does without a cache: migrate, check the seed, read the snapshot.
+    db = Database(path)
+    db.migrate()
+    repo = Repository(db)
+    repo.insert_seed_data()
+    config = repo.load_snapshot()
+    db.close()
+    return config
+
+
+def boot_cached(path: str) -> ConfigSnapshot:
+    db = Database(path)
+    config = LayoutCache(db).load()
+    db.close()
+    assert config is not None, "layout cache miss"
+    return config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Boot-to-config cost: migrate + snapshot queries vs the layout cache file")
+    parser.add_argument("--screens", type=int, default=50)
+    parser.add_argument("--controls", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    path = make_config_db(args.screens, args.controls)
+    db = Database(path)
+    cache = LayoutCache(db)
+    started = time.perf_counter()
+    cache.refresh()
+    write = time.perf_counter() - started
+    db.close()
+    print(f"cache file {cache.path.stat().st_size / 1024:.1f} KiB, written in {write * 1000:.1f} ms")
+
+    for name, boot in (("migrate + snapshot", boot_cold), ("layout cache", boot_cached)):
+        config_samples, index_samples = [], []
+        for _ in range(args.runs):
+            t = time.perf_counter()
+            config = boot(path)
+            config_samples.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            ActionIndex(config.actions, _route, config.compiled_actions)
+            index_samples.append(time.perf_counter() - t)
+        # A cache hit carries the compiled templates, so the index skips
+        # compiling them. Both come before the renderer builds any widget,
+        # so the total is the part of time to first frame that differs.
+        totals = [c + i for c, i in zip(config_samples, index_samples)]
+        print(
+            f"{name:<20} config p50 {percentile(config_samples, 50) * 1000:>7.2f} ms  "
+            f"p99 {percentile(config_samples, 99) * 1000:>7.2f} ms  "
+            f"+ action index p50 {percentile(index_samples, 50) * 1000:>7.2f} ms  "
+            f"= before widgets p50 {percentile(totals, 50) * 1000:>7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import argparse
+import socket
+import time
+
+from app.actions.datagram import DATAGRAM_TRANSPORT, datagram_mac, encode_datagram
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent, StubDatagramAgent
+
+
+def _faders(count: int, transport: str | None) -> list[Action]:
+    return [
+        Action(id=100 + i, control_id=100 + i, trigger="value_change", action_type="set_volume",
+               payload_json='{"action":"set_volume","payload":{"level":"${value}"}}', value_key=None,
+               transport=transport)
+        for i in range(count)
+    ]
+
+
+def _stream(dispatcher: ActionDispatcher, faders: list[Action], updates: int, interval: float) -> dict:
+    sent_at: dict[tuple[int, int], float] = {}
+    for i in range(updates):
+        for fader in faders:
+            sent_at[(fader.id, i)] = time.perf_counter()
+            dispatcher.enqueue_action_record(fader, request_id=f"{fader.id}-{i}", context={"value": i})
+        time.sleep(interval)
+    return sent_at
+
+
+def _report(name: str, sent_at: dict, delivered: list[tuple[int, int, float]], elapsed: float) -> None:
+    samples = [t - sent_at[(key, value)] for key, value, t in delivered]
+    print(
+        f"{name:<10} {len(delivered):>6}/{len(sent_at):<6} applied  {len(delivered) / elapsed:>8.0f}/s  "
+        f"p50 {percentile(samples, 50) * 1000:>7.2f} ms  p95 {percentile(samples, 95) * 1000:>7.2f} ms  "
+        f"max {max(samples, default=0) * 1000:>7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fader streams over the reliable HTTP path and the UDP fast path")
+    parser.add_argument("--faders", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    parser.add_argument("--agent-ms", type=float, default=5.0, help="HTTP agent processing time per command")
+    parser.add_argument("--reorder", type=float, default=0.05, help="share of datagrams the stand-in reorders")
+    args = parser.parse_args()
+
+    http = StubAgent(latency=args.agent_ms / 1000.0).start()
+    udp = StubDatagramAgent(token="bench", reorder=args.reorder).start()
+    settings = make_settings(http.port, agent_token="bench", agent_datagram_port=str(udp.port))
+    try:
+        dispatcher = ActionDispatcher(settings)
+        interval = args.interval_ms / 1000.0
+        last = args.updates - 1
+
+        started = time.perf_counter()
+        sent_at = _stream(dispatcher, _faders(args.faders, None), args.updates, interval)
+        finals = {(100 + i, last) for i in range(args.faders)}
+        wait_for(lambda: all(f"{key}-{value}" in http.received_at for key, value in finals), 60)
+        delivered = [
+            (int(c["request_id"].split("-")[0]), c["payload"]["level"], http.received_at[c["request_id"]])
+            for c in list(http.commands)
+        ]
+        _report("reliable", sent_at, delivered, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        sent_at = _stream(dispatcher, _faders(args.faders, DATAGRAM_TRANSPORT), args.updates, interval)
+        time.sleep(0.2)
+        delivered = [(key, body["payload"]["level"], t) for key, body, t in list(udp.applied)]
+        _report("datagram", sent_at, delivered, time.perf_counter() - started)
+
+        # Packets signed with the wrong token must be rejected.
+        forger = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for seq in range(5):
+            forger.sendto(encode_datagram(datagram_mac("wrong"), 1, 100, 10_000 + seq, b"{}"), ("127.0.0.1", udp.port))
+        time.sleep(0.2)
+        print(
+            f"stand-in   {udp.received} datagrams at {udp.rate():.0f}/s  {udp.held} reordered  "
+            f"{udp.stale} stale dropped  {udp.forged} forged rejected"
+        )
+        print(f"dispatcher {dispatcher.stats()['datagrams']} datagrams sent  {dispatcher.stats()['datagram_errors']} send errors")
+    finally:
+        http.stop()
+        udp.stop()
+
+
+if __name__ == "__main__":
+    main()
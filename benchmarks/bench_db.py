@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.data.db import Database
+from app.data.repository import Repository
+
+from .common import percentile
+
+
+class PerCallDatabase(Database):
+    # The previous behavior: a fresh connection for every statement, rollback journal.
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def _make(persistent: bool) -> Database:
+    path = str(Path(tempfile.mkdtemp(prefix="pi_tc_db_")) / "app.db")
+    db = Database(path)
+    db.migrate()
+    Repository(db).insert_seed_data()
+    db.close()
+    if persistent:
+        return Database(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    return PerCallDatabase(path)
+
+
+def _time(fn, count: int) -> list[float]:
+    samples = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _queries(repo: Repository) -> dict:
+    return {
+        "get_setting": lambda i: repo.get_setting("agent_host"),
+        "list_actions_for_control": lambda i: repo.list_actions_for_control(1),
+        "get_control_state": lambda i: repo.get_control_state(2),
+        "set_control_state": lambda i: repo.set_control_state(2, str(i % 2)),
+    }
+
+
+def _contended(db: Database, seconds: float, readers: int) -> tuple[list[float], int]:
+    # The GUI thread writes toggle state at 60 Hz while dispatcher-like
+    # threads read settings; report the GUI thread's write stalls.
+    repo = Repository(db)
+    stop = threading.Event()
+    errors = [0]
+
+    def read() -> None:
+        while not stop.is_set():
+            try:
+                repo.get_setting("agent_host")
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    threads = [threading.Thread(target=read, daemon=True) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    samples = []
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            repo.set_control_state(2, str(i % 2))
+        except sqlite3.OperationalError:
+            errors[0] += 1
+        samples.append(time.perf_counter() - started)
+        i += 1
+        time.sleep(1 / 60)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return samples, errors[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-query SQLite cost: connection per call vs persistent WAL connections")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    for persistent in (False, True):
+        db = _make(persistent)
+        label = "persistent WAL" if persistent else "per-call"
+        for name, fn in _queries(Repository(db)).items():
+            samples = _time(fn, args.count)
+            print(
+                f"{label:<15} {name:<25} mean {sum(samples) / len(samples) * 1e6:>8.1f} us  "
+                f"p99 {percentile(samples, 99) * 1e6:>8.1f} us"
+            )
+        samples, errors = _contended(db, args.seconds, args.readers)
+        print(
+            f"{label:<15} {'write under ' + str(args.readers) + ' readers':<25} p50 {percentile(samples, 50) * 1e6:>8.1f} us  "
+            f"max {max(samples) * 1e6:>8.1f} us  locked errors {errors}"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
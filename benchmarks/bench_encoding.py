@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import random
+import string
+import timeit
+from typing import Any
+
+from app.actions.mapping import action_to_agent_payload, encode_agent_payload
+from app.data.models import Action
+
+from .bench_mapping import ACTIONS
+
+PLACEHOLDERS = ["${value}", "${state}"]
+
+
+def _random_text(rng: random.Random) -> str:
+    alphabet = string.ascii_letters + string.digits + ' "\\/\n\tée€😀'
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+
+
+def _random_leaf(rng: random.Random) -> Any:
+    roll = rng.random()
+    if roll < 0.25:
+        return rng.choice(PLACEHOLDERS)
+    if roll < 0.45:
+        return _random_text(rng) + rng.choice(PLACEHOLDERS) + _random_text(rng) + rng.choice(PLACEHOLDERS + [""])
+    if roll < 0.6:
+        return _random_text(rng)
+    return rng.choice([0, -3, 2.5, True, False, None, 1e300])
+
+
+def _random_tree(rng: random.Random, depth: int = 0) -> Any:
+    if depth >= 3 or rng.random() < 0.3:
+        return _random_leaf(rng)
+    if rng.random() < 0.5:
+        return [_random_tree(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {_random_text(rng) or "k": _random_tree(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def _random_context(rng: random.Random) -> dict | None:
+    values = [0, 37, -1, 2.75, "loud", 'q"uote', "ü", True, False, None, [1, 2], {"a": 1}]
+    context: dict = {}
+    if rng.random() < 0.7:
+        context["value"] = copy.deepcopy(rng.choice(values))
+    if rng.random() < 0.4:
+        context["state"] = copy.deepcopy(rng.choice(values))
+    return context if context or rng.random() < 0.5 else None
+
+
+def check_equivalence(cases: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for case in range(cases):
+        payload = _random_tree(rng) if rng.random() < 0.8 else {"only": "${value}"}
+        value_key = rng.choice([None, "value", "only", "volume", _random_text(rng) or "x"])
+        action = Action(
+            id=case, control_id=1, trigger="value_change", action_type="t",
+            payload_json=json.dumps({"action": "t", "payload": payload}), value_key=value_key,
+        )
+        for _ in range(5):
+            context = _random_context(rng)
+            expected = json.dumps(action_to_agent_payload(action, "rid-" + _random_text(rng), context))
+            request_id = json.loads(expected)["request_id"]
+            actual = encode_agent_payload(action, request_id, context)
+            if actual != expected.encode("utf-8"):
+                raise AssertionError(f"case {case}: {actual!r} != {expected!r}")
+    print(f"byte equivalence: {cases * 5} random (template, context) pairs OK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Encode cost per command: dict + json.dumps vs byte splicing")
+    parser.add_argument("--number", type=int, default=50000)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    check_equivalence(args.cases, args.seed)
+    context = {"value": 42}
+    for name, action in ACTIONS.items():
+        legacy = timeit.timeit(
+            lambda: json.dumps(action_to_agent_payload(action, "rid", context)).encode("utf-8"), number=args.number
+        )
+        spliced = timeit.timeit(lambda: encode_agent_payload(action, "rid", context), number=args.number)
+        print(
+            f"{name:<8} dict+dumps {legacy / args.number * 1e6:>7.2f} us/cmd  "
+            f"spliced {spliced / args.number * 1e6:>7.2f} us/cmd  ({legacy / spliced:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+
+def _actions(controls: int) -> list[Action]:
+    return [
+        Action(id=i, control_id=i, trigger="press", action_type="key_press",
+               payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None)
+        for i in range(1, controls + 1)
+    ]
+
+
+def _run(engine: type[ActionDispatcher], count: int, controls: int, latency: float) -> dict:
+    agent = StubAgent(latency=latency).start()
+    # Unbounded queues: the burst measures throughput, not overflow drops.
+    dispatcher = engine(make_settings(agent.port, dispatch_queue_capacity="0"))
+    actions = _actions(controls)
+    sent_at: dict[str, float] = {}
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            rid = f"cmd-{i}"
+            sent_at[rid] = time.perf_counter()
+            dispatcher.enqueue_action_record(actions[i % controls], request_id=rid)
+        if not wait_for(lambda: agent.received() >= count):
+            raise RuntimeError(f"only {agent.received()} of {count} commands arrived")
+        elapsed = time.perf_counter() - start
+        samples = [agent.received_at[rid] - t for rid, t in sent_at.items()]
+        return {
+            "rps": count / elapsed,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Threaded vs asyncio dispatcher engine")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--controls", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for name, engine in (("thread", ActionDispatcher), ("asyncio", AsyncActionDispatcher)):
+        stats = _run(engine, args.count, args.controls, args.latency_ms / 1000.0)
+        print(
+            f"{name:<8} {args.count:>6} cmds  {stats['rps']:>9.1f} cmd/s  "
+            f"p50 {stats['p50_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
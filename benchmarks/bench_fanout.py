@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.actions.router import AgentRouter
+from app.data.models import Action, Agent
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+
+
+def _action(action_id: int, agent_id: str | None) -> Action:
+    return Action(id=action_id, control_id=action_id, trigger="press", action_type="key_press",
+                  payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None,
+                  agent_id=agent_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Broadcast and routed presses with one slow agent")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--presses", type=int, default=40)
+    parser.add_argument("--slow-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    stubs = {
+        "default": StubAgent().start(),
+        "game": StubAgent(latency=args.slow_ms / 1000.0).start(),
+        "audio": StubAgent().start(),
+    }
+    # "default" is the agent_host/agent_port settings target; the others come from the agents table.
+    agents = [
+        Agent(id=agent_id, name=f"{agent_id.title()} PC", host="127.0.0.1", port=stub.port, token="", enabled=True)
+        for agent_id, stub in stubs.items()
+        if agent_id != "default"
+    ]
+    router = AgentRouter(make_settings(stubs["default"].port, agents=agents), engine=ENGINES[args.engine])
+    actions = [_action(1, "*"), _action(2, None), _action(3, "audio,game")]
+    sent_at: dict[str, float] = {}
+    expected = {agent_id: 0 for agent_id in stubs}
+    try:
+        for i in range(args.presses):
+            action = actions[i % len(actions)]
+            rid = f"press-{i}"
+            sent_at[rid] = time.perf_counter()
+            router.enqueue_action_record(action, request_id=rid)
+            for agent_id in router.route(action.agent_id):
+                expected[agent_id] += 1
+            time.sleep(0.01)
+        if not wait_for(lambda: all(stubs[a].received() >= n for a, n in expected.items()), 120):
+            raise RuntimeError("not every agent received its commands")
+        for agent_id, stub in stubs.items():
+            samples = [stub.received_at[rid] - sent_at[rid] for rid in sent_at if rid in stub.received_at]
+            print(
+                f"{agent_id:<8} {len(samples):>4} received  p50 {percentile(samples, 50) * 1000:>8.1f} ms  "
+                f"p95 {percentile(samples, 95) * 1000:>8.1f} ms"
+            )
+        for agent_id, outcomes in sorted(router.latency_snapshot()["agent_outcomes"].items()):
+            print(f"    {agent_id:<8} " + " ".join(f"{k}={v}" for k, v in outcomes.items() if v))
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
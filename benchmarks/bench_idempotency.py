@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, wait_for
+from .stub_agent import StubAgent
+
+PRESS = Action(id=1, control_id=1, trigger="press", action_type="run_app",
+               payload_json='{"action":"run_app","payload":{"app":"notepad"}}', value_key=None)
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+
+
+def _slow_host(engine: str, commands: int, run_ms: float) -> tuple[int, int, int]:
+    # The agent takes longer than the 2 s client timeout, so every command is retried.
+    agent = StubAgent(action_latency={"run_app": run_ms / 1000.0}).start()
+    dispatcher = ENGINES[engine](make_settings(agent.port, dispatch_retry_backoff_ms="100"))
+    try:
+        for i in range(commands):
+            dispatcher.enqueue_action_record(replace(PRESS, control_id=i + 1), request_id=f"slow-{i}")
+        if not wait_for(lambda: dispatcher.stats()["sent"] >= commands and agent.received() >= commands, 30):
+            raise RuntimeError("commands were not acknowledged")
+        return agent.received() + agent.duplicates, agent.received(), dispatcher.stats()["retried"]
+    finally:
+        agent.stop()
+
+
+def _double_taps(engine: str, taps: int, debounce_ms: int | None) -> tuple[int, int]:
+    agent = StubAgent().start()
+    dispatcher = ENGINES[engine](make_settings(agent.port))
+    action = replace(PRESS, debounce_ms=debounce_ms)
+    try:
+        for _ in range(taps):
+            dispatcher.enqueue_action_record(action)
+            time.sleep(0.04)
+            dispatcher.enqueue_action_record(action)
+            time.sleep(0.15)
+        wait_for(lambda: dispatcher.stats()["sent"] >= taps, 10)
+        time.sleep(0.2)
+        return agent.received(), dispatcher.stats()["debounced"]
+    finally:
+        agent.stop()
+
+
+def _replays(engine: str, count: int) -> tuple[int, int]:
+    agent = StubAgent().start()
+    dispatcher = ENGINES[engine](make_settings(agent.port))
+    try:
+        for i in range(count):
+            dispatcher.enqueue_action_record(PRESS, request_id=f"dup-{i}")
+            dispatcher.enqueue_action_record(PRESS, request_id=f"dup-{i}")
+        wait_for(lambda: dispatcher.stats()["sent"] >= count, 10)
+        time.sleep(0.2)
+        return agent.received(), dispatcher.stats()["deduplicated"]
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Duplicate suppression under retries and bursty input")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--slow", type=int, default=3)
+    parser.add_argument("--slow-ms", type=float, default=2300.0)
+    parser.add_argument("--taps", type=int, default=10)
+    args = parser.parse_args()
+
+    requests_seen, executed, retried = _slow_host(args.engine, args.slow, args.slow_ms)
+    print(f"slow host      {args.slow} commands  {requests_seen} requests  {retried} retries  {executed} executed")
+    for debounce_ms in (None, 100):
+        executed, debounced = _double_taps(args.engine, args.taps, debounce_ms)
+        print(f"double taps    debounce={str(debounce_ms):<5} {args.taps * 2} presses  {executed} executed  {debounced} debounced")
+    executed, deduplicated = _replays(args.engine, args.taps)
+    print(f"same id twice  {args.taps * 2} enqueues  {executed} executed  {deduplicated} deduplicated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+STEPS = [
+    {"action": "key_press", "payload": {"keys": ["f13"]}},
+    {"action": "key_press", "payload": {"keys": ["f14"]}, "delay_ms": 100},
+    {"action": "key_press", "payload": {"keys": ["f15"]}, "delay_ms": 100, "when": {"state": True}},
+    {"action": "key_press", "payload": {"keys": ["f16"]}, "when": {"value": {">=": 50}}},
+]
+MACRO = Action(id=1, control_id=1, trigger="press", action_type="macro",
+               payload_json=json.dumps({"action": "macro", "payload": {"steps": STEPS}}), value_key=None)
+HOTKEY = Action(id=2, control_id=2, trigger="press", action_type="key_press",
+                payload_json='{"action":"key_press","payload":{"keys":["f17"]}}', value_key=None)
+
+
+def _run(engine: str, supported: bool, macros: int) -> dict:
+    # "Start stream" style macro (f13, wait, f14, wait, f15) pressed while a
+    # hotkey on another control is tapped during the waits. One worker, so a
+    # sleeping dispatcher would delay the hotkey by the macro's full length.
+    agent = StubAgent(macro_supported=supported).start()
+    overrides = {"dispatch_workers": "1"} if engine == "thread" else {"dispatch_async_concurrency": "1"}
+    dispatcher = ENGINES[engine](make_settings(agent.port, **overrides))
+    enqueue_cost: list[float] = []
+    durations: list[float] = []
+    taps: list[float] = []
+    in_order = True
+    try:
+        for i in range(macros):
+            rid = f"macro-{i}"
+            started = time.perf_counter()
+            dispatcher.enqueue_action_record(MACRO, request_id=rid, context={"state": True, "value": 10})
+            enqueue_cost.append(time.perf_counter() - started)
+            time.sleep(0.05)
+            tap = f"tap-{i}"
+            tapped = time.perf_counter()
+            dispatcher.enqueue_action_record(HOTKEY, request_id=tap)
+            if not wait_for(lambda: f"{rid}:2" in agent.received_at and tap in agent.received_at, 10):
+                raise RuntimeError("macro steps did not all arrive")
+            taps.append(agent.received_at[tap] - tapped)
+            durations.append(agent.received_at[f"{rid}:2"] - started)
+            steps = [c["request_id"] for c in list(agent.commands) if str(c.get("request_id")).startswith(rid)]
+            in_order = in_order and steps == [f"{rid}:0", f"{rid}:1", f"{rid}:2"]
+        return {
+            "enqueue_max_ms": max(enqueue_cost) * 1000,
+            "macro_p50_ms": percentile(durations, 50) * 1000,
+            "tap_p50_ms": percentile(taps, 50) * 1000,
+            "tap_max_ms": max(taps) * 1000,
+            "in_order": in_order,
+        }
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Macro delivery via POST /command/macro vs client-side steps")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--macros", type=int, default=10)
+    args = parser.parse_args()
+
+    for supported in (True, False):
+        result = _run(args.engine, supported, args.macros)
+        print(
+            f"{'agent macro route' if supported else 'client-side steps':<18} "
+            f"enqueue max {result['enqueue_max_ms']:>6.2f} ms  macro p50 {result['macro_p50_ms']:>7.1f} ms  "
+            f"tap p50 {result['tap_p50_ms']:>6.1f} ms  tap max {result['tap_max_ms']:>6.1f} ms  "
+            f"in order {'yes' if result['in_order'] else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
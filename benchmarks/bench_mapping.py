@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from typing import Any, Dict
+
+from app.actions.mapping import action_to_agent_payload
+from app.data.models import Action
+
+ACTIONS = {
+    "button": Action(id=1, control_id=1, trigger="press", action_type="run_app",
+                     payload_json='{"action":"run_app","payload":{"app":"notepad"}}', value_key=None),
+    "slider": Action(
+        id=2, control_id=2, trigger="value_change", action_type="set_volume",
+        payload_json=json.dumps({
+            "action": "set_volume",
+            "payload": {
+                "device": {"name": "Speakers", "channels": ["L", "R"], "flags": {"exclusive": False}},
+                "args": ["--volume", "${value}"],
+                "label": "vol=${value}%",
+                "meta": {"source": "pi", "tags": ["fader", "media", "main"]},
+            },
+        }),
+        value_key="value",
+    ),
+}
+
+
+def _apply_context(obj: Any, context: Dict[str, Any]) -> Any:
+    if isinstance(obj, dict):
+        return {k: _apply_context(v, context) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_apply_context(v, context) for v in obj]
+    if isinstance(obj, str):
+        if obj == "${value}" and "value" in context:
+            return context["value"]
+        if obj == "${state}" and "state" in context:
+            return context["state"]
+    return obj
+
+
+def legacy_action_to_agent_payload(action: Action, request_id: str, context: Dict[str, Any] | None) -> dict:
+    data = json.loads(action.payload_json)
+    if "action" not in data or "payload" not in data:
+        raise ValueError("Action payload_json must include 'action' and 'payload'")
+    payload = data["payload"]
+    if context:
+        payload = _apply_context(payload, context)
+        if action.value_key and isinstance(payload, dict) and "value" in context:
+            payload[action.value_key] = context["value"]
+    return {"request_id": request_id, "action": data["action"], "payload": payload}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-fire JSON parsing vs compiled action templates")
+    parser.add_argument("--number", type=int, default=50000)
+    args = parser.parse_args()
+
+    context = {"value": 42}
+    for name, action in ACTIONS.items():
+        legacy = timeit.timeit(lambda: legacy_action_to_agent_payload(action, "rid", context), number=args.number)
+        compiled = timeit.timeit(lambda: action_to_agent_payload(action, "rid", context), number=args.number)
+        print(
+            f"{name:<8} legacy {legacy / args.number * 1e6:>7.2f} us/fire  "
+            f"compiled {compiled / args.number * 1e6:>7.2f} us/fire  ({legacy / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+
+
+def _faders(count: int, priority: str | None) -> list[Action]:
+    return [
+        Action(id=100 + i, control_id=100 + i, trigger="value_change", action_type="set_volume",
+               payload_json='{"action":"set_volume","payload":{"level":"${value}"}}', value_key=None,
+               priority=priority)
+        for i in range(count)
+    ]
+
+
+def _run(engine: str, fifo: bool, faders: int, updates: int, taps: int, latency: float) -> tuple[list[float], dict]:
+    # Many faders stream value_change updates while "Mute" is tapped. With
+    # fifo=True every action is forced into the normal lane (the old behavior).
+    agent = StubAgent(latency=latency).start()
+    # Coalescing is off so the fader backlog is as deep as the raw input rate.
+    overrides = {"dispatch_coalesce": "0", "dispatch_queue_capacity": "0"}
+    overrides.update({"dispatch_workers": "1"} if engine == "thread" else {"dispatch_async_concurrency": "1"})
+    dispatcher = ENGINES[engine](make_settings(agent.port, **overrides))
+    mute = Action(id=1, control_id=1, trigger="press", action_type="key_press",
+                  payload_json='{"action":"key_press","payload":{"keys":["volume_mute"]}}', value_key=None,
+                  priority="normal" if fifo else None)
+    streams = _faders(faders, "normal" if fifo else None)
+    sent_at: dict[str, float] = {}
+    try:
+        for i in range(updates):
+            for fader in streams:
+                dispatcher.enqueue_action_record(fader, context={"value": i})
+            if i % max(1, updates // taps) == 0 and len(sent_at) < taps:
+                rid = f"mute-{len(sent_at)}"
+                sent_at[rid] = time.perf_counter()
+                dispatcher.enqueue_action_record(mute, request_id=rid)
+            time.sleep(0.005)
+        if not wait_for(lambda: all(rid in agent.received_at for rid in sent_at), 120):
+            raise RuntimeError("mute taps did not all arrive")
+        return [agent.received_at[rid] - t for rid, t in sent_at.items()], dispatcher.latency_snapshot()["priorities"]
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mute tap latency behind streaming fader updates")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--faders", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=40)
+    parser.add_argument("--taps", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for fifo in (True, False):
+        samples, lanes = _run(args.engine, fifo, args.faders, args.updates, args.taps, args.latency_ms / 1000.0)
+        print(
+            f"{'single FIFO' if fifo else 'priority lanes':<15} mute p50 {percentile(samples, 50) * 1000:>8.1f} ms  "
+            f"max {max(samples) * 1000:>8.1f} ms"
+        )
+        for lane, summary in sorted(lanes.items()):
+            q = summary["quantiles"]
+            print(f"    lane {lane:<7} p50 {q.get(0.5, 0) * 1000:>8.1f} ms  p95 {q.get(0.95, 0) * 1000:>8.1f} ms  n={summary['window_count']}")
+
+
+if __name__ == "__main__":
+    main()
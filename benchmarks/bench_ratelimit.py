@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.actions.metrics import render_prometheus
+from app.actions.ratelimit import LIMIT_MODES
+from app.data.models import Action, RateLimit
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+RUN_APP = Action(id=1, control_id=1, trigger="press", action_type="run_app",
+                 payload_json='{"action":"run_app","payload":{"app":"obs"}}', value_key=None)
+HOTKEY = Action(id=2, control_id=2, trigger="press", action_type="key_press",
+                payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None)
+
+
+def _run(engine: str, mode: str | None, presses: int, taps: int, run_ms: float) -> tuple[list[float], int, dict, list[dict]]:
+    # A frantic operator hammers an expensive run_app while tapping a cheap hotkey.
+    # The agent runs one command at a time, so run_app floods delay everything.
+    agent = StubAgent(action_latency={"run_app": run_ms / 1000.0}, serial=True).start()
+    limits = [RateLimit(id=0, scope="action_type", target="run_app", rate=2.0, burst=2, mode=mode)] if mode else []
+    settings = make_settings(agent.port, rate_limits=limits, dispatch_command_ttl_ms="0")
+    dispatcher = ENGINES[engine](settings)
+    sent_at: dict[str, float] = {}
+    try:
+        for i in range(presses):
+            dispatcher.enqueue_action_record(RUN_APP)
+            if i % max(1, presses // taps) == 0 and len(sent_at) < taps:
+                rid = f"hotkey-{len(sent_at)}"
+                sent_at[rid] = time.perf_counter()
+                dispatcher.enqueue_action_record(HOTKEY, request_id=rid)
+            time.sleep(0.01)
+        wait_for(lambda: all(rid in agent.received_at for rid in sent_at), 120)
+        time.sleep(1.0)
+        samples = [agent.received_at[rid] - t for rid, t in sent_at.items() if rid in agent.received_at]
+        executed = sum(1 for c in list(agent.commands) if c.get("action") == "run_app")
+        return samples, executed, dispatcher.stats(), dispatcher.rate_limit_stats()
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hotkey latency while run_app is flooded, with and without a rate limit")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--presses", type=int, default=100)
+    parser.add_argument("--taps", type=int, default=10)
+    parser.add_argument("--run-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    limits: list[dict] = []
+    for mode in (None, *LIMIT_MODES):
+        samples, executed, stats, limits = _run(args.engine, mode, args.presses, args.taps, args.run_ms)
+        print(
+            f"{mode or 'no limit':<9} run_app {executed:>3}/{args.presses} executed during the run  "
+            f"throttled {stats['throttled']:>3}  limited {stats['limited']:>3}  "
+            f"hotkey p50 {percentile(samples, 50) * 1000:>7.1f} ms  max {max(samples, default=0) * 1000:>7.1f} ms"
+        )
+    text = render_prometheus({"stages": {}, "actions": {}, "controls": {}, "priorities": {}, "agents": {},
+                              "outcomes": {}, "agent_outcomes": {}, "retries": 0}, {}, limits)
+    print("".join(line + "\n" for line in text.splitlines() if line.startswith("pi_controller_rate_limited_total")), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.index import ActionIndex
+from app.data.db import Database
+from app.data.models import DEFAULT_AGENT
+from app.data.repository import Repository
+
+from .bench_db import PerCallDatabase
+from .bench_startup import make_config_db
+from .common import percentile
+
+
+def _route(agent_id: str | None) -> tuple[str, ...]:
+    return (DEFAULT_AGENT,)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Action resolution cost per input event: SQL query vs in-memory index")
+    parser.add_argument("--screens", type=int, default=50)
+    parser.add_argument("--controls", type=int, default=60)
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+
+    path = make_config_db(args.screens, args.controls)
+    # The same control and trigger over and over, like the ticks of a fader drag.
+    control_id, trigger = 1000 + 1, "toggle_on"
+
+    def per_query(db: Database):
+        repo = Repository(db)
+        return lambda: [a for a in repo.list_actions_for_control(control_id) if a.trigger == trigger]
+
+    db = Database(path)
+    started = time.perf_counter()
+    index = ActionIndex(Repository(db).load_snapshot().actions, _route)
+    build = time.perf_counter() - started
+    cases = [
+        ("query, connection per call", per_query(PerCallDatabase(path))),
+        ("query, persistent", per_query(db)),
+        ("index", lambda: index.resolve(control_id, trigger)),
+    ]
+    print(f"{len(index)} actions indexed in {build * 1000:.1f} ms")
+    for name, resolve in cases:
+        samples = []
+        for _ in range(args.events):
+            t = time.perf_counter()
+            resolve()
+            samples.append(time.perf_counter() - t)
+        print(
+            f"{name:<28} mean {sum(samples) / len(samples) * 1e6:>8.2f} us  "
+            f"p99 {percentile(samples, 99) * 1e6:>8.2f} us  max {max(samples) * 1e6:>9.2f} us"
+        )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
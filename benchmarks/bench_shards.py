@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import StubAgent
+
+SLOW = Action(id=1, control_id=1, trigger="press", action_type="run_app",
+              payload_json='{"action":"run_app","payload":{"app":"slow"}}', value_key=None)
+FAST = Action(id=2, control_id=2, trigger="press", action_type="key_press",
+              payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None)
+
+
+def _run(workers: int, slow_count: int, fast_count: int, slow_latency: float) -> list[float]:
+    agent = StubAgent(action_latency={"run_app": slow_latency}).start()
+    dispatcher = ActionDispatcher(make_settings(agent.port, dispatch_workers=str(workers)))
+    sent_at: dict[str, float] = {}
+    try:
+        for i in range(slow_count):
+            dispatcher.enqueue_action_record(SLOW, request_id=f"slow-{i}")
+        for i in range(fast_count):
+            sent_at[f"fast-{i}"] = time.perf_counter()
+            dispatcher.enqueue_action_record(FAST, request_id=f"fast-{i}")
+        if not wait_for(lambda: agent.received() >= slow_count + fast_count):
+            raise RuntimeError("stub agent did not receive every command")
+        order = [c["request_id"] for c in agent.commands if c["request_id"].startswith("slow-")]
+        assert order == sorted(order, key=lambda r: int(r.split("-")[1])), "per-control order violated"
+        return [agent.received_at[rid] - t for rid, t in sent_at.items()]
+    finally:
+        agent.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fast-control latency behind a slow control")
+    parser.add_argument("--slow", type=int, default=3)
+    parser.add_argument("--fast", type=int, default=20)
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    for workers in (1, 4):
+        samples = _run(workers, args.slow, args.fast, args.slow_ms / 1000.0)
+        print(
+            f"workers={workers:<3} key_press p50 {percentile(samples, 50) * 1000:>8.1f} ms  "
+            f"max {max(samples) * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
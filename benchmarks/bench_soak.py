@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+import tracemalloc
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.models import Action
+
+from .common import make_settings
+from .stub_agent import StubAgent
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+
+
+def _actions(controls: int) -> list[Action]:
+    return [
+        Action(id=i, control_id=i, trigger="press", action_type="key_press",
+               payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None)
+        for i in range(1, controls + 1)
+    ]
+
+
+def _soak(engine: str, policy: str, capacity: int, seconds: float, rate: int, controls: int) -> list[tuple[float, int, int]]:
+    # The stub runs in its own process so its bookkeeping is not traced here.
+    # The breaker threshold is raised so the queues, not the breaker, absorb the load.
+    parent, child = multiprocessing.Pipe()
+    agent = multiprocessing.Process(target=_stalled_agent, args=(child,), daemon=True)
+    agent.start()
+    settings = make_settings(
+        parent.recv(),
+        breaker_failure_threshold="100",
+        dispatch_overflow_policy=policy,
+        dispatch_queue_capacity=str(capacity),
+        dispatch_block_timeout_ms="1",
+    )
+    dispatcher = ENGINES[engine](settings)
+    actions = _actions(controls)
+    samples: list[tuple[float, int, int]] = []
+    tracemalloc.start()
+    try:
+        start = time.monotonic()
+        next_sample = start
+        sent = 0
+        while (now := time.monotonic()) - start < seconds:
+            due = int((now - start) * rate)
+            while sent < due:
+                dispatcher.enqueue_action_record(actions[sent % controls])
+                sent += 1
+            if now >= next_sample:
+                current, _ = tracemalloc.get_traced_memory()
+                samples.append((now - start, current, dispatcher.backpressure()["depth"]))
+                next_sample += 1.0
+            time.sleep(0.005)
+        return samples
+    finally:
+        tracemalloc.stop()
+        agent.terminate()
+
+
+def _stalled_agent(conn) -> None:
+    # Every request outlives the 2 s client timeout, so the agent never acks.
+    agent = StubAgent(latency=2.5).start()
+    conn.send(agent.port)
+    threading.Event().wait()
+
+
+def _flat(samples: list[tuple[float, int, int]], slack: int) -> tuple[bool, int, int]:
+    quarter = max(1, len(samples) // 4)
+    early = max(s[1] for s in samples[quarter:2 * quarter])
+    late = max(s[1] for s in samples[-quarter:])
+    return late <= early * 1.1 + slack, early, late
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sustained input against a stalled agent; memory must stay flat")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--policy", default="drop_oldest")
+    parser.add_argument("--capacity", type=int, default=256, help="0 disables the bound")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--rate", type=int, default=500, help="commands per second")
+    parser.add_argument("--controls", type=int, default=40)
+    parser.add_argument("--slack-kb", type=int, default=512)
+    args = parser.parse_args()
+
+    samples = _soak(args.engine, args.policy, args.capacity, args.seconds, args.rate, args.controls)
+    for elapsed, current, depth in samples[:: max(1, len(samples) // 10)]:
+        print(f"t={elapsed:>6.1f}s  traced {current / 1024:>9.1f} KiB  max queue depth {depth:>6}")
+    ok, early, late = _flat(samples, args.slack_kb * 1024)
+    print(f"{'PASS' if ok else 'FAIL'}: peak traced memory {early / 1024:.1f} KiB (2nd quarter) -> {late / 1024:.1f} KiB (last quarter)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.data.db import Database
+from app.data.repository import Repository
+
+from .bench_db import PerCallDatabase
+from .common import percentile
+
+
+def make_config_db(screens: int, controls: int) -> str:
+    # Synthetic layout: every control has a press action, every other control
+    # persists its state, and every tenth is a settings field.
+    path = str(Path(tempfile.mkdtemp(prefix="pi_tc_startup_")) / "app.db")
+    db = Database(path)
+    db.migrate()
+    Repository(db).insert_seed_data()
+    with db.connect() as conn:
+        conn.executescript("DELETE FROM actions; DELETE FROM controls; DELETE FROM screens; DELETE FROM control_state;")
+        conn.executemany(
+            "INSERT INTO screens (id, name, order_index, bg_color, created_at, updated_at) "
+            "VALUES (?, ?, ?, '#101820', datetime('now'), datetime('now'))",
+            [(s, f"Screen {s}", s) for s in range(1, screens + 1)],
+        )
+        rows, actions, states = [], [], []
+        for s in range(1, screens + 1):
+            for c in range(controls):
+                control_id = s * 1000 + c
+                kind = "setting_text" if c % 10 == 9 else ("toggle" if c % 2 else "button")
+                rows.append((control_id, s, kind, f"Control {c}", c // 8, c % 8, c % 2, "agent_host" if kind == "setting_text" else None))
+                actions.append((control_id, control_id, "toggle_on" if c % 2 else "press",
+                                '{"action":"key_press","payload":{"keys":["f13"]}}'))
+                if c % 2:
+                    states.append((control_id, "1"))
+        conn.executemany(
+            "INSERT INTO controls (id, screen_id, type, label, row, col, rowspan, colspan, persist_state, setting_key, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 1, 1, ?, ?, datetime('now'), datetime('now'))",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO actions (id, control_id, trigger, action_type, payload_json, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'key_press', ?, datetime('now'), datetime('now'))",
+            actions,
+        )
+        conn.executemany(
+            "INSERT INTO control_state (control_id, value, updated_at) VALUES (?, ?, datetime('now'))", states
+        )
+        conn.commit()
+    db.close()
+    return path
+
+
+def load_per_query(repo: Repository) -> int:
+    # What _rebuild_screens used to do: one query per screen, per persisted
+    # control, and per settings field.
+    queries = 2
+    repo.list_actions()
+    for screen in repo.list_screens():
+        queries += 1
+        for control in repo.list_controls_for_screen(screen.id):
+            if control.persist_state:
+                queries += 1
+                repo.get_control_state(control.id)
+            if control.setting_key:
+                queries += 1
+                repo.get_setting(control.setting_key)
+    return queries
+
+
+def load_snapshot(repo: Repository) -> int:
+    repo.load_snapshot()
+    return 5
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup config load: per-screen/per-control queries vs one snapshot")
+    parser.add_argument("--screens", type=int, default=50)
+    parser.add_argument("--controls", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    path = make_config_db(args.screens, args.controls)
+    cases = [
+        ("N+1, connection per call", PerCallDatabase, load_per_query),
+        ("N+1, persistent", Database, load_per_query),
+        ("snapshot", Database, load_snapshot),
+    ]
+    print(f"{args.screens} screens x {args.controls} controls")
+    for name, db_type, load in cases:
+        db = db_type(path)
+        repo = Repository(db)
+        samples = []
+        queries = 0
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            queries = load(repo)
+            samples.append(time.perf_counter() - started)
+        db.close()
+        print(
+            f"{name:<26} {queries:>6} queries  p50 {percentile(samples, 50) * 1000:>8.1f} ms  "
+            f"max {max(samples) * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
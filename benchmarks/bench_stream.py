@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+
+from app.actions.client import AgentClient
+
+from .common import make_settings, print_row, summarize, wait_for
+from .stub_agent import StubAgent, StubStreamAgent
+
+
+def _run(client: AgentClient, count: int, senders: int) -> dict:
+    samples: list[float] = []
+    lock = threading.Lock()
+
+    def worker(offset: int) -> None:
+        local: list[float] = []
+        for i in range(offset, count, senders):
+            t0 = time.perf_counter()
+            body = json.dumps({"request_id": f"cmd-{i}", "action": "set_volume", "payload": {"value": i % 100}})
+            ok = client.send(f"cmd-{i}", body.encode("utf-8"))
+            local.append(time.perf_counter() - t0)
+            assert ok
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(senders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep-alive HTTP vs pipelined stream transport")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--senders", type=int, default=4)
+    args = parser.parse_args()
+
+    http_agent = StubAgent().start()
+    stream_agent = StubStreamAgent(token="bench").start()
+    try:
+        http_client = AgentClient(make_settings(http_agent.port, agent_token="bench"), min_pool_size=args.senders)
+        stream_settings = make_settings(
+            http_agent.port,
+            agent_token="bench",
+            agent_transport="stream",
+            agent_stream_port=str(stream_agent.port),
+        )
+        stream_client = AgentClient(stream_settings, min_pool_size=args.senders)
+        if not wait_for(stream_client.health_check, timeout=5.0):
+            raise RuntimeError("stream channel did not connect")
+        print_row("HTTP keep-alive", _run(http_client, args.count, args.senders))
+        print_row("stream (pipelined)", _run(stream_client, args.count, args.senders))
+
+        stream_agent.stop()
+        stream_client.health_check()
+        before = http_agent.received()
+        fallback = b'{"request_id": "fallback", "action": "noop", "payload": {}}'
+        ok = wait_for(lambda: stream_client.send("fallback", fallback), 5.0)
+        print(f"fallback to POST /command after stream loss: {'ok' if ok and http_agent.received() > before else 'FAILED'}")
+    finally:
+        http_agent.stop()
+
+
+if __name__ == "__main__":
+    main()
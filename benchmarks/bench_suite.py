@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from app.actions.async_engine import AsyncActionDispatcher
+from app.actions.dispatcher import ActionDispatcher
+from app.data.db import Database
+from app.data.models import Action
+from app.data.outbox import Outbox
+
+from .common import make_settings, percentile, wait_for
+from .stub_agent import Faults, StubAgent
+
+try:
+    import resource
+except ImportError:  # Windows dev mode
+    resource = None
+
+ENGINES = {"thread": ActionDispatcher, "asyncio": AsyncActionDispatcher}
+PROFILES = {
+    "clean": Faults(),
+    "faulty": Faults(jitter=0.005, error_rate=0.02, timeout_rate=0.002, reset_rate=0.02),
+}
+# Fast probes and a short breaker so outage recovery fits in a run.
+SETTINGS = {
+    "health_interval_ms": "200",
+    "health_recovery_interval_ms": "100",
+    "breaker_open_ms": "500",
+    "dispatch_retry_backoff_ms": "50",
+    "dispatch_command_ttl_ms": "0",
+}
+
+
+def _button(idx: int) -> Action:
+    return Action(id=idx, control_id=idx, trigger="press", action_type="key_press",
+                  payload_json='{"action":"key_press","payload":{"keys":["f13"]}}', value_key=None)
+
+
+def _fader(idx: int, trigger: str = "value_change") -> Action:
+    return Action(id=idx * 2 + (trigger == "value_release"), control_id=idx, trigger=trigger, action_type="set_volume",
+                  payload_json='{"action":"set_volume","payload":{"level":"${value}"}}', value_key=None)
+
+
+class Driver:
+    # Enqueues like the GUI thread does and remembers when each request_id left.
+    def __init__(self, dispatcher: ActionDispatcher) -> None:
+        self.dispatcher = dispatcher
+        self.sent_at: dict[str, float] = {}
+
+    def fire(self, action: Action, context: dict | None = None) -> None:
+        rid = f"{action.id}-{len(self.sent_at)}"
+        self.sent_at[rid] = time.perf_counter()
+        self.dispatcher.enqueue_action_record(action, request_id=rid, context=context)
+
+
+def button_burst(driver: Driver, agent, scale: float) -> None:
+    buttons = [_button(i) for i in range(1, 21)]
+    for _ in range(int(10 * scale)):
+        for press in range(50):
+            driver.fire(buttons[press % len(buttons)])
+        time.sleep(0.2)
+
+
+def _drag(driver: Driver, faders: list[int], seconds: float) -> None:
+    ticks = int(seconds * 60)
+    for tick in range(ticks):
+        for idx in faders:
+            driver.fire(_fader(idx), {"value": tick % 101})
+        time.sleep(1 / 60)
+    for idx in faders:
+        driver.fire(_fader(idx, "value_release"), {"value": ticks % 101})
+
+
+def fader_drag(driver: Driver, agent, scale: float) -> None:
+    _drag(driver, [100], 3 * scale)
+
+
+def fader_storm(driver: Driver, agent, scale: float) -> None:
+    _drag(driver, list(range(100, 116)), 3 * scale)
+
+
+def outage(driver: Driver, agent, scale: float) -> None:
+    # The agent drops off the network for the middle third of the run.
+    buttons = [_button(i) for i in range(1, 9)]
+    ticks = int(120 * scale)
+    for tick in range(ticks):
+        if tick == ticks // 3:
+            agent.send(("outage", True))
+        elif tick == 2 * ticks // 3:
+            agent.send(("outage", False))
+        driver.fire(buttons[tick % len(buttons)])
+        time.sleep(0.05)
+
+
+WORKLOADS = {fn.__name__: fn for fn in (button_burst, fader_drag, fader_storm, outage)}
+
+
+def _stub_process(conn, faults: Faults) -> None:
+    # The stub runs in its own process so CPU and RSS below are the Pi side only.
+    agent = StubAgent(faults=faults).start()
+    conn.send(agent.port)
+    while True:
+        message = conn.recv()
+        if message[0] == "outage":
+            agent.outage = message[1]
+        elif message[0] == "results":
+            conn.send((dict(agent.received_at), agent.duplicates, agent.errors, agent.resets))
+            return
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _idle(stats: dict[str, int]) -> bool:
+    return not any(stats.get(key, 0) for key in ("queued", "held", "parked", "in_flight", "lanes"))
+
+
+def run_workload(name: str, engine: str, profile: str, scale: float) -> dict:
+    parent, child = multiprocessing.Pipe()
+    stub = multiprocessing.Process(target=_stub_process, args=(child, PROFILES[profile]), daemon=True)
+    stub.start()
+    outbox_db = Database(str(Path(tempfile.mkdtemp(prefix="pi_tc_suite_")) / "outbox.db"))
+    outbox_db.migrate()
+    outbox = Outbox(outbox_db, flush_interval=0.1)
+    dispatcher = ENGINES[engine](make_settings(parent.recv(), **SETTINGS), outbox=outbox)
+    driver = Driver(dispatcher)
+    rss_start = _rss_mb()
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    try:
+        WORKLOADS[name](driver, parent, scale)
+        driven = time.perf_counter() - started
+        drained = wait_for(lambda: _idle(dispatcher.stats()) and outbox.pending_count() == 0, 60, 0.01)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - started
+        parent.send(("results",))
+        received_at, duplicates, errors, resets = parent.recv()
+    finally:
+        stub.terminate()
+    stats = dispatcher.stats()
+    latencies = [received_at[rid] - t for rid, t in driver.sent_at.items() if rid in received_at]
+    window = (max(received_at.values()) - started) if received_at else driven
+    return {
+        "workload": name,
+        "engine": engine,
+        "profile": profile,
+        "drained": drained,
+        "enqueued": len(driver.sent_at),
+        "delivered": len(latencies),
+        "throughput_per_s": len(latencies) / window if window > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        **{key: stats.get(key, 0) for key in ("coalesced", "dropped", "retried", "expired", "failed", "spilled", "rejected")},
+        "agent_duplicates": duplicates,
+        "agent_errors": errors,
+        "agent_resets": resets,
+        "cpu_s": cpu,
+        "cpu_pct": 100.0 * cpu / wall,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss_start,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _meta(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "engine": args.engine,
+        "scale": args.scale,
+        "settings": SETTINGS,
+        "profiles": {name: asdict(faults) for name, faults in PROFILES.items() if name in args.profile},
+    }
+
+
+def _print(result: dict, previous: dict | None) -> None:
+    line = (
+        f"{result['workload']:<13} {result['profile']:<7} {result['delivered']:>6}/{result['enqueued']:<6} "
+        f"{result['throughput_per_s']:>8.1f}/s  p50 {result['p50_ms']:>7.1f}  p95 {result['p95_ms']:>7.1f}  "
+        f"p99 {result['p99_ms']:>7.1f} ms  coalesced {result['coalesced']:>5}  dropped {result['dropped']:>4}  "
+        f"cpu {result['cpu_pct']:>5.1f}%  rss {result['rss_mb']:>6.1f} MB"
+    )
+    if previous is not None:
+        line += (
+            f"  | vs prev p95 {result['p95_ms'] - previous['p95_ms']:+.1f} ms"
+            f"  thr {result['throughput_per_s'] - previous['throughput_per_s']:+.1f}/s"
+        )
+    if not result["drained"]:
+        line += "  (did not drain)"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dispatcher throughput and latency suite against a fault-injecting stub agent")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="thread")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS))
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES))
+    parser.add_argument("--scale", type=float, default=1.0, help="stretch or shrink every workload")
+    parser.add_argument("--output", help="JSON results file (default bench-suite-<time>.json)")
+    parser.add_argument("--compare", help="earlier JSON results file to diff against")
+    args = parser.parse_args()
+    args.profile = args.profile or sorted(PROFILES)
+
+    previous: dict[tuple[str, str, str], dict] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            previous = {(r["workload"], r["engine"], r["profile"]): r for r in json.load(handle)["results"]}
+    results = []
+    for profile in args.profile:
+        for name in args.workload or list(WORKLOADS):
+            result = run_workload(name, args.engine, profile, args.scale)
+            results.append(result)
+            _print(result, previous.get((name, args.engine, profile)))
+    output = args.output or f"bench-suite-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump({"meta": _meta(args), "results": results}, handle, indent=2)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
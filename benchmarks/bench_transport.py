@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import requests
+
+from app.actions.transport import AgentTransport
+from app.settings.manager import AgentTarget
+
+from .common import print_row, summarize
+from .stub_agent import StubAgent
+
+
+def _run(send, count: int) -> dict:
+    samples: list[float] = []
+    start = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        resp = send({"request_id": str(i), "action": "set_volume", "payload": {"value": i % 100}})
+        samples.append(time.perf_counter() - t0)
+        assert resp.status_code == 200
+    return summarize(samples, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request vs pooled keep-alive agent transport")
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    agent = StubAgent().start()
+    target = AgentTarget(host="127.0.0.1", port=agent.port, token="bench")
+    url = f"http://{target.host}:{target.port}/command"
+    headers = {"Authorization": f"Bearer {target.token}"}
+    transport = AgentTransport(pool_size=4)
+    try:
+        before = _run(lambda p: requests.post(url, json=p, headers=headers, timeout=2), args.count)
+        after = _run(lambda p: transport.post(target, "/command", p, timeout=2), args.count)
+    finally:
+        transport.close()
+        agent.stop()
+
+    print_row("requests.post (before)", before)
+    print_row("AgentTransport (after)", after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.data.db import Database
+from app.data.repository import Repository
+from app.data.writebehind import WriteBehind
+
+from .common import percentile
+
+
+def _io_bytes() -> int | None:
+    try:
+        with open("/proc/self/io") as io:
+            return next(int(line.split()[1]) for line in io if line.startswith("wchar:"))
+    except (OSError, StopIteration, ValueError):
+        return None
+
+
+def _run(interval_ms: int, seconds: float, controls: int) -> dict:
+    # The GUI thread toggles and releases sliders at 60 Hz and saves a setting
+    # now and then, reading each value straight back like a redraw would.
+    db = Database(str(Path(tempfile.mkdtemp(prefix="pi_tc_wb_")) / "app.db"))
+    db.migrate()
+    repo = Repository(db)
+    repo.insert_seed_data()
+    if interval_ms > 0:
+        db.write_behind = WriteBehind(db, interval=interval_ms / 1000.0)
+    samples = []
+    stale = 0
+    written: dict[int, str] = {}
+    io_start = _io_bytes()
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        control_id, value = 1 + i % controls, str(i % 101)
+        started = time.perf_counter()
+        repo.set_control_state(control_id, value)
+        if i % 60 == 0:
+            repo.set_setting("theme_spacing", str(8 + i % 8))
+        samples.append(time.perf_counter() - started)
+        written[control_id] = value
+        state = repo.get_control_state(control_id)
+        stale += state is None or state.value != value
+        i += 1
+        time.sleep(1 / 60)
+    writes = db.write_behind
+    db.close()
+    io_end = _io_bytes()
+    transactions = i + (i + 59) // 60 if writes is None else writes.flushes
+    reopened = Repository(Database(str(db.path)))
+    stored = {cid: reopened.get_control_state(cid) for cid in written}
+    lost = sum(1 for cid, value in written.items() if stored[cid] is None or stored[cid].value != value)
+    return {
+        "writes": i,
+        "transactions": transactions,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "max_us": max(samples) * 1e6,
+        "stale_reads": stale,
+        "lost": lost,
+        "io_kb": (io_end - io_start) / 1024 if io_start is not None and io_end is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GUI-thread persistence cost: write-through vs write-behind")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--controls", type=int, default=8)
+    parser.add_argument("--interval-ms", type=int, default=1000)
+    args = parser.parse_args()
+
+    for interval in (0, args.interval_ms):
+        r = _run(interval, args.seconds, args.controls)
+        name = "write-through" if interval == 0 else f"write-behind {interval} ms"
+        io = f"{r['io_kb']:>8.1f} KiB written" if r["io_kb"] is not None else ""
+        print(
+            f"{name:<22} {r['writes']:>5} writes  {r['transactions']:>5} transactions  "
+            f"p50 {r['p50_us']:>7.1f} us  p99 {r['p99_us']:>7.1f} us  max {r['max_us']:>8.1f} us  "
+            f"stale reads {r['stale_reads']}  lost {r['lost']}  {io}"
+        )
+
+
+if __name__ == "__main__":
+    main()
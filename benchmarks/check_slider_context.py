@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from app.actions.router import AgentRouter
+from app.data.db import Database
+from app.data.repository import Repository
+from app.settings.manager import SettingsManager
+
+from .common import wait_for
+from .stub_agent import StubAgent
+
+# Seeded continuous "Volume" slider.
+SLIDER_ID = 3
+
+
+def main() -> None:
+    try:
+        from PySide6 import QtWidgets
+    except ImportError:
+        sys.exit("PySide6 is required for this check")
+    from app.ui.screen_renderer import ScreenRenderer
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    agent = StubAgent().start()
+    db = Database(str(Path(tempfile.mkdtemp(prefix="pi_tc_check_")) / "app.db"))
+    db.migrate()
+    Repository(db).insert_seed_data()
+    with db.connect() as conn:
+        conn.execute(
+            "INSERT INTO actions (control_id, trigger, action_type, payload_json, value_key, created_at, updated_at) "
+            "VALUES (?, 'value_change', 'set_volume', ?, NULL, datetime('now'), datetime('now'))",
+            (SLIDER_ID, '{"action":"set_volume","payload":{"level":"${value}"}}'),
+        )
+        conn.commit()
+    settings = SettingsManager(db)
+    settings.set_value("agent_port", str(agent.port))
+    router = AgentRouter(settings)
+    try:
+        renderer = ScreenRenderer(db, router)
+        root = renderer.build_root()
+        renderer.load_initial_screen()
+        # The only 0-10 slider in the seed layout.
+        sliders = [slider for slider in root.findChildren(QtWidgets.QSlider) if slider.maximum() == 10]
+        if len(sliders) != 1:
+            sys.exit(f"expected one Volume slider, found {len(sliders)}")
+        # Dragging emits valueChanged, which fires the value_change actions.
+        sliders[0].setValue(7)
+        app.processEvents()
+        wait_for(lambda: any(c.get("action") == "set_volume" for c in agent.commands), 5.0)
+        levels = [c["payload"]["level"] for c in agent.commands if c.get("action") == "set_volume"]
+        print(f"set_volume levels received: {levels}")
+        if levels != [7]:
+            sys.exit("FAILED: the slider value did not reach the agent")
+        print("ok")
+    finally:
+        router.shutdown()
+        agent.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.data.db import Database
+from app.data.models import Agent, RateLimit
+from app.data.repository import Repository
+from app.settings.manager import SettingsManager
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def summarize(samples: list[float], elapsed: float) -> dict:
+    return {
+        "count": len(samples),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def print_row(name: str, stats: dict) -> None:
+    print(
+        f"{name:<24} {stats['count']:>7} req  {stats['rps']:>9.1f} req/s  "
+        f"p50 {stats['p50_ms']:>7.3f} ms  p99 {stats['p99_ms']:>7.3f} ms"
+    )
+
+
+def make_settings(
+    port: int,
+    agents: list[Agent] | None = None,
+    rate_limits: list[RateLimit] | None = None,
+    **overrides: str,
+) -> SettingsManager:
+    path = Path(tempfile.mkdtemp(prefix="pi_tc_bench_")) / "app.db"
+    db = Database(str(path))
+    db.migrate()
+    Repository(db).insert_seed_data()
+    for agent in agents or ():
+        Repository(db).upsert_agent(agent)
+    for limit in rate_limits or ():
+        Repository(db).upsert_rate_limit(limit)
+    settings = SettingsManager(db)
+    settings.set_value("agent_port", str(port))
+    for key, value in overrides.items():
+        settings.set_value(key, value)
+    return settings
+
+
+def wait_for(predicate, timeout: float = 60.0, interval: float = 0.001) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
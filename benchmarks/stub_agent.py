@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import socketserver
+import struct
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.actions.datagram import datagram_mac, decode_datagram, sequence_newer
+from app.actions.stream import StreamClosed, encode_frame, read_frame
+
+
+@dataclass
+class Faults:
+    # Per-request fault probabilities for /command; an outage resets everything.
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    reset_rate: float = 0.0
+    # Longer than the Pi's 2 s client timeout.
+    hang: float = 2.5
+    seed: int = 7
+
+
+class StubAgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:  # noqa: N802
+        server: StubAgent = self.server  # type: ignore[assignment]
+        if server.outage:
+            self._reset()
+        elif self.path == "/health":
+            self._reply(200, {"ok": True})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self._read_body()
+        server: StubAgent = self.server  # type: ignore[assignment]
+        if server.latency:
+            time.sleep(server.latency)
+        fault = server.roll() if self.path.startswith("/command") else None
+        if fault == "reset":
+            self._reset()
+            return
+        if fault == "timeout":
+            time.sleep(server.faults.hang)
+            self._reset()
+            return
+        if fault == "error":
+            server.errors += 1
+            self._reply(503, {"error": "injected"})
+            return
+        if self.path == "/command":
+            payload = json.loads(body)
+            if not server.claim(self.headers.get("Idempotency-Key")):
+                self._reply(200, {"ok": True, "duplicate": True})
+                return
+            delay = server.action_latency.get(payload.get("action"), 0.0)
+            with server.exec_lock if server.serial else contextlib.nullcontext():
+                if delay:
+                    time.sleep(delay)
+                server.record(payload)
+            self._reply(200, {"ok": True})
+        elif self.path == "/command/macro" and server.macro_supported:
+            payload = json.loads(body)
+            if not server.claim(self.headers.get("Idempotency-Key")):
+                self._reply(200, {"ok": True, "duplicate": True})
+                return
+            # Acknowledged on acceptance; the agent runs the steps and their delays itself.
+            threading.Thread(target=server.run_macro, args=(payload,), daemon=True).start()
+            self._reply(200, {"ok": True})
+        elif self.path == "/command/batch" and server.batch_supported:
+            commands = json.loads(body)["commands"]
+            for payload in commands:
+                server.record(payload)
+            self._reply(200, {"results": [{"request_id": p.get("request_id"), "ok": True} for p in commands]})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reset(self) -> None:
+        # SO_LINGER 0 makes close() send RST, like an agent process that died.
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.close_connection = True
+        self.server.resets += 1  # type: ignore[attr-defined]
+
+    def _reply(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubAgent(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        batch_supported: bool = True,
+        action_latency: dict[str, float] | None = None,
+        serial: bool = False,
+        macro_supported: bool = True,
+        faults: Faults | None = None,
+    ) -> None:
+        super().__init__((host, port), StubAgentHandler)
+        # serial=True runs one command at a time, like an agent that is CPU bound.
+        self.serial = serial
+        self.exec_lock = threading.Lock()
+        self.latency = latency
+        self.action_latency = action_latency or {}
+        self.batch_supported = batch_supported
+        self.macro_supported = macro_supported
+        self.faults = faults or Faults()
+        self._random = random.Random(self.faults.seed)
+        # Set to simulate the agent machine going away; cleared to bring it back.
+        self.outage = False
+        self.errors = 0
+        self.resets = 0
+        self._lock = threading.Lock()
+        self.commands: list[dict] = []
+        self.received_at: dict[str | None, float] = {}
+        self.idempotency_keys: set[str] = set()
+        self.duplicates = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record(self, payload: dict) -> None:
+        with self._lock:
+            self.commands.append(payload)
+            self.received_at[payload.get("request_id")] = time.perf_counter()
+
+    def roll(self) -> str | None:
+        if self.outage:
+            return "reset"
+        faults = self.faults
+        with self._lock:
+            draw = self._random.random()
+            jitter = self._random.uniform(0.0, faults.jitter) if faults.jitter else 0.0
+        for fault, rate in (("reset", faults.reset_rate), ("timeout", faults.timeout_rate), ("error", faults.error_rate)):
+            if draw < rate:
+                return fault
+            draw -= rate
+        if jitter:
+            time.sleep(jitter)
+        return None
+
+    def run_macro(self, payload: dict) -> None:
+        for idx, step in enumerate(payload["payload"]["steps"]):
+            if step.get("delay_ms"):
+                time.sleep(step["delay_ms"] / 1000.0)
+            self.record({"request_id": f"{payload['request_id']}:{idx}", "action": step["action"], "payload": step["payload"]})
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that time out hang up mid-reply; that is expected here.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def claim(self, key: str | None) -> bool:
+        # Mirrors the agent contract: a repeated Idempotency-Key is acknowledged, not re-run.
+        if key is None:
+            return True
+        with self._lock:
+            if key in self.idempotency_keys:
+                self.duplicates += 1
+                return False
+            self.idempotency_keys.add(key)
+            return True
+
+    def received(self) -> int:
+        with self._lock:
+            return len(self.commands)
+
+    def start(self) -> "StubAgent":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StubStreamHandler(socketserver.StreamRequestHandler):
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        server: StubStreamAgent = self.server  # type: ignore[assignment]
+        try:
+            hello = read_frame(self.rfile)
+            ok = hello.get("type") == "hello" and hello.get("token") == server.token
+            self._send({"type": "hello_ack", "ok": ok})
+            if not ok:
+                return
+            server.track(self.connection)
+            while True:
+                message = read_frame(self.rfile)
+                kind = message.get("type")
+                if kind == "ping":
+                    self._send({"type": "pong", "id": message.get("id")})
+                elif kind == "command":
+                    if server.latency:
+                        time.sleep(server.latency)
+                    server.record(message)
+                    self._send({"type": "ack", "request_id": message.get("request_id"), "ok": True})
+        except (OSError, StreamClosed):
+            return
+
+    def _send(self, message: dict) -> None:
+        self.wfile.write(encode_frame(message))
+        self.wfile.flush()
+
+
+class StubStreamAgent(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token: str = "", latency: float = 0.0) -> None:
+        super().__init__((host, port), StubStreamHandler)
+        self.token = token
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.commands: list[dict] = []
+        self._connections: list[socket.socket] = []
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def track(self, connection: socket.socket) -> None:
+        with self._lock:
+            self._connections.append(connection)
+
+    def record(self, message: dict) -> None:
+        with self._lock:
+            self.commands.append(message)
+
+    def received(self) -> int:
+        with self._lock:
+            return len(self.commands)
+
+    def start(self) -> "StubStreamAgent":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class StubDatagramAgent:
+    # UDP stand-in for the agent's datagram port. It verifies the HMAC, keeps
+    # the newest sequence number per (session, key), and drops anything older.
+    # reorder > 0 holds back that share of packets until the next one for the same key.
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token: str = "", reorder: float = 0.0) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.2)
+        self._mac = datagram_mac(token)
+        self._reorder = reorder
+        self._random = random.Random(7)
+        self._lock = threading.Lock()
+        self._last: dict[tuple[int, int], int] = {}
+        self.applied: list[tuple[int, dict, float]] = []
+        self.received = 0
+        self.stale = 0
+        self.forged = 0
+        self.held = 0
+        self.first_at = 0.0
+        self.last_at = 0.0
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self._sock.getsockname()[1]
+
+    def start(self) -> "StubDatagramAgent":
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self._sock.close()
+
+    def _serve(self) -> None:
+        held: dict[bytes, bytes] = {}
+        while self._running:
+            try:
+                data = self._sock.recv(65535)
+            except socket.timeout:
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                self.received += 1
+                self.first_at = self.first_at or now
+                self.last_at = now
+            # Reorder within one stream: swap with the next packet for the same key.
+            key = data[5:9]
+            if key not in held and self._reorder and self._random.random() < self._reorder:
+                held[key] = data
+                self.held += 1
+                continue
+            self._apply(data, now)
+            if key in held:
+                self._apply(held.pop(key), now)
+
+    def _apply(self, data: bytes, now: float) -> None:
+        decoded = decode_datagram(self._mac, data)
+        with self._lock:
+            if decoded is None:
+                self.forged += 1
+                return
+            session, key, seq, body = decoded
+            last = self._last.get((session, key))
+            if last is not None and not sequence_newer(seq, last):
+                self.stale += 1
+                return
+            self._last[(session, key)] = seq
+            self.applied.append((key, json.loads(body), now))
+
+    def rate(self) -> float:
+        with self._lock:
+            span = self.last_at - self.first_at
+            return (self.received - 1) / span if span > 0 else 0.0
@@ -0,0 +1,13 @@
+ALTER TABLE actions ADD COLUMN replay_policy TEXT;
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL UNIQUE,
+    control_id INTEGER,
+    action_id INTEGER,
+    trigger TEXT,
+    replay_policy TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    expires_at REAL,
+    created_at TEXT
+);
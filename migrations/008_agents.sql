@@ -0,0 +1,31 @@
+CREATE TABLE IF NOT EXISTS agents (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    token TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+ALTER TABLE actions ADD COLUMN agent_id TEXT;
+
+-- A broadcast command spills once per agent with the same request_id.
+CREATE TABLE outbox_v8 (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL DEFAULT 'default',
+    control_id INTEGER,
+    action_id INTEGER,
+    trigger TEXT,
+    replay_policy TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    expires_at REAL,
+    created_at TEXT,
+    UNIQUE(request_id, agent_id)
+);
+INSERT INTO outbox_v8 (id, request_id, control_id, action_id, trigger, replay_policy, payload_json, expires_at, created_at)
+    SELECT id, request_id, control_id, action_id, trigger, replay_policy, payload_json, expires_at, created_at FROM outbox;
+DROP TABLE outbox;
+ALTER TABLE outbox_v8 RENAME TO outbox;
@@ -0,0 +1 @@
+ALTER TABLE actions ADD COLUMN transport TEXT;
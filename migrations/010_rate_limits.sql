@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS rate_limits (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    target TEXT NOT NULL,
+    rate REAL NOT NULL,
+    burst INTEGER NOT NULL DEFAULT 1,
+    mode TEXT NOT NULL DEFAULT 'delay',
+    created_at TEXT,
+    updated_at TEXT,
+    UNIQUE(scope, target)
+);
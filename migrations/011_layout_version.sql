@@ -0,0 +1,16 @@
+-- Bumped by every change to screens, controls, and actions, including edits
+-- made outside the app, so the layout cache can tell when it is stale.
+CREATE TABLE IF NOT EXISTS layout_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO layout_version (id, version) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS screens_insert_layout_version AFTER INSERT ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS screens_update_layout_version AFTER UPDATE ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS screens_delete_layout_version AFTER DELETE ON screens BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS controls_insert_layout_version AFTER INSERT ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS controls_update_layout_version AFTER UPDATE ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS controls_delete_layout_version AFTER DELETE ON controls BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS actions_insert_layout_version AFTER INSERT ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS actions_update_layout_version AFTER UPDATE ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS actions_delete_layout_version AFTER DELETE ON actions BEGIN UPDATE layout_version SET version = version + 1; END;
@@ -0,0 +1,23 @@
+-- The counter alone does not name a layout: it restarts when the database is
+-- reset or reseeded, and a restored copy can reach the same count with other
+-- rows. Every change also draws a new random stamp for the layout cache key.
+ALTER TABLE layout_version ADD COLUMN stamp BLOB;
+UPDATE layout_version SET stamp = randomblob(16);
+DROP TRIGGER IF EXISTS screens_insert_layout_version;
+DROP TRIGGER IF EXISTS screens_update_layout_version;
+DROP TRIGGER IF EXISTS screens_delete_layout_version;
+DROP TRIGGER IF EXISTS controls_insert_layout_version;
+DROP TRIGGER IF EXISTS controls_update_layout_version;
+DROP TRIGGER IF EXISTS controls_delete_layout_version;
+DROP TRIGGER IF EXISTS actions_insert_layout_version;
+DROP TRIGGER IF EXISTS actions_update_layout_version;
+DROP TRIGGER IF EXISTS actions_delete_layout_version;
+CREATE TRIGGER IF NOT EXISTS screens_insert_layout_version AFTER INSERT ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS screens_update_layout_version AFTER UPDATE ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS screens_delete_layout_version AFTER DELETE ON screens BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS controls_insert_layout_version AFTER INSERT ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS controls_update_layout_version AFTER UPDATE ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS controls_delete_layout_version AFTER DELETE ON controls BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS actions_insert_layout_version AFTER INSERT ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS actions_update_layout_version AFTER UPDATE ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;
+CREATE TRIGGER IF NOT EXISTS actions_delete_layout_version AFTER DELETE ON actions BEGIN UPDATE layout_version SET version = version + 1, stamp = randomblob(16); END;